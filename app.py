@@ -1,19 +1,65 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 from user import User, Portfolio
 import uuid
 from datetime import datetime
 import json
+import os
+import queue
+import time
+
+import assets
+import draft
+import export
+import history
+import intraday
+import league
+import ledger
+import main
+import metrics
+import profiler
+import quotes
+import rescore
+import search
+import universe
+from jsonprovider import FastJSONProvider
 
 # Import game logic from main.py
 from main import (
     COMPANIES, POINTS, premium_picks, mid_tier, wildcards, risky_plays,
     eps_outcome, score_company_game, stock_market_reaction, price_change_1month,
-    earnings_rows, game_score
+    earnings_rows, game_score, score_breakdowns, refresh_status, refresh_shared_data,
+    rescore_in_background
 )
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)  # orjson when available; handles datetimes/NumPy/pandas
 CORS(app)
+profiler.init_app(app)  # only active with PROFILE=1 and PROFILE_ROUTES set
+
+#  REQUEST METRICS
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def refresh_data():
+    # Pick up a newer EARNINGS_SNAPSHOT / SCORE_TABLE version, if serving from one
+    refresh_shared_data()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Label by route template (not raw path) to keep cardinality bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = response.status_code
+        metrics.http_latency.observe(time.perf_counter() - start, route=route, method=request.method)
+        metrics.http_requests.inc(route=route, method=request.method, status=status)
+        if status >= 500:
+            metrics.http_errors.inc(route=route, method=request.method)
+    return response
 
 @app.route("/api/routes", methods=["GET"])
 def list_routes():
@@ -25,10 +71,61 @@ def add_to_draft_test():
 
 
 
+# Live quotes for portfolio valuation, refreshed in bulk off the request path
+quotes.start_refresher(COMPANIES)
+
+# Intraday reaction scoring for today's reporters (INTRADAY=1). Workers attached
+# to a shared score table get these updates from the loader instead.
+intraday_tracker = intraday.IntradayTracker(
+    earnings_rows, game_score, score_breakdowns, POINTS, main.points_from_percent_change,
+    on_update=lambda tickers: main.mark_data_changed())
+if intraday.INTRADAY_ENABLED and main.score_table is None:
+    intraday_tracker.start(COMPANIES)
+
 # In-memory storage (replace with database in production)
 users = {}
 user_counter = 0
 
+# Trade ledger (LEDGER_DIR): every portfolio change is appended to disk and
+# users are rebuilt from the latest snapshot plus the events after it
+trade_ledger = ledger.Ledger(ledger.LEDGER_DIR) if ledger.LEDGER_DIR else None
+if trade_ledger is not None:
+    users.update(trade_ledger.recover(
+        lambda r: User(r["user_id"], r["username"], r["email"], r["initial_balance"])))
+    trade_ledger.start_snapshots(users)
+
+def add_user(user):
+    users[user.user_id] = user
+    rescore.totals.touch(user.user_id)
+    if trade_ledger is not None:
+        trade_ledger.register_user(user)
+    return user
+
+def record_trade(kind, user, ticker, shares, cash, quote=None):
+    """Append a portfolio change to the ledger and apply it to `user` (one locked step, see ledger.py)"""
+    if trade_ledger is not None:
+        trade_ledger.record(kind, user, ticker, shares, cash, quote)
+    else:
+        ledger.apply_event(user, ticker, shares, cash, quote)
+    rescore.totals.touch(user.user_id)
+
+# Synthetic population for load tests (LOADGEN_USERS=N); see loadgen.py
+if os.environ.get("LOADGEN_USERS"):
+    import loadgen
+    loadgen.populate(add_user, int(os.environ["LOADGEN_USERS"]),
+                     seed=int(os.environ.get("LOADGEN_SEED", loadgen.DEFAULT_SEED)),
+                     follows=float(os.environ.get("LOADGEN_FOLLOWS", "20")),
+                     inbox=float(os.environ.get("LOADGEN_INBOX", "5")))
+
+def score_card(user):
+    """{"total_score", "portfolio_scores"} for `user`, cached until their holdings or the scores change"""
+    return rescore.cards.card(user, game_score, score_breakdowns, refresh_status['data_version'])
+
+def user_totals():
+    """Every user's total score, batch-rescored when scores or holdings changed (see rescore.py)"""
+    rescore.totals.sync(users, game_score, refresh_status['data_version'])
+    return rescore.totals
+
 def get_or_create_default_user():
     default_username = "Fantasy Bro"
     default_user = next((u for u in users.values() if u.username == default_username), None)
@@ -36,31 +133,20 @@ def get_or_create_default_user():
     if default_user:
         return default_user
 
-    user_id = str(uuid.uuid4())
-    default_user = User(user_id, default_username, "", 100.0)
-    users[user_id] = default_user
-    return default_user, default_user.user_id
+    return add_user(User(str(uuid.uuid4()), default_username, "", 100.0))
 
 
-# Stock pricing (simplified - in production, fetch real-time prices)
-STOCK_PRICES = {
-    "premium": 15,
-    "mid_tier": 10,
-    "wildcard": 5,
-    "risky": 3
-}
+# Stock pricing (simplified - in production, fetch real-time prices).
+# Leagues can override these per tier; see league.py
+STOCK_PRICES = league.TIER_PRICES
+
+def logo_url(ticker):
+    """Hashed, resized logo when build_assets.py has run, else the source image"""
+    return assets.url_for(universe.img_for(ticker))
 
 def get_stock_price(ticker):
     """Get the price category for a stock"""
-    if ticker in premium_picks:
-        return STOCK_PRICES["premium"]
-    elif ticker in mid_tier:
-        return STOCK_PRICES["mid_tier"]
-    elif ticker in wildcards:
-        return STOCK_PRICES["wildcard"]
-    elif ticker in risky_plays:
-        return STOCK_PRICES["risky"]
-    return 0
+    return league.DEFAULT_RULES.price_of(ticker)
 
 #  USER ENDPOINTS 
 
@@ -78,15 +164,9 @@ def create_user():
     if not username:
         return jsonify({'error': 'Username is required'}), 400
     
-    user = User(user_id, username, email, initial_balance)
-    users[user_id] = user
-    
-    user_data = user.get_user()
-    # Convert datetime to string for JSON serialization
-    if 'created_at' in user_data and isinstance(user_data['created_at'], datetime):
-        user_data['created_at'] = user_data['created_at'].isoformat()
+    user = add_user(User(user_id, username, email, initial_balance))
     
-    return jsonify(user_data), 201
+    return jsonify(user.get_user()), 201
 
 @app.route('/api/users/<user_id>', methods=['GET'])
 def get_user(user_id):
@@ -94,34 +174,12 @@ def get_user(user_id):
     if user_id not in users:
         return jsonify({'error': 'User not found'}), 404
     
-    user_data = users[user_id].get_user()
-    # Convert datetime to string for JSON serialization
-    if 'created_at' in user_data and isinstance(user_data['created_at'], datetime):
-        user_data['created_at'] = user_data['created_at'].isoformat()
-    # Convert datetime objects in inbox
-    if 'inbox' in user_data:
-        for msg in user_data['inbox']:
-            if 'timestamp' in msg and isinstance(msg['timestamp'], datetime):
-                msg['timestamp'] = msg['timestamp'].isoformat()
-    
-    return jsonify(user_data)
+    return jsonify(users[user_id].get_user())
 
 @app.route('/api/users', methods=['GET'])
 def list_users():
     """List all users"""
-    users_list = []
-    for user in users.values():
-        user_data = user.get_user()
-        # Convert datetime to string for JSON serialization
-        if 'created_at' in user_data and isinstance(user_data['created_at'], datetime):
-            user_data['created_at'] = user_data['created_at'].isoformat()
-        # Convert datetime objects in inbox
-        if 'inbox' in user_data:
-            for msg in user_data['inbox']:
-                if 'timestamp' in msg and isinstance(msg['timestamp'], datetime):
-                    msg['timestamp'] = msg['timestamp'].isoformat()
-        users_list.append(user_data)
-    return jsonify(users_list)
+    return jsonify([user.get_user() for user in users.values()])
 
 #  PORTFOLIO ENDPOINTS 
 
@@ -132,10 +190,16 @@ def get_portfolio(user_id):
         return jsonify({'error': 'User not found'}), 404
     
     user = users[user_id]
+    positions, market_value = quotes.value_holdings(
+        user.portfolio.holdings, user.portfolio.entry_prices, get_stock_price
+    )
     portfolio_data = {
         'holdings': user.portfolio.holdings,
+        'positions': positions,
         'balance': user.balance,
-        'total_value': user.balance  # Simplified - add stock value calculation
+        'market_value': round(market_value, 2),
+        'total_value': round(user.balance + market_value, 2),
+        'quotes_as_of': quotes.quote_cache.last_refresh
     }
     
     return jsonify(portfolio_data)
@@ -150,7 +214,7 @@ def buy_stock(user_id):
     ticker = data.get('ticker', '').upper()
     shares = int(data.get('shares', 1))
     
-    if ticker not in COMPANIES:
+    if ticker not in universe.TICKER_INDEX:
         return jsonify({'error': f'Stock {ticker} not available'}), 400
     
     user = users[user_id]
@@ -159,17 +223,15 @@ def buy_stock(user_id):
     
     # Calculate total spent on stocks (sum of all stock prices in portfolio)
     total_spent = 0
-    for ticker_held, stock_data in user.portfolio.holdings.items():
-        held_price = get_stock_price(ticker_held)
-        total_spent += held_price * stock_data.get('quantity', 1)
+    for ticker_held, held_shares in user.portfolio.holdings.items():
+        total_spent += get_stock_price(ticker_held) * held_shares
     
-    # Check if buying this stock would exceed the $100 budget
-    remaining_balance = 100.0 - total_spent
+    # Check if buying this stock would exceed the global league's budget
+    remaining_balance = league.DEFAULT_RULES.budget - total_spent
     if total_cost > remaining_balance:
         return jsonify({'error': f'Insufficient balance. You have ${remaining_balance:.2f} remaining, but this stock costs ${total_cost:.2f}'}), 400
     
-    user.portfolio.add_stock(ticker, shares)
-    user.update_balance(-total_cost)
+    record_trade(ledger.BUY, user, ticker, shares, -total_cost, quotes.quote_cache.price(ticker))
     
     return jsonify({
         'message': f'Bought {shares} shares of {ticker}',
@@ -190,10 +252,9 @@ def sell_stock(user_id):
     user = users[user_id]
     
     try:
-        user.portfolio.remove_stock(ticker, shares)
         price_per_share = get_stock_price(ticker)
         total_revenue = price_per_share * shares
-        user.update_balance(total_revenue)
+        record_trade(ledger.SELL, user, ticker, -shares, total_revenue)
         
         return jsonify({
             'message': f'Sold {shares} shares of {ticker}',
@@ -211,12 +272,7 @@ def get_available_stocks():
 
     for i, ticker in enumerate(COMPANIES, start=1):
         price = get_stock_price(ticker)
-        category = (
-            "premium" if ticker in premium_picks else
-            "mid_tier" if ticker in mid_tier else
-            "wildcard" if ticker in wildcards else
-            "risky"
-        )
+        category = universe.TIER_OF[ticker]
 
         row = earnings_rows.get(ticker)
 
@@ -224,7 +280,7 @@ def get_available_stocks():
             "id": i,                
             "ticker": ticker,
             "name": (row.get("stock name", ticker) if row else ticker), 
-            "img": f"img/{ticker.lower()}.png",                           
+            "img": logo_url(ticker),
             "price": price,
             "category": category,
             "score": float(game_score.get(ticker, 0)),
@@ -243,11 +299,30 @@ def get_available_stocks():
     return jsonify(stocks)
 
 
+@app.route('/api/search', methods=['GET'])
+def search_companies():
+    """Typeahead search over ticker and name (?q=&limit=&tier=premium,mid_tier&min_score=&max_score=)"""
+    version = refresh_status['data_version']
+    if search.index.version != version:
+        search.index.update(earnings_rows, game_score, get_stock_price, logo_url, version)
+
+    try:
+        limit = int(request.args.get('limit', search.DEFAULT_LIMIT))
+        min_score = request.args.get('min_score', type=float)
+        max_score = request.args.get('max_score', type=float)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    tiers = {t for t in request.args.get('tier', '').split(',') if t} or None
+
+    query = request.args.get('q', '')
+    results, total = search.index.search(query, limit, tiers, min_score, max_score)
+    return jsonify({'query': query, 'total': total, 'results': results})
+
 @app.route('/api/stocks/<ticker>/earnings', methods=['GET'])
 def get_stock_earnings(ticker):
     """Get earnings data for a specific stock"""
     ticker = ticker.upper()
-    if ticker not in COMPANIES:
+    if ticker not in universe.TICKER_INDEX:
         return jsonify({'error': 'Stock not found'}), 404
     
     try:
@@ -277,36 +352,323 @@ def get_user_score(user_id):
         return jsonify({'error': 'User not found'}), 404
     
     user = users[user_id]
-    portfolio = user.portfolio.holdings
     
     try:
-        all_scores = game_score
-        total_score = 0
-        portfolio_scores = []
-        
-        for ticker, shares in portfolio.items():
-            # Find score for this ticker
-            ticker_score = next((s for s in all_scores if s['ticker'] == ticker), None)
-            if ticker_score:
-                score_value = ticker_score['game_score'] * shares  # Multiply by shares owned
-                total_score += score_value
-                portfolio_scores.append({
-                    'ticker': ticker,
-                    'shares': shares,
-                    'score_per_share': ticker_score['game_score'],
-                    'total_score': score_value,
-                    'breakdown': ticker_score.get('breakdown', {})
-                })
-        
+        card = score_card(user)
         return jsonify({
             'user_id': user_id,
             'username': user.username,
-            'total_score': total_score,
-            'portfolio_scores': portfolio_scores
+            'total_score': card['total_score'],
+            'portfolio_scores': card['portfolio_scores']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+#  LEAGUE ENDPOINTS
+
+def league_or_404(league_id):
+    found = league.leagues.get(league_id)
+    if found is None:
+        return None, (jsonify({'error': 'League not found'}), 404)
+    return found, None
+
+@app.route('/api/leagues', methods=['POST'])
+def create_league():
+    """Create a league with its own budget, tier prices and points overrides"""
+    data = request.json or {}
+    owner_id = data.get('owner_id')
+    name = data.get('name')
+
+    if owner_id not in users:
+        return jsonify({'error': 'User not found'}), 404
+    if not name:
+        return jsonify({'error': 'League name is required'}), 400
+
+    try:
+        rules = league.Rules(
+            budget=data.get('budget', league.DEFAULT_BUDGET),
+            tier_prices=data.get('tier_prices'),
+            points=data.get('points')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    created = league.create_league(name, owner_id, rules)
+    return jsonify(created.get_league()), 201
+
+@app.route('/api/leagues/<league_id>', methods=['GET'])
+def get_league(league_id):
+    """Get a league's rules and member count"""
+    found, error = league_or_404(league_id)
+    if error:
+        return error
+    return jsonify(found.get_league())
+
+@app.route('/api/leagues/<league_id>/join', methods=['POST'])
+def join_league(league_id):
+    """Join a league with an empty roster"""
+    user_id = (request.json or {}).get('user_id')
+    if user_id not in users:
+        return jsonify({'error': 'User not found'}), 404
+    found, error = league_or_404(league_id)
+    if error:
+        return error
+    league.join_league(league_id, user_id)
+    return jsonify(found.get_league())
+
+@app.route('/api/leagues/<league_id>/leave', methods=['POST'])
+def leave_league(league_id):
+    """Leave a league, discarding the roster"""
+    user_id = (request.json or {}).get('user_id')
+    found, error = league_or_404(league_id)
+    if error:
+        return error
+    league.leave_league(league_id, user_id)
+    return jsonify({'message': 'Left league'})
+
+@app.route('/api/users/<user_id>/leagues', methods=['GET'])
+def get_user_leagues(user_id):
+    """Leagues a user belongs to"""
+    if user_id not in users:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify([found.get_league() for found in league.leagues_for(user_id)])
+
+@app.route('/api/leagues/<league_id>/roster/<user_id>', methods=['GET'])
+def get_league_roster(league_id, user_id):
+    """A member's roster and score under the league's rules"""
+    found, error = league_or_404(league_id)
+    if error:
+        return error
+    try:
+        roster = found.roster(user_id)
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    return jsonify({
+        'holdings': roster.holdings,
+        'spent': roster.spent,
+        'remaining_budget': found.rules.budget - roster.spent,
+        'score': found.member_score(user_id)
+    })
+
+@app.route('/api/leagues/<league_id>/roster/buy', methods=['POST'])
+def buy_league_stock(league_id):
+    """Add shares to a member's roster within the league budget"""
+    found, error = league_or_404(league_id)
+    if error:
+        return error
+    data = request.json or {}
+    ticker = data.get('ticker', '').upper()
+    shares = int(data.get('shares', 1))
+
+    if ticker not in universe.TICKER_INDEX:
+        return jsonify({'error': f'Stock {ticker} not available'}), 400
+    if shares <= 0:
+        return jsonify({'error': 'Shares must be positive'}), 400
+    if draft.active_draft(league_id) is not None:
+        return jsonify({'error': 'League has a draft in progress; pick through the draft'}), 409
+
+    try:
+        roster = found.buy(data.get('user_id'), ticker, shares)
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'message': f'Bought {shares} shares of {ticker}',
+        'remaining_budget': found.rules.budget - roster.spent,
+        'holdings': roster.holdings
+    })
+
+@app.route('/api/leagues/<league_id>/roster/sell', methods=['POST'])
+def sell_league_stock(league_id):
+    """Remove shares from a member's roster, refunding the league price"""
+    found, error = league_or_404(league_id)
+    if error:
+        return error
+    data = request.json or {}
+    ticker = data.get('ticker', '').upper()
+    shares = int(data.get('shares', 1))
+
+    try:
+        roster = found.sell(data.get('user_id'), ticker, shares)
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'message': f'Sold {shares} shares of {ticker}',
+        'remaining_budget': found.rules.budget - roster.spent,
+        'holdings': roster.holdings
+    })
+
+@app.route('/api/leagues/<league_id>/leaderboard', methods=['GET'])
+def get_league_leaderboard(league_id):
+    """League standings under its own points table"""
+    found, error = league_or_404(league_id)
+    if error:
+        return error
+    return jsonify([
+        {
+            'player_id': user_id,
+            'player_name': users[user_id].username if user_id in users else 'Unknown',
+            'score': score
+        }
+        for user_id, score in found.leaderboard()
+    ])
+
+#  LIVE DRAFT ENDPOINTS
+
+def draft_or_404(draft_id):
+    found = draft.drafts.get(draft_id)
+    if found is None:
+        return None, (jsonify({'error': 'Draft not found'}), 404)
+    return found, None
+
+@app.route('/api/leagues/<league_id>/drafts', methods=['POST'])
+def create_draft(league_id):
+    """Set up a snake or auction draft over the league's members"""
+    if league_id not in league.leagues:
+        return jsonify({'error': 'League not found'}), 404
+    data = request.json or {}
+    try:
+        created = draft.create_draft(
+            league_id,
+            mode=data.get('mode', draft.SNAKE),
+            rounds=int(data.get('rounds', 5)),
+            order=data.get('order'),
+            pick_seconds=float(data.get('pick_seconds', draft.DEFAULT_PICK_SECONDS)),
+            bid_seconds=float(data.get('bid_seconds', draft.DEFAULT_BID_SECONDS))
+        )
+        if data.get('start'):
+            created.start()
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(created.get_draft()), 201
+
+@app.route('/api/drafts/<draft_id>', methods=['GET'])
+def get_live_draft(draft_id):
+    """Draft state: order, who is on the clock, picks so far, remaining tickers"""
+    found, error = draft_or_404(draft_id)
+    if error:
+        return error
+    return jsonify(found.get_draft())
+
+def draft_action(draft_id, action):
+    found, error = draft_or_404(draft_id)
+    if error:
+        return error
+    data = request.json or {}
+    try:
+        action(found, data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True})
+
+@app.route('/api/drafts/<draft_id>/start', methods=['POST'])
+def start_draft(draft_id):
+    """Start the clock on the first pick"""
+    return draft_action(draft_id, lambda d, data: d.start())
+
+@app.route('/api/drafts/<draft_id>/pick', methods=['POST'])
+def make_pick(draft_id):
+    """Snake pick by the member on the clock"""
+    return draft_action(draft_id, lambda d, data: d.pick(data.get('user_id'), data.get('ticker', '').upper()))
+
+@app.route('/api/drafts/<draft_id>/nominate', methods=['POST'])
+def nominate_stock(draft_id):
+    """Auction: put a ticker up with an opening bid"""
+    return draft_action(draft_id, lambda d, data: d.nominate(
+        data.get('user_id'), data.get('ticker', '').upper(), data.get('amount', draft.MIN_BID)))
+
+@app.route('/api/drafts/<draft_id>/bid', methods=['POST'])
+def place_bid(draft_id):
+    """Auction: outbid the current high bid"""
+    return draft_action(draft_id, lambda d, data: d.bid(data.get('user_id'), data.get('amount', 0)))
+
+@app.route('/api/drafts/<draft_id>/events', methods=['GET'])
+def draft_events(draft_id):
+    """Server-sent events for every turn, pick and bid. Reconnects resume from Last-Event-ID."""
+    found, error = draft_or_404(draft_id)
+    if error:
+        return error
+    since = request.headers.get('Last-Event-ID', request.args.get('since', 0, type=int), type=int)
+    subscription = found.subscribe(since)
+
+    def stream():
+        try:
+            while True:
+                try:
+                    frame = subscription.get(timeout=15)
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                yield frame
+                if b"\nevent: complete\n" in frame:
+                    return
+        finally:
+            found.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+#  SCORE HISTORY ENDPOINTS
+
+def settle_period(period):
+    """Freeze company scores and every user's total (global and per league) for `period`"""
+    totals = {history.GLOBAL: user_totals().as_dict()}
+    for league_id, found in list(league.leagues.items()):
+        totals[league_id] = dict(found.leaderboard())
+    settled = history.store.settle(period, dict(game_score), score_breakdowns, totals)
+    if settled:
+        print(f"Settled {period}: {len(game_score)} companies, {len(totals[history.GLOBAL])} users")
+    return settled
+
+if history.SETTLEMENT_ENABLED:
+    history.start_scheduler(settle_period)
+
+def history_range():
+    try:
+        return history.parse_time(request.args.get('from')), history.parse_time(request.args.get('to')), None
+    except ValueError as e:
+        return None, None, (jsonify({'error': f'Invalid time: {e}'}), 400)
+
+@app.route('/api/settlements', methods=['GET'])
+def list_settlements():
+    """Settled periods, oldest first"""
+    history.store.refresh()
+    return jsonify(history.store.periods)
+
+@app.route('/api/settlements', methods=['POST'])
+def settle_now():
+    """Settle a period immediately (defaults to the current one)"""
+    data = request.json or {}
+    period = data.get('period') or history.period_key(datetime.now(history.ET))
+    try:
+        settled = settle_period(period)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid period {period}: {e}'}), 400
+    if not settled:
+        return jsonify({'error': f'Period {period} is already settled'}), 409
+    return jsonify({'period': period}), 201
+
+@app.route('/api/users/<user_id>/history', methods=['GET'])
+def get_user_history(user_id):
+    """A user's settled totals over time (?from=&to=, ?league_id= for a league)"""
+    start, end, error = history_range()
+    if error:
+        return error
+    scope = request.args.get('league_id') or history.GLOBAL
+    return jsonify(history.store.user_history(user_id, scope, start, end))
+
+@app.route('/api/stocks/<ticker>/history', methods=['GET'])
+def get_stock_history(ticker):
+    """A company's settled scores and breakdowns over time (?from=&to=)"""
+    start, end, error = history_range()
+    if error:
+        return error
+    return jsonify(history.store.company_history(ticker.upper(), start, end))
+
 #  SOCIAL ENDPOINTS 
 
 @app.route('/api/users/<user_id>/follow/<target_user_id>', methods=['POST'])
@@ -333,13 +695,7 @@ def get_messages(user_id):
     if user_id not in users:
         return jsonify({'error': 'User not found'}), 404
     
-    messages = users[user_id].receive_messages()
-    # Convert datetime objects to strings
-    for msg in messages:
-        if 'timestamp' in msg and isinstance(msg['timestamp'], datetime):
-            msg['timestamp'] = msg['timestamp'].isoformat()
-    
-    return jsonify(messages)
+    return jsonify(users[user_id].receive_messages())
 
 @app.route('/api/users/<user_id>/messages', methods=['POST'])
 def send_message(user_id):
@@ -361,32 +717,123 @@ def send_message(user_id):
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'API is running'})
+    """Health check endpoint, including how fresh the earnings data is"""
+    last_refresh = refresh_status['last_refresh']
+    age = None
+    if last_refresh is not None:
+        age = (datetime.now(last_refresh.tzinfo) - last_refresh).total_seconds()
+
+    return jsonify({
+        'status': 'healthy',
+        'message': 'API is running',
+        'data': {
+            'last_refresh': last_refresh,
+            'age_seconds': age,
+            'refresh_duration_seconds': refresh_status['duration_s'],
+            'tickers_loaded': refresh_status['tickers_loaded'],
+            'tickers_expected': refresh_status['tickers_expected'],
+            'source': refresh_status['source'],
+            'snapshot_version': refresh_status['snapshot_version'],
+            'tickers_stale': sum(1 for h in list(main.ticker_health.values()) if h['status'] == 'stale'),
+            'tickers_failed': sum(1 for h in list(main.ticker_health.values()) if h['status'] == 'failed')
+        }
+    })
+
+@app.route('/api/health/tickers', methods=['GET'])
+def ticker_health():
+    """Per-ticker ingest health: ok, stale (serving the last good row) or failed (no data yet)"""
+    now = datetime.now(main.ET)
+    tickers = {}
+    for ticker, health in sorted(main.ticker_health.items()):
+        entry = dict(health)
+        last_success = health.get('last_success')
+        entry['stale_seconds'] = (
+            (now - datetime.fromisoformat(last_success)).total_seconds()
+            if last_success and health['status'] != 'ok' else None
+        )
+        tickers[ticker] = entry
+    status = request.args.get('status')
+    if status:
+        tickers = {t: h for t, h in tickers.items() if h['status'] == status}
+    return jsonify({
+        'retry_pending': main.retry_queue.pending(),
+        'tickers': tickers
+    })
+
+#  EXPORT ENDPOINTS
+
+def export_rows(dataset):
+    if dataset == 'companies':
+        return export.company_rows(earnings_rows, game_score, score_breakdowns)
+    if dataset == 'holdings':
+        return export.holding_rows(users, game_score)
+    return export.leaderboard_rows(user_totals().ranked(), users)
+
+@app.route('/api/export/<dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """Stream a dataset for analytics (?format=csv|arrow|parquet&columns=a,b)"""
+    if dataset not in export.COLUMNS:
+        return jsonify({'error': f'Unknown dataset: {dataset}'}), 404
+    fmt = request.args.get('format', 'csv')
+    try:
+        chunks = export.encode(dataset, export_rows(dataset), fmt, request.args.get('columns'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+    if not export.slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many exports running, try again shortly'}), 429
+
+    mimetype, extension = export.FORMATS[fmt]
+    response = Response(chunks, mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={dataset}.{extension}'})
+    # Released when the server closes the response, which also happens when the
+    # body is never iterated (HEAD, or a client gone before the first chunk)
+    response.call_on_close(export.slots.release)
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request and data-layer metrics"""
+    last_refresh = refresh_status['last_refresh']
+    freshness = metrics.REGISTRY.gauge('earnings_data_last_refresh_timestamp_seconds', 'Unix time of the last earnings refresh')
+    freshness.set(last_refresh.timestamp() if last_refresh else 0)
+    loaded = metrics.REGISTRY.gauge('earnings_data_tickers_loaded', 'Tickers with earnings data loaded')
+    loaded.set(refresh_status['tickers_loaded'])
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/intraday', methods=['GET'])
+def get_intraday():
+    """Live post-earnings reactions being scored from intraday bars"""
+    return jsonify({
+        'enabled': intraday.INTRADAY_ENABLED,
+        'interval': intraday_tracker.interval,
+        'reactions': intraday_tracker.status()
+    })
 
 #  ROOT ROUTES 
 
 @app.route('/', methods=['GET'])
 def index():
     """Serve the main website"""
-    try:
-        return send_from_directory('fantasy-earnings', 'index.html')
-    except:
+    response = assets.serve('fantasy-earnings/index.html')
+    if response is None:
         return jsonify({
             'error': 'index.html not found',
             'message': 'Make sure fantasy-earnings/index.html exists'
         }), 404
+    return response
 
 @app.route('/example', methods=['GET'])
 def serve_example():
     """Serve the example frontend HTML file"""
-    try:
-        return send_from_directory('.', 'example_frontend.html')
-    except:
+    response = assets.serve('example_frontend.html')
+    if response is None:
         return jsonify({
             'error': 'Example file not found',
             'instructions': 'Open example_frontend.html directly in your browser (file://) or place it in a static folder'
         }), 404
+    return response
 
 # FRONTEND API ENDPOINTS
 @app.route("/companies", methods=["GET"])
@@ -400,30 +847,24 @@ def companies():
 def get_company(company_id):
     """Get a single company by ID"""
     try:
-        companies_list = list(earnings_rows.items())
-        idx = int(company_id) - 1
-        if idx < 0 or idx >= len(companies_list):
+        ticker = universe.ticker_for_id(company_id)
+        data = earnings_rows.get(ticker)
+        if data is None:
             return jsonify({'error': 'Company not found'}), 404
-        
-        ticker, data = companies_list[idx]
+        idx = universe.TICKER_INDEX[ticker]
         
         # Get company tier for pricing
-        def get_tier(ticker):
-            if ticker in premium_picks:
-                return 'premium', 15
-            elif ticker in mid_tier:
-                return 'mid_tier', 10
-            elif ticker in wildcards:
-                return 'wildcard', 5
-            else:
-                return 'risky', 3
-        
-        tier, price = get_tier(ticker)
+        tier = universe.TIER_OF[ticker]
+        price = get_stock_price(ticker)
         
-        # Calculate score breakdown for this company
-        score_result = score_company_game(data)
-        score_value = score_result.get('game_score', 0)
-        breakdown = score_result.get('breakdown', {})
+        # Score breakdown computed at ingest. If it is missing, rescore in the
+        # background rather than blocking this request on upstream price fetches
+        score_value = game_score.get(ticker, 0)
+        breakdown = score_breakdowns.get(ticker)
+        score_pending = breakdown is None
+        if score_pending:
+            rescore_in_background(ticker)
+            breakdown = {}
         
         # Format daily and monthly changes as percentages
         daily_pct = data.get('daily_pct_change', 0)
@@ -438,8 +879,9 @@ def get_company(company_id):
             'tier': tier,
             'price': price,
             'earnings_date': data.get('earnings_date', 'N/A'),
-            'img': f'img/{ticker.lower()}.png',
+            'img': logo_url(ticker),
             'score': score_value,
+            'score_pending': score_pending,
             'industry': 'Technology',
             'breakdown': {
                 'eps_estimate': round(float(data.get('eps_estimate', 0)), 2),
@@ -469,25 +911,16 @@ def get_leaderboard():
     try:
         leaderboard = []
 
-        for user_id, user in users.items():
-            portfolio = user.portfolio.holdings  # ticker -> shares
-            total_score = 0.0
-
-            for ticker, shares in portfolio.items():
-                t = ticker.upper()  # normalize
-                shares = int(shares)
-
-                score_per_share = float(game_score.get(t, 0))  # default 0 if missing
-                total_score += score_per_share * shares
-
-            user_data = user.get_user()
+        for user_id, total_score in user_totals().ranked():
+            user = users.get(user_id)
+            if user is None:
+                continue
             leaderboard.append({
                 "player_id": user_id,
-                "player_name": user_data.get("username", "Unknown"),
+                "player_name": user.username or "Unknown",
                 "score": round(total_score, 2),
             })
 
-        leaderboard.sort(key=lambda x: x["score"], reverse=True)
         return jsonify(leaderboard)
 
     except Exception as e:
@@ -519,9 +952,8 @@ def get_draft():
             default_user = next((u for u in users.values() if u.username == default_username), None)
             if not default_user:
                 # Create default user
-                user_id = str(uuid.uuid4())
-                default_user = User(user_id, default_username, '', 100.0)
-                users[user_id] = default_user
+                default_user = add_user(User(str(uuid.uuid4()), default_username, '', 100.0))
+                user_id = default_user.user_id
             else:
                 user_id = default_user.user_id
         
@@ -534,12 +966,11 @@ def get_draft():
         
         # Format portfolio for frontend
         draft = []
-        ticker_list = list(earnings_rows.keys())
         for ticker, shares in portfolio.items():
             if ticker in earnings_rows:
                 data = earnings_rows[ticker]
                 draft.append({
-                    'id': ticker_list.index(ticker) + 1,
+                    'id': universe.company_id(ticker),
                     'ticker': ticker,
                     'name': data.get('stock name', ticker),
                     'shares': shares,
@@ -580,20 +1011,18 @@ def add_to_draft():
             default_username = 'default_user'
             default_user = next((u for u in users.values() if u.username == default_username), None)
             if not default_user:
-                user_id = str(uuid.uuid4())
-                default_user = User(user_id, default_username, '', 100.0)
-                users[user_id] = default_user
+                default_user = add_user(User(str(uuid.uuid4()), default_username, '', 100.0))
+                user_id = default_user.user_id
             else:
                 user_id = default_user.user_id
 
         if user_id not in users:
             return jsonify({'error': 'User not found'}), 404
 
-        if company_id < 1 or company_id > len(COMPANIES):
+        ticker = universe.ticker_for_id(company_id)
+        if ticker is None:
             return jsonify({'error': 'Company not found'}), 404
 
-        ticker = COMPANIES[company_id - 1]
-
         user = users[user_id]
         price_per_share = get_stock_price(ticker)
         total_cost = price_per_share * shares
@@ -601,8 +1030,7 @@ def add_to_draft():
         if not user.can_afford(price_per_share, shares):
             return jsonify({'error': 'Insufficient balance'}), 400
 
-        user.portfolio.add_stock(ticker, shares)
-        user.update_balance(-total_cost)
+        record_trade(ledger.DRAFT_ADD, user, ticker, shares, -total_cost, quotes.quote_cache.price(ticker))
 
         return jsonify({
             'success': True,
@@ -640,19 +1068,16 @@ def remove_from_draft(company_id):
             return jsonify({'error': 'User not found'}), 404
         
         # Get the ticker from company_id
-        companies_list = list(earnings_rows.items())
-        if int(company_id) < 1 or int(company_id) > len(companies_list):
+        ticker = universe.ticker_for_id(company_id)
+        if ticker is None:
             return jsonify({'error': 'Company not found'}), 404
         
-        ticker, _ = companies_list[int(company_id) - 1]
-        
         user = users[user_id]
         price_per_share = get_stock_price(ticker)
         refund = price_per_share * shares
         
         # Remove from portfolio
-        user.portfolio.remove_stock(ticker, shares)
-        user.update_balance(refund)
+        record_trade(ledger.DRAFT_REMOVE, user, ticker, -shares, refund)
         
         return jsonify({
             'success': True,
@@ -685,30 +1110,15 @@ def simulate_earnings():
         if user_id not in users:
             return jsonify({'error': 'User not found'}), 404
         
-        user = users[user_id]
-        user_data = user.get_user()
-        portfolio = user_data.get('portfolio', {})
-        
-        # Calculate total score
-        total_score = 0
-        results = []
-        
-        for ticker, shares in portfolio.items():
-            if ticker in game_score:
-                score_per_share = game_score[ticker]
-                total_shares_score = score_per_share * shares
-                total_score += total_shares_score
-                
-                results.append({
-                    'ticker': ticker,
-                    'shares': shares,
-                    'score_per_share': score_per_share,
-                    'total_score': total_shares_score
-                })
+        card = score_card(users[user_id])
+        results = [
+            {k: holding[k] for k in ('ticker', 'shares', 'score_per_share', 'total_score')}
+            for holding in card['portfolio_scores']
+        ]
         
         return jsonify({
             'user_id': user_id,
-            'total_score': total_score,
+            'total_score': card['total_score'],
             'results': results
         })
     except Exception as e:
@@ -721,75 +1131,78 @@ def get_friends():
     """Get list of all users (friends)"""
     try:
         friends = []
-        for user_id, user in users.items():
-            user_data = user.get_user()
-            portfolio = user_data.get('portfolio', {})
-            
-            # Calculate total score
-            total_score = 0
-            for ticker, shares in portfolio.items():
-                if ticker in game_score:
-                    total_score += game_score[ticker] * shares
-            
+        # Already sorted by score descending
+        for user_id, total_score in user_totals().ranked():
+            user = users.get(user_id)
+            if user is None:
+                continue
             friends.append({
                 'id': user_id,
-                'name': user_data.get('username', 'Unknown'),
+                'name': user.username or 'Unknown',
                 'score': total_score,
-                'companies_count': len(portfolio)
+                'companies_count': len(user.portfolio.holdings)
             })
         
-        # Sort by score descending
-        friends.sort(key=lambda x: x['score'], reverse=True)
         return jsonify(friends)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-# Static file serving routes (must come before catch-all)
+# Static file serving routes (must come before catch-all). Files are served
+# from the in-memory table in assets.py; logos built by build_assets.py are
+# content-hashed under /assets/ and cached by browsers for a year.
+def serve_asset(path):
+    response = assets.serve(path)
+    if response is None:
+        return jsonify({'error': f'File {path} not found'}), 404
+    return response
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files from root directory"""
-    return send_from_directory('.', filename)
+    return serve_asset(filename)
 
 @app.route('/style.css')
 def serve_style():
-    """Serve CSS from root directory"""
-    try:
-        return send_from_directory('.', 'style.css')
-    except:
-        return send_from_directory('fantasy-earnings', 'style.css')
+    """Serve CSS from root directory (fantasy-earnings/style.css if the root has none)"""
+    return serve_asset('style.css')
 
 @app.route('/src/<path:filename>')
 def serve_src(filename):
     """Serve JavaScript files from src directory"""
-    return send_from_directory('src', filename)
+    return serve_asset(f'src/{filename}')
 
 @app.route('/img/<path:filename>')
 def serve_img(filename):
     """Serve image files from img directory"""
-    return send_from_directory('img', filename)
+    return serve_asset(f'img/{filename}')
+
+@app.route('/assets/<path:filename>')
+def serve_built_asset(filename):
+    """Serve content-hashed build output (immutable)"""
+    return serve_asset(f'assets/{filename}')
 
 # HTML page routes
 @app.route('/search.html')
 def serve_search():
     """Serve search page"""
-    return send_from_directory('.', 'search.html')
+    return serve_asset('search.html')
 
 @app.route('/my-draft.html')
 def serve_my_draft():
     """Serve my draft page"""
-    return send_from_directory('.', 'my-draft.html')
+    return serve_asset('my-draft.html')
 
 @app.route('/company-detail.html')
 def serve_company_detail():
     """Serve company detail page"""
-    return send_from_directory('.', 'company-detail.html')
+    return serve_asset('company-detail.html')
 
 @app.route('/friends.html')
 def serve_friends():
     """Serve friends page"""
-    return send_from_directory('.', 'friends.html')
+    return serve_asset('friends.html')
 
 @app.route('/<path:filename>')
 def serve_files(filename):
@@ -797,16 +1210,8 @@ def serve_files(filename):
     # Skip API routes
     if filename.startswith('api/'):
         return jsonify({'error': 'API endpoint not found'}), 404
-    
-    # Try root directory first
-    try:
-        return send_from_directory('.', filename)
-    except:
-        # Then try fantasy-earnings folder
-        try:
-            return send_from_directory('fantasy-earnings', filename)
-        except:
-            return jsonify({'error': f'File {filename} not found'}), 404
+    return serve_asset(filename)
 
 if __name__ == '__main__':
+    # Development server only; use serve.py in production
     app.run(debug=True, port=5000)
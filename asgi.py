@@ -0,0 +1,207 @@
+"""ASGI entry point for the API.
+
+    uvicorn asgi:application --workers 4
+
+The Flask app is bridged to ASGI with its handlers running on a bounded
+thread pool (ASGI_THREADS), so the event loop keeps accepting and holding
+thousands of connections while individual handlers run. asgiref's stock
+WsgiToAsgi pins every request to a single thread, so this module has its
+own small PEP 3333 adapter built on asgiref's public sync_to_async (with
+our executor) and async_to_sync.
+Handlers never wait on upstream I/O: anything that needs live data is
+rescored in the background (see main.rescore_in_background).
+
+Live draft event streams (/api/drafts/<id>/events) are long-lived, so
+they're served directly on the event loop instead: a spectator costs a
+queue, not a handler thread.
+"""
+import asyncio
+import os
+import queue
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+import draft
+from app import app as flask_app
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", "64"))
+KEEPALIVE_SECONDS = 15
+DRAFT_EVENTS = re.compile(r"^/api/drafts/([^/]+)/events$")
+BODY_SPOOL_BYTES = 64 * 1024  # request bodies larger than this spill to a temp file
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix="asgi-handler")
+
+
+#  WSGI BRIDGE
+
+def wsgi_environ(scope, body, length):
+    """PEP 3333 environ for an ASGI http scope whose body (`length` bytes) is buffered in `body`"""
+    script_name = scope.get("root_path", "")
+    path = scope["path"]
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name.encode("utf8").decode("latin1"),
+        "PATH_INFO": path.encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = "HTTP_" + name
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    environ.setdefault("CONTENT_LENGTH", str(length))  # chunked uploads carry no header
+    return environ
+
+
+def run_wsgi(wsgi_application, scope, body, length, send):
+    """Run one request on a pool thread; `send` is the (sync-wrapped) ASGI send"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response.get("started"):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers]
+
+    def start():
+        if not response.get("started"):
+            response["started"] = True
+            send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+
+    result = wsgi_application(wsgi_environ(scope, body, length), start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                start()
+                send({"type": "http.response.body", "body": chunk, "more_body": True})
+        start()
+        send({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        close = getattr(result, "close", None)
+        if close is not None:
+            close()
+
+
+#  DRAFT EVENTS
+
+class _LoopQueue:
+    """Draft subscriber handing frames (published from any thread) to an asyncio.Queue"""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.frames = asyncio.Queue()
+
+    def put_nowait(self, frame):
+        if self.frames.qsize() >= self.maxsize:
+            raise queue.Full
+        self.loop.call_soon_threadsafe(self.frames.put_nowait, frame)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def draft_events(scope, receive, send, found):
+    """Same stream as app.draft_events, without holding a thread per subscriber"""
+    since = dict(scope["headers"]).get(b"last-event-id", b"").decode() or \
+        parse_qs(scope["query_string"].decode()).get("since", ["0"])[0]
+    try:
+        since = int(since)
+    except ValueError:
+        since = 0
+    subscriber = _LoopQueue(asyncio.get_running_loop(), draft.SUBSCRIBER_QUEUE_SIZE + len(found.events))
+    found.subscribe(since, subscriber)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+            (b"access-control-allow-origin", b"*"),
+        ]})
+        while True:
+            frame = asyncio.ensure_future(subscriber.frames.get())
+            done, _ = await asyncio.wait((frame, disconnected), timeout=KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if frame not in done:
+                frame.cancel()
+                if disconnected in done:
+                    return
+                await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+                continue
+            complete = b"\nevent: complete\n" in frame.result()
+            await send({"type": "http.response.body", "body": frame.result(), "more_body": not complete})
+            if complete:
+                return
+    finally:
+        disconnected.cancel()
+        found.unsubscribe(subscriber)
+
+
+class PooledWsgiToAsgi:
+    """ASGI application running a WSGI app's requests concurrently on `executor`"""
+
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+        if scope["method"] == "GET":
+            match = DRAFT_EVENTS.match(scope["path"])
+            found = draft.drafts.get(match.group(1)) if match else None
+            if found is not None:
+                return await draft_events(scope, receive, send, found)
+
+        with tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_BYTES) as body:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            length = body.tell()
+            body.seek(0)
+            await sync_to_async(run_wsgi, thread_sensitive=False, executor=executor)(
+                self.wsgi_application, scope, body, length, async_to_sync(send))
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = PooledWsgiToAsgi(flask_app)
@@ -0,0 +1,110 @@
+"""Static asset lookup table.
+
+At import every servable file is registered under its URL path, with its
+bytes (when small), content type and ETag, so a request is one dict
+lookup and never probes the filesystem. Registered:
+
+- pages, CSS, JS and images in the repo root, src/, img/ and
+  fantasy-earnings/ (the latter also at the root, behind root files)
+- hashed logos from build_assets.py under assets/, served immutable
+
+Unhashed files are served with an ETag and must be revalidated; hashed
+ones carry a one-year immutable Cache-Control. Only files with a static
+extension are registered, so source and data files are never served.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import Response, request, send_file
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.environ.get("ASSET_DIR", os.path.join(HERE, "assets"))
+LOGO_VARIANT = os.environ.get("LOGO_VARIANT", "200.webp")
+
+STATIC_EXTENSIONS = {".html", ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico"}
+MAX_CACHED_BYTES = 1 << 20  # larger files are streamed from disk
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("text/javascript", ".js")
+
+
+class Asset:
+    __slots__ = ("path", "mimetype", "etag", "data", "cache_control")
+
+    def __init__(self, path, cache_control):
+        with open(path, "rb") as f:
+            data = f.read()
+        self.path = path
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = hashlib.sha1(data).hexdigest()[:16]
+        self.data = data if len(data) <= MAX_CACHED_BYTES else None
+        self.cache_control = cache_control
+
+
+table = {}     # URL path (no leading slash) -> Asset
+manifest = {}  # source path -> build_assets.py entry
+
+
+def _register_dir(directory, prefix, cache_control, recursive=False, override=True):
+    root = os.path.join(HERE, directory) if not os.path.isabs(directory) else directory
+    if not os.path.isdir(root):
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        if not recursive:
+            dirnames[:] = []
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() not in STATIC_EXTENSIONS:
+                continue
+            full = os.path.join(dirpath, filename)
+            url = prefix + os.path.relpath(full, root).replace(os.sep, "/")
+            if override or url not in table:
+                table[url] = Asset(full, cache_control)
+
+
+def load():
+    """(Re)build the table and manifest"""
+    table.clear()
+    manifest.clear()
+    _register_dir(".", "", REVALIDATE)
+    _register_dir("src", "src/", REVALIDATE, recursive=True)
+    _register_dir("img", "img/", REVALIDATE, recursive=True)
+    _register_dir("fantasy-earnings", "fantasy-earnings/", REVALIDATE, recursive=True)
+    _register_dir("fantasy-earnings", "", REVALIDATE, recursive=True, override=False)
+    _register_dir(BUILD_DIR, "assets/", IMMUTABLE, recursive=True)
+    manifest_path = os.path.join(BUILD_DIR, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest.update(json.load(f))
+
+
+def url_for(source_path, variant=LOGO_VARIANT):
+    """Best built URL for a source image: sized variant, hashed original, or the source itself"""
+    entry = manifest.get(source_path)
+    if entry is None:
+        return source_path
+    built = entry["variants"].get(variant) or entry["original"]
+    return "assets/" + built
+
+
+def serve(url_path):
+    """Response for a registered asset, or None if there is no such asset"""
+    asset = table.get(url_path)
+    if asset is None:
+        return None
+    headers = {"Cache-Control": asset.cache_control, "ETag": f'"{asset.etag}"'}
+    if request.if_none_match.contains(asset.etag):
+        return Response(status=304, headers=headers)
+    if asset.data is None:
+        response = send_file(asset.path, mimetype=asset.mimetype, conditional=False, etag=False)
+        response.headers.update(headers)
+        return response
+    return Response(asset.data, mimetype=asset.mimetype, headers=headers)
+
+
+load()
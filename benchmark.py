@@ -0,0 +1,278 @@
+"""
+Benchmark harness for the game backend.
+
+Runs fully offline against replay fixtures (see market_data.py) and prints
+machine-readable JSON so results can be diffed between commits.
+
+    python benchmark.py                          # everything, synthetic fixtures
+    python benchmark.py --suite micro            # micro, pipeline or api
+    python benchmark.py --fixtures fixtures/     # use a recorded fixture set
+    python benchmark.py --populations 1000,100000 --output bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_POPULATIONS = [1000, 100000, 1000000]
+API_ENDPOINTS = ["/api/stocks", "/api/leaderboard", "/api/friends", "/api/draft"]
+
+
+#  FIXTURES
+
+def make_fixtures(root, tickers, as_of=None, days=60, seed=42):
+    """Write a deterministic synthetic replay fixture set for `tickers`"""
+    as_of = as_of or date.today()
+    rng = np.random.default_rng(seed)
+    os.makedirs(root, exist_ok=True)
+    index = pd.bdate_range(end=pd.Timestamp(as_of), periods=days)
+
+    for ticker in tickers:
+        directory = os.path.join(root, ticker)
+        os.makedirs(directory, exist_ok=True)
+
+        estimate = round(float(rng.uniform(0.1, 5.0)), 2)
+        actual = round(estimate * float(rng.normal(1.05, 0.15)), 2)
+        pd.DataFrame(
+            {"epsActual": [actual], "epsEstimate": [estimate]},
+            index=pd.DatetimeIndex([pd.Timestamp(as_of) - timedelta(days=int(rng.integers(1, 30)))], name="quarter")
+        ).to_csv(os.path.join(directory, "earnings.csv"))
+
+        returns = rng.normal(0.0005, 0.025, len(index))
+        close = 100 * np.exp(np.cumsum(returns))
+        opens = close * (1 + rng.normal(0, 0.005, len(index)))
+        pd.DataFrame({
+            "Open": opens,
+            "High": np.maximum(opens, close) * 1.01,
+            "Low": np.minimum(opens, close) * 0.99,
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 50_000_000, len(index)),
+        }, index=index).to_csv(os.path.join(directory, "daily.csv"))
+
+        with open(os.path.join(directory, "info.json"), "w") as f:
+            json.dump({"shortName": f"{ticker} Corp", "marketCap": int(rng.integers(10**9, 3 * 10**12))}, f)
+
+    with open(os.path.join(root, "manifest.json"), "w") as f:
+        json.dump({"as_of": as_of.strftime("%Y-%m-%d"), "tickers": list(tickers)}, f, indent=2)
+    return root
+
+
+def populate_users(app_module, n_users, seed=7, max_holdings=6):
+    """Fill app.users with n synthetic users holding random portfolios"""
+    from user import User
+
+    rng = random.Random(seed)
+    tickers = list(app_module.COMPANIES)
+    users = app_module.users
+    users.clear()
+    for i in range(n_users):
+        user_id = f"bench-{i}"
+        user = User(user_id, f"player{i}", "", 100.0)
+        for ticker in rng.sample(tickers, rng.randint(1, max_holdings)):
+            user.portfolio.add_stock(ticker, rng.randint(1, 3))
+        app_module.add_user(user)
+    return users
+
+
+#  TIMING
+
+def summarize(samples):
+    """Latency summary (seconds in, milliseconds out)"""
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pct(p):
+        return ordered[min(n - 1, int(p * n))] * 1000
+
+    return {
+        "iterations": n,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def time_calls(fn, iterations, budget=None):
+    """Call fn up to `iterations` times (or until `budget` seconds pass) and summarize"""
+    samples = []
+    deadline = time.perf_counter() + budget if budget else None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+        if deadline and time.perf_counter() > deadline:
+            break
+    return summarize(samples)
+
+
+def time_batch(fn, number, repeat=5):
+    """Best-of-`repeat` per-call time for a tight loop of `number` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return {"calls": number, "ns_per_call": best * 1e9, "calls_per_sec": 1 / best if best else None}
+
+
+#  SUITES
+
+def bench_micro(main):
+    rng = random.Random(1)
+    pcts = [rng.uniform(-0.2, 0.2) for _ in range(1000)]
+    eps_pairs = [(rng.uniform(0, 5), rng.uniform(0, 5)) for _ in range(1000)]
+    rows = list(main.earnings_rows.values())
+    if not rows:
+        raise RuntimeError("No earnings rows loaded; check the fixture set")
+
+    state = {"i": 0}
+
+    def next_index():
+        state["i"] = (state["i"] + 1) % 1000
+        return state["i"]
+
+    return {
+        "points_from_percent_change": time_batch(lambda: main.points_from_percent_change(pcts[next_index()]), 100000),
+        "bucket_1000_pcts": time_batch(lambda: main.buckets.SCHEDULES["daily_change"].indexes(pcts), 1000),
+        "eps_outcome": time_batch(lambda: main.eps_outcome(*eps_pairs[next_index()]), 100000),
+        "score_company_game": time_batch(lambda: main.score_company_game(rows[next_index() % len(rows)]), 200),
+        "score_universe": time_batch(lambda: main.score_universe(rows, [main.POINTS]), 200),
+    }
+
+
+def bench_pipeline(main, market_data, fixtures, runs):
+    results = {}
+
+    # Cold: a fresh provider each run, so every fixture is read from disk
+    samples = []
+    for _ in range(runs):
+        market_data.set_provider(market_data.ReplayProvider(fixtures))
+        start = time.perf_counter()
+        main.load_earnings_data()
+        samples.append(time.perf_counter() - start)
+    results["load_earnings_data_cold"] = summarize(samples)
+
+    # Warm: fixtures already in memory, measures the ingest + scoring work itself
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        main.load_earnings_data()
+        samples.append(time.perf_counter() - start)
+    results["load_earnings_data_warm"] = summarize(samples)
+    results["tickers_loaded"] = len(main.earnings_rows)
+    return results
+
+
+def bench_api(app_module, populations, iterations, budget):
+    client = app_module.app.test_client()
+    results = {}
+    for n_users in populations:
+        start = time.perf_counter()
+        populate_users(app_module, n_users)
+        setup_s = time.perf_counter() - start
+
+        user_id = next(iter(app_module.users))
+        per_endpoint = {}
+        for endpoint in API_ENDPOINTS:
+            url = f"{endpoint}?user_id={user_id}" if endpoint == "/api/draft" else endpoint
+            response = client.get(url)
+            if response.status_code != 200:
+                per_endpoint[endpoint] = {"error": response.status_code}
+                continue
+            stats = time_calls(lambda: client.get(url), iterations, budget)
+            stats["response_bytes"] = len(response.data)
+            per_endpoint[endpoint] = stats
+        results[str(n_users)] = {"setup_s": setup_s, "endpoints": per_endpoint}
+        app_module.users.clear()
+    return results
+
+
+#  ENTRY POINT
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest, scoring and API endpoints")
+    parser.add_argument("--suite", action="append", choices=["micro", "pipeline", "api"],
+                        help="suite(s) to run (default: all)")
+    parser.add_argument("--fixtures", help="replay fixture directory (default: synthetic)")
+    parser.add_argument("--populations", default=",".join(str(n) for n in DEFAULT_POPULATIONS),
+                        help="comma-separated user counts for the API suite")
+    parser.add_argument("--iterations", type=int, default=50, help="requests per endpoint")
+    parser.add_argument("--budget", type=float, default=30.0, help="max seconds per endpoint")
+    parser.add_argument("--pipeline-runs", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    suites = args.suite or ["micro", "pipeline", "api"]
+
+    synthetic = not args.fixtures
+    fixtures = args.fixtures or tempfile.mkdtemp(prefix="bench-fixtures-")
+
+    # Importing main runs ingest against MARKET_DATA, so point it at the
+    # fixtures first and keep its progress output off stdout
+    os.environ["MARKET_DATA"] = f"replay:{fixtures}"
+    with contextlib.redirect_stdout(sys.stderr):
+        import market_data
+        import main
+        import app as app_module
+
+        if synthetic:
+            make_fixtures(fixtures, main.COMPANIES)
+            market_data.set_provider(market_data.ReplayProvider(fixtures))
+            main.load_earnings_data()
+
+    report = {"environment": environment(), "fixtures": fixtures, "results": {}}
+    with contextlib.redirect_stdout(sys.stderr):
+        if "micro" in suites:
+            report["results"]["micro"] = bench_micro(main)
+        if "pipeline" in suites:
+            report["results"]["pipeline"] = bench_pipeline(main, market_data, fixtures, args.pipeline_runs)
+        if "api" in suites:
+            populations = [int(n) for n in args.populations.split(",") if n]
+            report["results"]["api"] = bench_api(app_module, populations, args.iterations, args.budget)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,98 @@
+"""Percent-change buckets for the daily and monthly price scores.
+
+Each POINTS category with price buckets ("daily_change", "monthly_change")
+has its own Schedule: sorted breakpoints and one label per interval, all
+intervals closed on the right. With the defaults
+
+    (-inf, -10%]  big_decrease
+    (-10%, -5%]   small_decrease
+    (-5%,   2%]   no_change
+    (2%,    5%]   small_increase
+    (5%,  +inf)   big_increase
+
+which is what points_from_percent_change has always done. A change is
+bucketed by bisection, and whole arrays at once with np.searchsorted, so
+every ticker can be scored under many points tables in one gather.
+Breakpoints are configurable per schedule with DAILY_BREAKPOINTS /
+MONTHLY_BREAKPOINTS (comma-separated fractions, ascending).
+"""
+import math
+import os
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+LABELS = ("big_decrease", "small_decrease", "no_change", "small_increase", "big_increase")
+DEFAULT_BREAKPOINTS = (-0.10, -0.05, 0.02, 0.05)
+NEUTRAL = "no_change"  # bucket for missing (None/NaN) changes
+
+
+class Schedule:
+    def __init__(self, breakpoints=DEFAULT_BREAKPOINTS, labels=LABELS):
+        breakpoints = tuple(float(b) for b in breakpoints)
+        if list(breakpoints) != sorted(set(breakpoints)):
+            raise ValueError(f"Breakpoints must be strictly ascending: {breakpoints}")
+        if len(labels) != len(breakpoints) + 1:
+            raise ValueError(f"{len(breakpoints)} breakpoints need {len(breakpoints) + 1} labels")
+        self.breakpoints = breakpoints
+        self.labels = tuple(labels)
+        self.neutral = self.labels.index(NEUTRAL)
+        self._edges = np.array(breakpoints, dtype=np.float64)
+
+    def index(self, pct):
+        if pct is None or math.isnan(pct):
+            return self.neutral
+        return bisect_left(self.breakpoints, pct)
+
+    def label(self, pct):
+        return self.labels[self.index(pct)]
+
+    def indexes(self, pcts):
+        """Bucket index of every change in `pcts` (None/NaN -> neutral)"""
+        pcts = np.asarray(pcts, dtype=np.float64)
+        idx = np.searchsorted(self._edges, pcts, side="left")
+        idx[np.isnan(pcts)] = self.neutral
+        return idx
+
+    def points(self, pcts, tables):
+        """Points for each change under each table: array of shape (len(tables), len(pcts))"""
+        matrix = np.array([[table[label] for label in self.labels] for table in tables], dtype=np.float64)
+        return matrix[:, self.indexes(pcts)]
+
+
+def _breakpoints_from_env(name):
+    value = os.environ.get(name)
+    if not value:
+        return DEFAULT_BREAKPOINTS
+    return tuple(float(b) for b in value.split(","))
+
+
+SCHEDULES = {
+    "daily_change": Schedule(_breakpoints_from_env("DAILY_BREAKPOINTS")),
+    "monthly_change": Schedule(_breakpoints_from_env("MONTHLY_BREAKPOINTS")),
+}
+
+# (category, ticker, date) -> (pct, label); a change only moves intraday
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def label(category, pct, ticker=None, date=None):
+    """Bucket label for `pct` under `category`'s schedule, memoized per (ticker, date)"""
+    schedule = SCHEDULES[category]
+    if ticker is None:
+        return schedule.label(pct)
+    key = (category, ticker, date)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == pct:
+        return hit[1]
+    result = schedule.label(pct)
+    with _cache_lock:
+        _cache[key] = (pct, result)
+    return result
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,95 @@
+"""
+Build-time asset step: content-hashed logos with resized WebP variants.
+
+    python build_assets.py                 # writes assets/ and assets/manifest.json
+    python build_assets.py --sizes 200,400 --quality 80
+
+Every img/*.png is copied to assets/img/<name>.<hash>.png, and resized
+(with Pillow) to each width in --sizes as
+assets/img/<name>.<hash>.<width>.webp. The hash is of the source bytes, so
+a URL never changes meaning and can be cached forever. The manifest maps
+each source path to its hashed files; assets.py serves from it.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = "img"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:
+    Image = None
+    UnidentifiedImageError = None
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()[:10]
+
+
+def write_variant(src_path, out_path, width, quality):
+    with Image.open(src_path) as im:
+        if im.width > width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        im.save(out_path, "WEBP", quality=quality, method=6)
+
+
+def build(out_dir, sizes, quality):
+    manifest = {}
+    source_root = os.path.join(HERE, SOURCE_DIR)
+    os.makedirs(os.path.join(out_dir, SOURCE_DIR), exist_ok=True)
+    for filename in sorted(os.listdir(source_root)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        src_path = os.path.join(source_root, filename)
+        with open(src_path, "rb") as f:
+            data = f.read()
+        digest = content_hash(data)
+        base = f"{SOURCE_DIR}/{stem}.{digest}"
+
+        original = f"{base}{ext.lower()}"
+        with open(os.path.join(out_dir, original), "wb") as f:
+            f.write(data)
+
+        variants = {}
+        if Image is not None:
+            try:
+                for width in sizes:
+                    name = f"{base}.{width}.webp"
+                    write_variant(src_path, os.path.join(out_dir, name), width, quality)
+                    variants[f"{width}.webp"] = name
+            except (UnidentifiedImageError, OSError) as e:
+                # e.g. an SVG saved as .png: serve the hashed original only
+                print(f"Skipping WebP variants for {filename}: {e}")
+                variants = {}
+
+        manifest[f"{SOURCE_DIR}/{filename}"] = {"hash": digest, "original": original, "variants": variants}
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build hashed, resized logo assets")
+    parser.add_argument("--out", default=os.path.join(HERE, "assets"))
+    parser.add_argument("--sizes", default="200,400", help="WebP widths (400 covers 2x displays at 200px)")
+    parser.add_argument("--quality", type=int, default=80)
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    if Image is None and sizes:
+        parser.error("Pillow is required for WebP variants (pip install Pillow); "
+                     "pass --sizes '' to write hashed originals only")
+    manifest = build(args.out, sizes, args.quality)
+    print(f"Built {len(manifest)} logos into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""Live drafts for leagues: snake and auction.
+
+A draft runs over a league's members in a fixed pick order. Snake drafts
+reverse the order every round; auction drafts rotate nominations and sell
+each ticker to the highest bidder when the bid clock runs out. Every
+ticker can be owned by one member of the league at most.
+
+Pick state is a handful of flat arrays (ticker ids, member indexes,
+prices) plus a one-byte-per-ticker "taken" map, so a draft is a few
+hundred bytes and a pick is a constant-time check and append under the
+draft's lock. All draft clocks in the process share one timer thread.
+Each committed pick is encoded once as a server-sent event and pushed to
+every subscriber's queue.
+"""
+import heapq
+import json
+import math
+import queue
+import random
+import threading
+import time
+import uuid
+from array import array
+
+import league
+import main
+import universe
+
+TICKER_ID = universe.TICKER_INDEX
+
+SNAKE = "snake"
+AUCTION = "auction"
+DEFAULT_PICK_SECONDS = 60.0
+DEFAULT_BID_SECONDS = 15.0
+MIN_BID = 1.0
+SUBSCRIBER_QUEUE_SIZE = 256
+MAX_UINT16 = 0xFFFF  # rounds, slots, member indexes and ticker ids are array("H")
+
+
+#  CLOCK
+
+class DraftClock:
+    """One thread firing every draft's deadlines from a heap"""
+
+    def __init__(self):
+        self.heap = []  # (deadline, draft_id, token)
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def schedule(self, deadline, draft_id, token):
+        with self.cond:
+            heapq.heappush(self.heap, (deadline, draft_id, token))
+            self.cond.notify()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="draft-clock", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                _, draft_id, token = heapq.heappop(self.heap)
+            draft = drafts.get(draft_id)
+            if draft is not None:
+                try:
+                    draft.expire(token)
+                except Exception as e:
+                    print(f"Draft {draft_id} timer failed: {e}")
+
+
+clock = DraftClock()
+
+
+#  DRAFT
+
+class Draft:
+    def __init__(self, draft_id, league_obj, mode=SNAKE, rounds=5, order=None,
+                 pick_seconds=DEFAULT_PICK_SECONDS, bid_seconds=DEFAULT_BID_SECONDS):
+        if mode not in (SNAKE, AUCTION):
+            raise ValueError(f"Unknown draft mode: {mode}")
+        members = list(order) if order else list(league_obj.members)
+        if not members:
+            raise ValueError("League has no members to draft")
+        unknown = [m for m in members if m not in league_obj.members]
+        if unknown:
+            raise ValueError(f"Not league members: {', '.join(unknown)}")
+        if order is None:
+            random.shuffle(members)
+        if not 1 <= int(rounds) <= MAX_UINT16:
+            raise ValueError(f"Rounds must be between 1 and {MAX_UINT16}")
+        if len(members) > MAX_UINT16:
+            raise ValueError(f"A draft can have at most {MAX_UINT16} members")
+        for name, seconds in (("pick_seconds", pick_seconds), ("bid_seconds", bid_seconds)):
+            if not (math.isfinite(float(seconds)) and float(seconds) > 0):
+                raise ValueError(f"{name} must be a positive number of seconds")
+
+        self.draft_id = draft_id
+        self.league = league_obj
+        self.mode = mode
+        self.rounds = int(rounds)
+        self.pick_seconds = float(pick_seconds)
+        self.bid_seconds = float(bid_seconds)
+        self.members = members
+        self.member_index = {user_id: i for i, user_id in enumerate(members)}
+        self.status = "pending"  # pending -> live -> complete
+        self.lock = threading.Lock()
+
+        # Compact pick state
+        self.taken = bytearray(len(main.COMPANIES))
+        self.pick_ticker = array("H")
+        self.pick_member = array("H")
+        self.pick_price = array("d")
+        self.budget_left = array("d", (league_obj.rules.budget - league_obj.members[m].spent for m in members))
+        self.slots_left = array("H", [self.rounds] * len(members))
+        # Per-league exclusivity: anything already on a roster is off the board
+        for roster in league_obj.members.values():
+            for ticker in roster.holdings:
+                if ticker in TICKER_ID:
+                    self.taken[TICKER_ID[ticker]] = 1
+
+        # Auction lot in progress: (ticker id, high bid, high bidder index) or None
+        self.lot = None
+        self.nominator = 0
+        self.turn = 0  # snake turns taken, including skipped ones
+        self.deadline = None
+        self.token = 0
+
+        # Broadcast
+        self.events = []  # encoded frames, replayed to late subscribers
+        self.subscribers = []
+
+    # ORDER
+
+    def total_picks(self):
+        return self.rounds * len(self.members)
+
+    def on_the_clock(self):
+        """Member index whose turn it is (snake: to pick, auction: to nominate)"""
+        if self.mode == AUCTION:
+            return self.nominator
+        n = len(self.members)
+        rnd, pos = divmod(self.turn, n)
+        return n - 1 - pos if rnd % 2 else pos
+
+    # BROADCAST
+
+    def subscribe(self, since=0, q=None):
+        """
+        Queue receiving every frame after event `since` (frames already sent are
+        queued first). `q` can be any object with a queue.Queue-style put_nowait.
+        """
+        if q is None:
+            q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE + len(self.events))
+        with self.lock:
+            for frame in self.events[max(0, int(since)):]:
+                q.put_nowait(frame)
+            self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            if q in self.subscribers:
+                self.subscribers.remove(q)
+
+    def _publish(self, kind, payload):
+        # Caller holds self.lock. Encode once, fan out to every subscriber.
+        seq = len(self.events) + 1
+        payload = dict(payload, type=kind, seq=seq, draft_id=self.draft_id)
+        frame = f"id: {seq}\nevent: {kind}\ndata: {json.dumps(payload)}\n\n".encode()
+        self.events.append(frame)
+        for q in list(self.subscribers):
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                self.subscribers.remove(q)  # a stalled client; it can reconnect with Last-Event-ID
+
+    # LIFECYCLE
+
+    def start(self):
+        with self.lock:
+            if self.status != "pending":
+                raise ValueError(f"Draft is already {self.status}")
+            self.status = "live"
+            self._publish("start", {"mode": self.mode, "order": self.members, "rounds": self.rounds})
+            self._next_turn()
+
+    def _arm(self, seconds):
+        self.token += 1
+        self.deadline = time.monotonic() + seconds
+        clock.schedule(self.deadline, self.draft_id, self.token)
+
+    def _next_turn(self):
+        done = self.turn >= self.total_picks() if self.mode == SNAKE else not any(self.slots_left)
+        if done or self.taken.find(0) == -1:
+            self.status = "complete"
+            self.deadline = None
+            self.token += 1
+            self._publish("complete", {"picks": len(self.pick_ticker)})
+            return
+        if self.mode == AUCTION:
+            # Skip nominators with a full roster
+            while not self.slots_left[self.nominator]:
+                self.nominator = (self.nominator + 1) % len(self.members)
+        self._arm(self.pick_seconds)
+        self._publish("turn", {"user_id": self.members[self.on_the_clock()], "seconds": self.pick_seconds})
+
+    def _check_ticker(self, ticker):
+        tid = TICKER_ID.get(ticker)
+        if tid is None:
+            raise ValueError(f"Stock {ticker} not available")
+        if self.taken[tid]:
+            raise ValueError(f"{ticker} is already taken in this league")
+        return tid
+
+    def _commit(self, member, tid, price):
+        # Caller holds self.lock
+        ticker = main.COMPANIES[tid]
+        user_id = self.members[member]
+        self.taken[tid] = 1
+        self.pick_ticker.append(tid)
+        self.pick_member.append(member)
+        self.pick_price.append(price)
+        self.budget_left[member] -= price
+        self.slots_left[member] -= 1
+        with self.league.lock:
+            roster = self.league.members.get(user_id)
+            if roster is not None:
+                roster.holdings[ticker] = roster.holdings.get(ticker, 0) + 1
+                roster.spent += price
+                self.league._dirty = True
+        self._publish("pick", {
+            "pick": len(self.pick_ticker),
+            "user_id": user_id,
+            "ticker": ticker,
+            "price": price
+        })
+
+    # SNAKE
+
+    def pick(self, user_id, ticker):
+        with self.lock:
+            if self.mode != SNAKE or self.status != "live":
+                raise ValueError("No snake pick is open")
+            member = self.member_index.get(user_id)
+            if member != self.on_the_clock():
+                raise ValueError("It is not your turn")
+            tid = self._check_ticker(ticker)
+            price = self.league.rules.price_of(ticker)
+            if price > self.budget_left[member]:
+                raise ValueError(f"Insufficient budget. You have ${self.budget_left[member]:.2f} remaining")
+            self._commit(member, tid, price)
+            self.turn += 1
+            self._next_turn()
+            return len(self.pick_ticker)
+
+    # AUCTION
+
+    def nominate(self, user_id, ticker, amount=MIN_BID):
+        with self.lock:
+            if self.mode != AUCTION or self.status != "live" or self.lot is not None:
+                raise ValueError("No nomination is open")
+            member = self.member_index.get(user_id)
+            if member != self.nominator:
+                raise ValueError("It is not your turn to nominate")
+            tid = self._check_ticker(ticker)
+            amount = float(amount)
+            if amount < MIN_BID or amount > self.budget_left[member]:
+                raise ValueError(f"Opening bid must be between ${MIN_BID:.2f} and ${self.budget_left[member]:.2f}")
+            self.lot = (tid, amount, member)
+            self._arm(self.bid_seconds)
+            self._publish("nominate", {"user_id": user_id, "ticker": ticker, "amount": amount, "seconds": self.bid_seconds})
+
+    def bid(self, user_id, amount):
+        with self.lock:
+            if self.lot is None:
+                raise ValueError("Nothing is up for auction")
+            member = self.member_index.get(user_id)
+            if member is None:
+                raise ValueError("Not in this draft")
+            tid, high, _ = self.lot
+            amount = float(amount)
+            if amount <= high:
+                raise ValueError(f"Bid must beat ${high:.2f}")
+            if amount > self.budget_left[member] or not self.slots_left[member]:
+                raise ValueError("You cannot afford this bid")
+            self.lot = (tid, amount, member)
+            self._arm(self.bid_seconds)  # every bid resets the clock
+            self._publish("bid", {"user_id": user_id, "ticker": main.COMPANIES[tid], "amount": amount})
+
+    def _close_lot(self):
+        tid, amount, member = self.lot
+        self.lot = None
+        self._commit(member, tid, amount)
+        self.nominator = (self.nominator + 1) % len(self.members)
+        self._next_turn()
+
+    # TIMERS
+
+    def _best_available(self, member, max_price):
+        scores = self.league.company_scores()
+        best = None
+        for ticker, tid in TICKER_ID.items():
+            if self.taken[tid] or self.league.rules.price_of(ticker) > max_price:
+                continue
+            if best is None or scores.get(ticker, 0) > scores.get(best, 0):
+                best = ticker
+        return best
+
+    def expire(self, token):
+        """Clock callback: autopick, auto-nominate or close the auction lot"""
+        with self.lock:
+            if token != self.token or self.status != "live":
+                return  # superseded by a pick/bid since it was scheduled
+            if self.lot is not None:
+                self._close_lot()
+                return
+            member = self.on_the_clock()
+            budget = self.budget_left[member] if self.mode == SNAKE else self.budget_left[member] - MIN_BID
+            ticker = self._best_available(member, budget)
+            if self.mode == SNAKE:
+                if ticker is None:
+                    # Nothing affordable: the member forfeits this pick
+                    self._publish("skip", {"user_id": self.members[member]})
+                else:
+                    self._commit(member, TICKER_ID[ticker], self.league.rules.price_of(ticker))
+                self.turn += 1
+                self._next_turn()
+            elif ticker is None or self.budget_left[member] < MIN_BID:
+                self.slots_left[member] = 0
+                self._publish("skip", {"user_id": self.members[member]})
+                self.nominator = (self.nominator + 1) % len(self.members)
+                self._next_turn()
+            else:
+                self.lot = (TICKER_ID[ticker], MIN_BID, member)
+                self._arm(self.bid_seconds)
+                self._publish("nominate", {"user_id": self.members[member], "ticker": ticker,
+                                           "amount": MIN_BID, "seconds": self.bid_seconds, "auto": True})
+
+    # STATE
+
+    def get_draft(self):
+        with self.lock:
+            picks = [
+                {"user_id": self.members[m], "ticker": main.COMPANIES[t], "price": p}
+                for t, m, p in zip(self.pick_ticker, self.pick_member, self.pick_price)
+            ]
+            lot = None
+            if self.lot is not None:
+                tid, amount, member = self.lot
+                lot = {"ticker": main.COMPANIES[tid], "amount": amount, "user_id": self.members[member]}
+            return {
+                "draft_id": self.draft_id,
+                "league_id": self.league.league_id,
+                "mode": self.mode,
+                "status": self.status,
+                "rounds": self.rounds,
+                "order": self.members,
+                "on_the_clock": self.members[self.on_the_clock()] if self.status == "live" else None,
+                "seconds_left": max(0.0, self.deadline - time.monotonic()) if self.deadline and self.status == "live" else None,
+                "lot": lot,
+                "picks": picks,
+                "budget_left": dict(zip(self.members, self.budget_left)),
+                "available": [t for t, tid in TICKER_ID.items() if not self.taken[tid]]
+            }
+
+
+#  REGISTRY
+
+drafts = {}         # draft_id -> Draft
+league_drafts = {}  # league_id -> draft_id of its latest draft
+
+
+def active_draft(league_id):
+    """The league's pending or live draft, or None"""
+    current = drafts.get(league_drafts.get(league_id))
+    return current if current is not None and current.status != "complete" else None
+
+
+def create_draft(league_id, **options):
+    league_obj = league.leagues[league_id]
+    if active_draft(league_id) is not None:
+        raise ValueError("League already has a draft in progress")
+    draft = Draft(str(uuid.uuid4()), league_obj, **options)
+    drafts[draft.draft_id] = draft
+    league_drafts[league_id] = draft.draft_id
+    return draft
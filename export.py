@@ -0,0 +1,294 @@
+"""Bulk exports for analytics: companies, holdings and the leaderboard.
+
+Rows are generated straight from the in-memory structures a batch at a
+time and encoded as they go, so an export of any size holds only one
+batch in memory:
+
+- csv      chunked text/csv
+- arrow    Arrow IPC stream, one record batch per chunk (needs pyarrow)
+- parquet  one row group per chunk (needs pyarrow)
+
+Any dataset can be narrowed to a subset of its columns. Exports run over
+HTTP (/api/export/<dataset>, limited to EXPORT_CONCURRENCY at once so
+analysts can't crowd out players) or offline without a web server:
+
+    python export.py companies --format parquet --out companies.parquet
+    python export.py holdings --columns user_id,ticker,shares > holdings.csv
+
+Offline, scores come from ingest (or EARNINGS_SNAPSHOT) and users from
+the trade ledger (LEDGER_DIR).
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import threading
+
+import universe
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "10000"))
+EXPORT_CONCURRENCY = int(os.environ.get("EXPORT_CONCURRENCY", "1"))
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Column name -> type ("str", "float" or "int"), in export order
+COLUMNS = {
+    "companies": {
+        "ticker": "str", "name": "str", "tier": "str", "market_cap": "float",
+        "earnings_date": "str", "eps_estimate": "float", "eps_actual": "float",
+        "eps_result": "str", "surprise_pct": "float", "bonus_flags": "str",
+        "daily_pct_change": "float", "monthly_price_change": "float",
+        "game_score": "float", "eps_points": "float", "daily_points": "float",
+        "monthly_points": "float", "bonus_points": "float",
+    },
+    "holdings": {
+        "user_id": "str", "username": "str", "ticker": "str", "shares": "int",
+        "entry_price": "float", "score_per_share": "float", "total_score": "float",
+    },
+    "leaderboard": {
+        "rank": "int", "user_id": "str", "username": "str", "score": "float",
+        "companies_count": "int",
+    },
+}
+
+slots = threading.BoundedSemaphore(EXPORT_CONCURRENCY)
+
+
+#  ROW SOURCES (one dict per row; keys are a superset of COLUMNS[dataset])
+
+def company_rows(earnings_rows, game_score, breakdowns):
+    for ticker in universe.TICKERS:
+        row = earnings_rows.get(ticker)
+        if row is None:
+            continue
+        breakdown = breakdowns.get(ticker, {})
+        yield {
+            "ticker": ticker,
+            "name": row.get("stock name"),
+            "tier": universe.TIER_OF.get(ticker),
+            "market_cap": row.get("market_cap"),
+            "earnings_date": row.get("earnings_date"),
+            "eps_estimate": row.get("eps_estimate"),
+            "eps_actual": row.get("eps_actual"),
+            "eps_result": row.get("eps_result"),
+            "surprise_pct": row.get("surprise_pct"),
+            "bonus_flags": "|".join(row.get("bonus_flags") or ()),
+            "daily_pct_change": row.get("daily_pct_change"),
+            "monthly_price_change": row.get("monthly_price_change"),
+            "game_score": game_score.get(ticker),
+            "eps_points": breakdown.get("eps"),
+            "daily_points": breakdown.get("daily percent change"),
+            "monthly_points": breakdown.get("monthly percent change"),
+            "bonus_points": breakdown.get("bonus"),
+        }
+
+
+def holding_rows(users, game_score):
+    for user_id in list(users):
+        user = users.get(user_id)
+        if user is None:
+            continue
+        portfolio = user.portfolio
+        for ticker, shares in list(portfolio.holdings.items()):
+            score = float(game_score.get(ticker, 0))
+            yield {
+                "user_id": user_id,
+                "username": user.username,
+                "ticker": ticker,
+                "shares": shares,
+                "entry_price": portfolio.entry_prices.get(ticker),
+                "score_per_share": score,
+                "total_score": score * shares,
+            }
+
+
+def leaderboard_rows(ranked, users):
+    """ranked: [(user_id, score)] best first, e.g. rescore.totals.ranked()"""
+    rank = 0
+    for user_id, score in ranked:
+        user = users.get(user_id)
+        if user is None:
+            continue
+        rank += 1
+        yield {
+            "rank": rank,
+            "user_id": user_id,
+            "username": user.username,
+            "score": round(score, 2),
+            "companies_count": len(user.portfolio.holdings),
+        }
+
+
+#  ENCODING
+
+def parse_columns(dataset, columns):
+    """Projected column list; raises KeyError for an unknown dataset and ValueError for unknown columns"""
+    available = COLUMNS[dataset]
+    if not columns:
+        return list(available)
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns for {dataset}: {', '.join(unknown)}")
+    return list(columns)
+
+
+def _batches(rows, columns, batch_rows):
+    batch = []
+    for row in rows:
+        batch.append([row.get(c) for c in columns])
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _encode_csv(rows, columns, batch_rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for batch in _batches(rows, columns, batch_rows):
+        writer.writerows(batch)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that hands pyarrow's output back as chunks"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+ARROW_TYPES = {"str": "string", "float": "float64", "int": "int64"}
+
+
+def _arrow_schema(dataset, columns):
+    types = COLUMNS[dataset]
+    return pa.schema([(c, getattr(pa, ARROW_TYPES[types[c]])()) for c in columns])
+
+
+def _encode_arrow(rows, columns, batch_rows, schema, parquet):
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if parquet else pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in _batches(rows, columns, batch_rows):
+            arrays = [pa.array([r[i] for r in batch], type=schema.field(i).type) for i in range(len(columns))]
+            record_batch = pa.record_batch(arrays, schema=schema)
+            if parquet:
+                writer.write_table(pa.Table.from_batches([record_batch]))
+            else:
+                writer.write_batch(record_batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def encode(dataset, rows, fmt="csv", columns=None, batch_rows=BATCH_ROWS):
+    """Generator of encoded byte chunks for `rows` of `dataset`"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+    columns = parse_columns(dataset, columns)
+    if fmt == "csv":
+        return _encode_csv(rows, columns, batch_rows)
+    if pa is None:
+        raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+    return _encode_arrow(rows, columns, batch_rows, _arrow_schema(dataset, columns), fmt == "parquet")
+
+
+#  CLI
+
+def _offline_users():
+    import ledger
+    from user import User
+    if not ledger.LEDGER_DIR:
+        print("LEDGER_DIR not set: no users to export", file=sys.stderr)
+        return {}
+    return ledger.Ledger(ledger.LEDGER_DIR).recover(
+        lambda r: User(r["user_id"], r["username"], r["email"], r["initial_balance"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export game data for analytics")
+    parser.add_argument("dataset", choices=sorted(COLUMNS))
+    parser.add_argument("--format", default="csv", choices=sorted(FORMATS))
+    parser.add_argument("--columns", help="comma-separated subset of columns")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.format != "csv" and pa is None:
+        parser.error(f"{args.format} export needs pyarrow (pip install pyarrow)")
+    try:
+        columns = parse_columns(args.dataset, args.columns)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Progress output from ingest goes to stderr so stdout stays clean for the export
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    sys.argv = sys.argv[:1]  # main.py inspects argv at import
+    try:
+        import main as game
+        import rescore
+        if args.dataset == "companies":
+            rows = company_rows(game.earnings_rows, game.game_score, game.score_breakdowns)
+        else:
+            users = _offline_users()
+            if args.dataset == "holdings":
+                rows = holding_rows(users, game.game_score)
+            else:
+                rescore.totals.sync(users, game.game_score, game.refresh_status["data_version"])
+                rows = leaderboard_rows(rescore.totals.ranked(), users)
+    finally:
+        sys.stdout = stdout
+
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        for chunk in encode(args.dataset, rows, args.format, columns):
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
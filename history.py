@@ -0,0 +1,246 @@
+"""Score history: end-of-period settlement into an append-only store.
+
+At each period boundary (SETTLEMENT_PERIOD=daily|weekly, at
+SETTLEMENT_TIME Eastern) the settlement job freezes every company's score
+breakdown and every user's total, globally and per league, and appends
+one JSON line per period to HISTORY_DIR/companies.ndjson and
+HISTORY_DIR/users.ndjson. Nothing is ever rewritten.
+
+Chart queries never recompute history: the files are indexed into
+per-series timestamp/value arrays as they are read, and a range query is
+two bisects and a slice. Other processes pick up new settlements by
+reading only the bytes appended since they last looked.
+
+Enable the scheduler in exactly one process with SETTLEMENT=1.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+from market_data import ET
+
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "history")
+SETTLEMENT_ENABLED = os.environ.get("SETTLEMENT", "").lower() in ("1", "true", "yes")
+SETTLEMENT_PERIOD = os.environ.get("SETTLEMENT_PERIOD", "daily")
+SETTLEMENT_TIME = os.environ.get("SETTLEMENT_TIME", "16:30")
+
+GLOBAL = "global"  # scope of user totals outside any league
+
+
+def period_key(moment, period=SETTLEMENT_PERIOD):
+    """Label of the period ending at `moment`"""
+    if period == "weekly":
+        year, week, _ = moment.isocalendar()
+        return f"{year}-W{week:02d}"
+    return moment.strftime("%Y-%m-%d")
+
+
+def period_end(label):
+    """Last day of the period `label` ("2024-05-03" or "2024-W18"); ValueError if it is neither"""
+    if "-W" in label:
+        year, _, week = label.partition("-W")
+        return date.fromisocalendar(int(year), int(week), 5)  # settled on Fridays
+    return date.fromisoformat(label)
+
+
+def next_boundary(now, period=SETTLEMENT_PERIOD, at=SETTLEMENT_TIME):
+    """Next settlement time strictly after `now` (tz-aware, ET)"""
+    hour, minute = (int(x) for x in at.split(":"))
+    boundary = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if period == "weekly":
+        boundary += timedelta(days=(4 - boundary.weekday()) % 7)  # Fridays
+        step = timedelta(days=7)
+    else:
+        step = timedelta(days=1)
+    while boundary <= now:
+        boundary += step
+    return boundary
+
+
+class Series:
+    """Timestamps and values of one series, appended in time order"""
+
+    __slots__ = ("ts", "values", "extra")
+
+    def __init__(self):
+        self.ts = array("d")
+        self.values = array("d")
+        self.extra = []  # per-point payload (period label, breakdown)
+
+    def append(self, ts, value, extra):
+        self.ts.append(ts)
+        self.values.append(value)
+        self.extra.append(extra)
+
+    def range(self, start=None, end=None):
+        lo = 0 if start is None else bisect_left(self.ts, start)
+        hi = len(self.ts) if end is None else bisect_right(self.ts, end)
+        return [(self.ts[i], self.values[i], self.extra[i]) for i in range(lo, hi)]
+
+
+class HistoryStore:
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.companies = {}  # ticker -> Series
+        self.users = {}      # (scope, user_id) -> Series
+        self.periods = []    # settled period labels, oldest first
+        self.settled = set()  # the same labels, for duplicate checks
+        self.pending_users = {}  # period -> newest users line not yet committed by a companies line
+        self.users_indexed = set()
+        self.settle_lock = threading.Lock()
+        self.offsets = {"companies": 0, "users": 0}
+
+    def _path(self, name):
+        return os.path.join(self.root, name + ".ndjson")
+
+    # READ SIDE
+
+    def refresh(self):
+        """
+        Index lines appended since the last call (by this or another process).
+
+        A period's users line is written before its companies line, and only
+        counts once the companies line is there: a settlement that died in
+        between leaves a users line that is never indexed, and the retry's
+        newer users line replaces it. Companies are read first so any users
+        line written before a committed period is already on disk.
+        """
+        with self.lock:
+            for name in ("companies", "users"):
+                path = self._path(name)
+                try:
+                    if os.path.getsize(path) == self.offsets[name]:
+                        continue
+                except OSError:
+                    continue
+                with open(path, "rb") as f:
+                    f.seek(self.offsets[name])
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # a writer is mid-append; pick it up next time
+                        self.offsets[name] += len(line)
+                        self._index(name, json.loads(line))
+            for period in [p for p in self.pending_users if p in self.settled]:
+                self._index_users(self.pending_users.pop(period))
+
+    def _index(self, name, record):
+        ts = record["settled_at"]
+        period = record["period"]
+        if name == "companies":
+            for ticker, entry in record["scores"].items():
+                self.companies.setdefault(ticker, Series()).append(
+                    ts, entry["score"], {"period": period, "breakdown": entry["breakdown"]})
+            self.periods.append(period)
+            self.settled.add(period)
+        elif period not in self.users_indexed:
+            self.pending_users[period] = record
+
+    def _index_users(self, record):
+        period = record["period"]
+        for scope, totals in record["totals"].items():
+            for user_id, total in totals.items():
+                self.users.setdefault((scope, user_id), Series()).append(record["settled_at"], total, {"period": period})
+        self.users_indexed.add(period)
+
+    def user_history(self, user_id, scope=GLOBAL, start=None, end=None):
+        self.refresh()
+        series = self.users.get((scope, user_id))
+        if series is None:
+            return []
+        return [{"t": ts, "period": extra["period"], "score": value} for ts, value, extra in series.range(start, end)]
+
+    def company_history(self, ticker, start=None, end=None):
+        self.refresh()
+        series = self.companies.get(ticker)
+        if series is None:
+            return []
+        return [{"t": ts, "period": extra["period"], "score": value, "breakdown": extra["breakdown"]}
+                for ts, value, extra in series.range(start, end)]
+
+    def last_period(self):
+        self.refresh()
+        return self.periods[-1] if self.periods else None
+
+    # WRITE SIDE
+
+    def _append(self, name, record):
+        os.makedirs(self.root, exist_ok=True)
+        line = (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode()
+        # A single O_APPEND write keeps concurrent appenders from interleaving
+        fd = os.open(self._path(name), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def settle(self, period, game_score, score_breakdowns, totals, settled_at=None):
+        """
+        Freeze one period. totals: scope -> {user_id: total}.
+        Returns False if the period was already settled; raises ValueError
+        for a label that doesn't parse or isn't after the last settled period.
+        """
+        with self.settle_lock:
+            self.refresh()
+            if period in self.settled:
+                return False
+            end = period_end(period)
+            if self.periods and end <= period_end(self.periods[-1]):
+                raise ValueError(f"Period {period} is not after the last settled period {self.periods[-1]}")
+            self._settle(period, game_score, score_breakdowns, totals, settled_at)
+        return True
+
+    def _settle(self, period, game_score, score_breakdowns, totals, settled_at):
+        settled_at = settled_at or time.time()
+        scores = {
+            ticker: {"score": float(score), "breakdown": score_breakdowns.get(ticker, {})}
+            for ticker, score in game_score.items()
+        }
+        # Users first: the companies line commits the period (see refresh)
+        self._append("users", {"period": period, "settled_at": settled_at, "totals": totals})
+        self._append("companies", {"period": period, "settled_at": settled_at, "scores": scores})
+        self.refresh()
+
+
+store = HistoryStore()
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO date/datetime or a number; None passes through"""
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=ET)
+        return moment.timestamp()
+
+
+_scheduler = None
+
+
+def start_scheduler(settle_fn, period=SETTLEMENT_PERIOD, at=SETTLEMENT_TIME):
+    """Call settle_fn(period_label) at every boundary, in a background thread"""
+    global _scheduler
+    if _scheduler is not None and _scheduler.is_alive():
+        return _scheduler
+
+    def loop():
+        while True:
+            now = datetime.now(ET)
+            boundary = next_boundary(now, period, at)
+            time.sleep(max(0.0, (boundary - now).total_seconds()))
+            try:
+                settle_fn(period_key(boundary, period))
+            except Exception as e:
+                print(f"Settlement failed: {e}")
+
+    _scheduler = threading.Thread(target=loop, name="settlement", daemon=True)
+    _scheduler.start()
+    return _scheduler
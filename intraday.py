@@ -0,0 +1,282 @@
+"""Intraday market-reaction scoring from minute bars.
+
+For tickers reporting earnings today (or after yesterday's close), a
+background poller pulls 1m/5m bars (pre/post market included) in one
+batched request, appends them to a fixed-size ring buffer per ticker and
+re-buckets the reaction against the pre-announcement close. When the
+bucket moves, only the ticker's "daily percent change" points are swapped
+in game_score, so scores move within a poll of the bar arriving instead
+of at the next day's open.
+
+    INTRADAY=1                 enable the poller
+    INTRADAY_INTERVAL=1m       bar size (1m or 5m)
+    INTRADAY_POLL_SECONDS=60
+    INTRADAY_TICKERS=AAPL,NFLX always track these (in addition to the calendar)
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import market_data
+import metrics
+
+INTRADAY_ENABLED = os.environ.get("INTRADAY", "").lower() in ("1", "true", "yes")
+INTRADAY_INTERVAL = os.environ.get("INTRADAY_INTERVAL", "1m")
+INTRADAY_POLL_SECONDS = float(os.environ.get("INTRADAY_POLL_SECONDS", "60"))
+INTRADAY_TICKERS = [t.strip().upper() for t in os.environ.get("INTRADAY_TICKERS", "").split(",") if t.strip()]
+
+# Two full extended-hours sessions of 1m bars (4:00-20:00 ET)
+RING_CAPACITY = 2 * 16 * 60
+
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),       # epoch seconds, bar start
+    ("open", "<f4"),
+    ("high", "<f4"),
+    ("low", "<f4"),
+    ("close", "<f4"),
+    ("volume", "<f4"),
+])
+
+
+class BarRing:
+    """Fixed-capacity ring buffer of bars; appends are O(1) and never allocate"""
+
+    __slots__ = ("bars", "start", "size")
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.bars = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self.bars)
+
+    @property
+    def last_ts(self):
+        if not self.size:
+            return None
+        return int(self.bars["ts"][(self.start + self.size - 1) % self.capacity])
+
+    def append(self, ts, o, h, l, c, v):
+        """
+        Add a bar. A bar with the newest stored bar's timestamp replaces it (the
+        still-forming bar was revised); older bars are ignored. Returns True if stored.
+        """
+        last = self.last_ts
+        if last is not None and ts <= last:
+            if ts < last:
+                return False
+            self.bars[(self.start + self.size - 1) % self.capacity] = (ts, o, h, l, c, v)
+            return True
+        idx = (self.start + self.size) % self.capacity
+        self.bars[idx] = (ts, o, h, l, c, v)
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity  # overwrite the oldest bar
+        return True
+
+    def latest_close(self):
+        if not self.size:
+            return None
+        return float(self.bars["close"][(self.start + self.size - 1) % self.capacity])
+
+    def to_array(self):
+        """Bars oldest -> newest (a copy)"""
+        return np.roll(self.bars, -self.start)[:self.size]
+
+
+class Reaction:
+    """Tracking state for one reporting ticker"""
+
+    __slots__ = ("ticker", "reference_close", "bars", "pct_change", "bucket", "updated_at")
+
+    def __init__(self, ticker, reference_close):
+        self.ticker = ticker
+        self.reference_close = reference_close
+        self.bars = BarRing()
+        self.pct_change = None
+        self.bucket = None
+        self.updated_at = None
+
+
+class IntradayTracker:
+    """
+    Keeps live reactions for reporting tickers and patches their daily_change
+    points into the shared score dicts.
+
+    on_update(tickers) is called after a poll that changed any score, so a
+    loader process can republish the shared score table.
+    """
+
+    def __init__(self, earnings_rows, game_score, score_breakdowns, points, bucket_fn,
+                 interval=INTRADAY_INTERVAL, on_update=None):
+        self.earnings_rows = earnings_rows
+        self.game_score = game_score
+        self.score_breakdowns = score_breakdowns
+        self.points = points
+        self.bucket_fn = bucket_fn
+        self.interval = interval
+        self.on_update = on_update
+        self.reactions = {}
+        self.day = None  # provider date the reporter set was computed for
+        self.lock = threading.Lock()
+        self.thread = None
+
+    # Which tickers to track
+
+    def reporting_tickers(self, tickers, extra=()):
+        """Tickers with an earnings date today or on the previous calendar day (after-hours reports)"""
+        provider = market_data.get_provider()
+        today = provider.today()
+        window = {today, today - timedelta(days=1)}
+        reporting = set(extra)
+        for ticker in tickers:
+            try:
+                if window.intersection(provider.earnings_dates(ticker)):
+                    reporting.add(ticker)
+            except Exception as e:
+                print(f"Earnings calendar lookup failed for {ticker}: {e}")
+        return sorted(reporting)
+
+    def track(self, ticker):
+        """Start tracking `ticker` against its last regular-session close before today"""
+        provider = market_data.get_provider()
+        today = provider.today()
+        daily = provider.daily_bars(ticker, pd.Timestamp(today - timedelta(days=10)), pd.Timestamp(today))
+        if daily.empty:
+            raise ValueError(f"No daily bars to anchor {ticker}'s reaction")
+        reaction = Reaction(ticker, float(daily["Close"].iloc[-1]))
+        with self.lock:
+            self.reactions[ticker] = reaction
+        return reaction
+
+    def refresh_reporters(self, tickers, extra=()):
+        """
+        Recompute the reporter set when the provider's date has moved on:
+        start tracking new reporters and drop reactions that left the window.
+        Returns True if the set was recomputed.
+        """
+        today = market_data.get_provider().today()
+        if today == self.day:
+            return False
+        reporting = self.reporting_tickers(tickers, extra)
+        with self.lock:
+            for ticker in set(self.reactions).difference(reporting):
+                del self.reactions[ticker]
+            new = [t for t in reporting if t not in self.reactions]
+        for ticker in new:
+            try:
+                self.track(ticker)
+            except Exception as e:
+                print(f"Could not start intraday tracking for {ticker}: {e}")
+        self.day = today
+        return True
+
+    # Polling
+
+    def poll(self):
+        """Fetch new bars for every tracked ticker in one call and rescore. Returns changed tickers."""
+        with self.lock:
+            reactions = dict(self.reactions)
+        if not reactions:
+            return []
+
+        oldest = min((r.bars.last_ts or 0) for r in reactions.values())
+        if oldest:
+            start = pd.Timestamp(oldest, unit="s", tz="UTC")
+        else:
+            start = pd.Timestamp(market_data.get_provider().today() - timedelta(days=1), tz=market_data.ET)
+        with metrics.span("intraday_poll"):
+            bars = market_data.get_provider().intraday_bars(list(reactions), self.interval, start)
+
+        changed = []
+        for ticker, df in bars.items():
+            reaction = reactions.get(ticker)
+            if reaction is None or df is None or df.empty:
+                continue
+            self._append_bars(reaction, df)
+            if self._rescore(reaction):
+                changed.append(ticker)
+        if changed and self.on_update:
+            self.on_update(changed)
+        return changed
+
+    def _append_bars(self, reaction, df):
+        df = df.dropna(subset=["Close"])
+        index = df.index if df.index.tz is not None else df.index.tz_localize("UTC")
+        ts = (index.asi8 // 10**9).astype(np.int64)
+        cols = [df[c].to_numpy(dtype=np.float32) if c in df else np.zeros(len(df), np.float32)
+                for c in ("Open", "High", "Low", "Close", "Volume")]
+        for i in range(len(df)):
+            reaction.bars.append(ts[i], cols[0][i], cols[1][i], cols[2][i], cols[3][i], cols[4][i])
+
+    def _rescore(self, reaction):
+        """
+        Bring the ticker's daily_change points in line with its current bucket.
+        Compared against the breakdown on every poll, so points a re-ingest
+        wrote back are replaced again. Returns True on change.
+        """
+        last = reaction.bars.latest_close()
+        if last is None or not reaction.reference_close:
+            return False
+        pct = (last - reaction.reference_close) / reaction.reference_close
+        bucket = self.bucket_fn(pct)
+        reaction.pct_change = pct
+        reaction.updated_at = datetime.now(market_data.ET)
+
+        ticker = reaction.ticker
+        row = self.earnings_rows.get(ticker)
+        if row is not None:
+            row["daily_pct_change"] = pct
+        reaction.bucket = bucket
+
+        breakdown = self.score_breakdowns.get(ticker)
+        if breakdown is None or ticker not in self.game_score:
+            return False
+        new_points = self.points["daily_change"][bucket]
+        old_points = breakdown.get("daily percent change", 0)
+        if new_points == old_points:
+            return False
+        breakdown["daily percent change"] = new_points
+        self.game_score[ticker] = self.game_score[ticker] - old_points + new_points
+        return True
+
+    def status(self):
+        with self.lock:
+            reactions = list(self.reactions.values())
+        return [{
+            "ticker": r.ticker,
+            "reference_close": r.reference_close,
+            "last_price": r.bars.latest_close(),
+            "pct_change": r.pct_change,
+            "bucket": r.bucket,
+            "bars": len(r.bars),
+            "updated_at": r.updated_at,
+        } for r in reactions]
+
+    def start(self, tickers, poll_seconds=INTRADAY_POLL_SECONDS, extra=INTRADAY_TICKERS):
+        """Track the current day's reporters and poll in a background thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return self.thread
+
+        def loop():
+            while True:
+                try:
+                    self.refresh_reporters(tickers, extra)
+                    self.poll()
+                except Exception as e:
+                    print(f"Intraday poll failed: {e}")
+                time.sleep(poll_seconds)
+
+        self.thread = threading.Thread(target=loop, name="intraday-poller", daemon=True)
+        self.thread.start()
+        return self.thread
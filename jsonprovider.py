@@ -0,0 +1,103 @@
+"""Fast JSON provider for Flask responses.
+
+Uses orjson when it is installed and falls back to the stdlib json module
+otherwise (or when JSON_PROVIDER=stdlib). Either way datetimes, dates,
+NumPy scalars/arrays, pandas values and sets serialize natively, so
+handlers can jsonify model data as-is without converting it first.
+"""
+import json
+import math
+import os
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+USE_ORJSON = orjson is not None and os.environ.get("JSON_PROVIDER", "orjson") != "stdlib"
+
+
+def default(obj):
+    """Serialize types neither encoder handles on its own"""
+    if pd is not None:
+        if obj is pd.NaT or obj is pd.NA:
+            return None
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+        if isinstance(obj, pd.Timedelta):
+            return obj.total_seconds()
+        if isinstance(obj, (pd.Series, pd.Index)):
+            return obj.tolist()
+        if isinstance(obj, pd.DataFrame):
+            return obj.to_dict(orient="records")
+    if np is not None:
+        if isinstance(obj, np.generic):
+            value = obj.item()
+            if isinstance(value, float) and not math.isfinite(value):
+                return None
+            return value
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if isinstance(obj, (datetime, date, dt_time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """Drop-in replacement for Flask's DefaultJSONProvider"""
+
+    sort_keys = True  # same key order as Flask's default provider
+    mimetype = "application/json"
+
+    def _orjson_options(self):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj):
+        with metrics.span("serialize_json"):
+            if USE_ORJSON:
+                return orjson.dumps(obj, default=default, option=self._orjson_options())
+            return json.dumps(obj, default=default, sort_keys=self.sort_keys,
+                              separators=(",", ":"), ensure_ascii=False).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for specific formatting get the stdlib encoder
+            kwargs.setdefault("default", default)
+            kwargs.setdefault("sort_keys", self.sort_keys)
+            with metrics.span("serialize_json"):
+                return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if USE_ORJSON and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
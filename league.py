@@ -0,0 +1,233 @@
+"""Leagues: independent games hosted side by side on one deployment.
+
+Every league has its own rules (budget, tier prices, POINTS overrides) and
+its own rosters; a user drafts a separate roster in each league they join.
+Membership is indexed both ways (league -> members, user -> leagues), and
+each league caches its company scores under its own rules plus a sorted
+leaderboard. Both are rebuilt only when a roster in that league changes or
+the global scores move, so ranking a league costs O(members) regardless of
+how many users and leagues exist.
+"""
+import copy
+import math
+import threading
+import uuid
+from datetime import datetime
+
+import main
+import universe
+
+TIER_PRICES = {
+    "premium": 15.0,
+    "mid_tier": 10.0,
+    "wildcard": 5.0,
+    "risky": 3.0
+}
+DEFAULT_BUDGET = 100.0
+
+TIER_OF = universe.TIER_OF
+
+
+def merge_points(overrides):
+    """POINTS with a league's overrides applied; unknown categories/outcomes are rejected"""
+    if overrides is not None and not isinstance(overrides, dict):
+        raise ValueError("points must be an object of category -> {outcome: points}")
+    points = copy.deepcopy(main.POINTS)
+    for category, values in (overrides or {}).items():
+        if category not in points or not isinstance(values, dict):
+            raise ValueError(f"Unknown points category: {category}")
+        for outcome, value in values.items():
+            if outcome not in points[category]:
+                raise ValueError(f"Unknown outcome {outcome} for {category}")
+            points[category][outcome] = float(value)
+    return points
+
+
+def _amount(name, value):
+    """`value` as a finite, non-negative float"""
+    amount = float(value)
+    if not math.isfinite(amount) or amount < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return amount
+
+
+class Rules:
+    def __init__(self, budget=DEFAULT_BUDGET, tier_prices=None, points=None):
+        self.budget = _amount("budget", budget)
+        self.tier_prices = dict(TIER_PRICES)
+        if tier_prices is not None and not isinstance(tier_prices, dict):
+            raise ValueError("tier_prices must be an object of tier -> price")
+        for tier, price in (tier_prices or {}).items():
+            if tier not in TIER_PRICES:
+                raise ValueError(f"Unknown tier: {tier}")
+            self.tier_prices[tier] = _amount(f"{tier} price", price)
+        self.points_overrides = points or {}
+        # Leagues on the default table share the global scores
+        self.points = merge_points(points) if points else main.POINTS
+
+    def price_of(self, ticker):
+        tier = TIER_OF.get(ticker)
+        return self.tier_prices[tier] if tier else 0
+
+    def to_dict(self):
+        return {
+            "budget": self.budget,
+            "tier_prices": self.tier_prices,
+            "points": self.points_overrides
+        }
+
+
+DEFAULT_RULES = Rules()
+
+
+class Roster:
+    __slots__ = ("holdings", "spent")
+
+    def __init__(self):
+        self.holdings = {}  # ticker -> shares
+        self.spent = 0.0
+
+
+def _scores_key():
+    # Bumped whenever ingest, a snapshot reload or intraday scoring moves a score
+    return main.refresh_status["data_version"]
+
+
+class League:
+    def __init__(self, league_id, name, owner_id, rules):
+        self.league_id = league_id
+        self.name = name
+        self.owner_id = owner_id
+        self.rules = rules
+        self.created_at = datetime.now()
+        self.members = {}  # user_id -> Roster
+        self.lock = threading.Lock()
+        self._scores = {}
+        self._scores_key = None
+        self._leaderboard = []
+        self._leaderboard_key = None
+        self._dirty = True
+
+    def get_league(self):
+        return {
+            "league_id": self.league_id,
+            "name": self.name,
+            "owner_id": self.owner_id,
+            "created_at": self.created_at,
+            "rules": self.rules.to_dict(),
+            "members": len(self.members)
+        }
+
+    # ROSTERS
+
+    def roster(self, user_id):
+        roster = self.members.get(user_id)
+        if roster is None:
+            raise KeyError(f"User {user_id} is not in league {self.league_id}")
+        return roster
+
+    def buy(self, user_id, ticker, shares):
+        cost = self.rules.price_of(ticker) * shares
+        with self.lock:
+            roster = self.roster(user_id)
+            owner = self.owner_of(ticker)
+            if owner is not None and owner != user_id:
+                raise ValueError(f"{ticker} is already taken in this league")
+            remaining = self.rules.budget - roster.spent
+            if cost > remaining:
+                raise ValueError(f"Insufficient budget. You have ${remaining:.2f} remaining, but this costs ${cost:.2f}")
+            roster.holdings[ticker] = roster.holdings.get(ticker, 0) + shares
+            roster.spent += cost
+            self._dirty = True
+        return roster
+
+    def owner_of(self, ticker):
+        """Member holding `ticker` (each ticker belongs to one member at most), or None"""
+        for user_id, roster in self.members.items():
+            if roster.holdings.get(ticker):
+                return user_id
+        return None
+
+    def sell(self, user_id, ticker, shares):
+        with self.lock:
+            roster = self.roster(user_id)
+            if roster.holdings.get(ticker, 0) < shares:
+                raise ValueError("Not enough shares to sell")
+            roster.holdings[ticker] -= shares
+            if roster.holdings[ticker] == 0:
+                del roster.holdings[ticker]
+            roster.spent -= self.rules.price_of(ticker) * shares
+            self._dirty = True
+        return roster
+
+    # SCORING
+
+    def company_scores(self):
+        """ticker -> score under this league's points table"""
+        if self.rules.points is main.POINTS:
+            return main.game_score
+        key = _scores_key()
+        if key != self._scores_key:
+            tickers = [t for t in list(main.game_score) if t in main.earnings_rows]
+            rows = [main.earnings_rows[t] for t in tickers]
+            totals = main.score_universe(rows, [self.rules.points])[0] if rows else ()
+            self._scores, self._scores_key = dict(zip(tickers, totals.tolist() if rows else ())), key
+        return self._scores
+
+    def member_score(self, user_id):
+        scores = self.company_scores()
+        return sum(scores.get(t, 0) * shares for t, shares in self.roster(user_id).holdings.items())
+
+    def leaderboard(self):
+        """[(user_id, score)] best first; rebuilt only when rosters or scores changed"""
+        key = _scores_key()
+        with self.lock:
+            if self._dirty or key != self._leaderboard_key:
+                scores = self.company_scores()
+                board = [
+                    (user_id, round(sum(scores.get(t, 0) * n for t, n in roster.holdings.items()), 2))
+                    for user_id, roster in self.members.items()
+                ]
+                board.sort(key=lambda entry: entry[1], reverse=True)
+                self._leaderboard, self._leaderboard_key, self._dirty = board, key, False
+            return self._leaderboard
+
+
+#  REGISTRY
+
+leagues = {}       # league_id -> League
+user_leagues = {}  # user_id -> set of league_ids
+_registry_lock = threading.Lock()
+
+
+def create_league(name, owner_id, rules=None):
+    league = League(str(uuid.uuid4()), name, owner_id, rules or DEFAULT_RULES)
+    with _registry_lock:
+        leagues[league.league_id] = league
+    join_league(league.league_id, owner_id)
+    return league
+
+
+def join_league(league_id, user_id):
+    league = leagues[league_id]
+    with league.lock:
+        if user_id not in league.members:
+            league.members[user_id] = Roster()
+            league._dirty = True
+    with _registry_lock:
+        user_leagues.setdefault(user_id, set()).add(league_id)
+    return league
+
+
+def leave_league(league_id, user_id):
+    league = leagues[league_id]
+    with league.lock:
+        if league.members.pop(user_id, None) is not None:
+            league._dirty = True
+    with _registry_lock:
+        user_leagues.get(user_id, set()).discard(league_id)
+    return league
+
+
+def leagues_for(user_id):
+    return [leagues[league_id] for league_id in user_leagues.get(user_id, ())]
@@ -0,0 +1,376 @@
+"""Append-only trade ledger with snapshots and replay.
+
+Every balance-changing action (buy, sell, draft add/remove) is appended
+to LEDGER_DIR/events.bin as one fixed-width 32-byte record; user
+registrations go to LEDGER_DIR/users.ndjson, which assigns each user id a
+compact integer index (a user who already holds stocks when registered
+carries them in that record). Tickers are stored as ids into
+LEDGER_DIR/tickers.json, the ledger's own append-only ticker table, so
+universe.csv can be reordered or trimmed without breaking old events.
+Appending an event and applying it to the portfolio happen under one
+lock, which snapshots also take, so a snapshot never holds a trade its
+event count doesn't cover.
+
+A background thread writes a snapshot of every portfolio (with the event
+count it covers) every LEDGER_SNAPSHOT_SECONDS when there are new events.
+Recovery loads the newest snapshot and replays only the events after it.
+
+    python ledger.py --replay            # rebuild holdings/balances/score totals from events.bin
+    python ledger.py --replay --check    # ...and compare against the latest snapshot
+
+Enable with LEDGER_DIR=ledger (off by default).
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+LEDGER_DIR = os.environ.get("LEDGER_DIR")
+LEDGER_SNAPSHOT_SECONDS = float(os.environ.get("LEDGER_SNAPSHOT_SECONDS", "300"))
+LEDGER_FSYNC = os.environ.get("LEDGER_FSYNC", "").lower() in ("1", "true", "yes")
+
+BUY, SELL, DRAFT_ADD, DRAFT_REMOVE = 1, 2, 3, 4
+KIND_NAMES = {BUY: "buy", SELL: "sell", DRAFT_ADD: "draft_add", DRAFT_REMOVE: "draft_remove"}
+
+EVENT_DTYPE = np.dtype([
+    ("ts", "<f8"),       # unix time
+    ("user", "<u4"),     # index into users.ndjson
+    ("shares", "<i4"),   # signed: + added to the portfolio, - removed
+    ("cash", "<f8"),     # signed balance change
+    ("ticker", "<u2"),   # index into tickers.json
+    ("kind", "u1"),
+    ("pad", "u1"),
+    ("quote", "<f4"),    # live quote at the time (0 if unknown), for entry prices
+])
+assert EVENT_DTYPE.itemsize == 32
+
+
+class Ledger:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.events_path = os.path.join(root, "events.bin")
+        self.users_path = os.path.join(root, "users.ndjson")
+        self.tickers_path = os.path.join(root, "tickers.json")
+        self.user_index = {}  # user_id -> int
+        self.user_ids = []    # int -> user_id
+        self.user_info = []   # int -> registration record
+        self._load_users()
+        self.count = os.path.getsize(self.events_path) // EVENT_DTYPE.itemsize if os.path.exists(self.events_path) else 0
+        self.tickers = []       # ticker id -> ticker
+        self.ticker_index = {}  # ticker -> ticker id
+        self._load_tickers()
+        self.snapshot_count = self._latest_snapshot()[0]
+        self._fd = os.open(self.events_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._record = np.zeros(1, dtype=EVENT_DTYPE)
+
+    def _load_users(self):
+        if not os.path.exists(self.users_path):
+            return
+        with open(self.users_path) as f:
+            for line in f:
+                if line.endswith("\n"):
+                    self._add_user(json.loads(line))
+
+    def _add_user(self, record):
+        self.user_index[record["user_id"]] = len(self.user_ids)
+        self.user_ids.append(record["user_id"])
+        self.user_info.append(record)
+
+    def _load_tickers(self):
+        if os.path.exists(self.tickers_path):
+            with open(self.tickers_path) as f:
+                tickers = json.load(f)
+        elif self.count:
+            # ledgers from before tickers.json stored universe ids
+            import universe
+            tickers = list(universe.TICKERS)
+        else:
+            tickers = []
+        for ticker in tickers:
+            self.ticker_index[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        if tickers and not os.path.exists(self.tickers_path):
+            self._save_tickers()
+
+    def _save_tickers(self):
+        tmp = self.tickers_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.tickers, f)
+        os.replace(tmp, self.tickers_path)
+
+    def _ticker_id(self, ticker):
+        tid = self.ticker_index.get(ticker)
+        if tid is None:
+            tid = len(self.tickers)
+            if tid > np.iinfo(EVENT_DTYPE["ticker"]).max:
+                raise ValueError(f"Ledger ticker table is full, can't add {ticker}")
+            self.tickers.append(ticker)
+            self.ticker_index[ticker] = tid
+            self._save_tickers()  # before any event refers to it
+        return tid
+
+    # APPEND
+
+    def _register(self, user):
+        record = {
+            "user_id": user.user_id,
+            "username": user.username,
+            "email": user.email,
+            "initial_balance": user.balance,
+            "ts": time.time()
+        }
+        if user.portfolio.holdings:
+            for ticker in user.portfolio.holdings:
+                self._ticker_id(ticker)
+            record["holdings"] = dict(user.portfolio.holdings)
+            record["entry_prices"] = dict(user.portfolio.entry_prices)
+        with open(self.users_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self._add_user(record)
+
+    def register_user(self, user):
+        with self.lock:
+            if user.user_id not in self.user_index:
+                self._register(user)
+
+    def record(self, kind, user, ticker, shares, cash, quote=None):
+        """
+        Append one trade and apply it to `user`, as one step under the ledger lock.
+
+        Raises before anything is written or applied if the trade can't be
+        applied (not enough shares) or the event can't be encoded.
+        """
+        with self.lock:
+            if shares < 0 and user.portfolio.holdings.get(ticker, 0) < -shares:
+                raise ValueError("Not enough shares to sell")
+            if user.user_id not in self.user_index:
+                self._register(user)
+            rec = self._record[0]
+            rec["ts"] = time.time()
+            rec["user"] = self.user_index[user.user_id]
+            rec["shares"] = shares
+            rec["cash"] = cash
+            rec["ticker"] = self._ticker_id(ticker)
+            rec["kind"] = kind
+            rec["quote"] = quote or 0.0
+            os.write(self._fd, self._record.tobytes())
+            if LEDGER_FSYNC:
+                os.fsync(self._fd)
+            self.count += 1
+            apply_event(user, ticker, shares, cash, quote)
+
+    # SNAPSHOTS
+
+    def _snapshot_paths(self):
+        return sorted(glob.glob(os.path.join(self.root, "snapshot-*.json")))
+
+    def _latest_snapshot(self):
+        """(event count covered, snapshot dict or None)"""
+        paths = self._snapshot_paths()
+        if not paths:
+            return 0, None
+        with open(paths[-1]) as f:
+            snap = json.load(f)
+        return snap["events"], snap
+
+    def write_snapshot(self, users):
+        """Persist every registered user's portfolio as of the current event count"""
+        with self.lock:
+            count = self.count
+            state = {
+                user_id: {
+                    "balance": users[user_id].balance,
+                    "holdings": dict(users[user_id].portfolio.holdings),
+                    "entry_prices": dict(users[user_id].portfolio.entry_prices),
+                }
+                for user_id in self.user_ids if user_id in users
+            }
+        path = os.path.join(self.root, f"snapshot-{count:012d}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"events": count, "ts": time.time(), "users": state}, f)
+        os.replace(tmp, path)
+        for old in self._snapshot_paths()[:-2]:  # keep the previous one as a fallback
+            os.remove(old)
+        self.snapshot_count = count
+        return path
+
+    def start_snapshots(self, users, interval=LEDGER_SNAPSHOT_SECONDS):
+        def loop():
+            while True:
+                time.sleep(interval)
+                if self.count != self.snapshot_count:
+                    try:
+                        self.write_snapshot(users)
+                    except Exception as e:
+                        print(f"Ledger snapshot failed: {e}")
+
+        thread = threading.Thread(target=loop, name="ledger-snapshot", daemon=True)
+        thread.start()
+        return thread
+
+    # RECOVERY
+
+    def read_events(self, start=0):
+        """Structured array of events from index `start` (memory-mapped, no copy)"""
+        count = os.path.getsize(self.events_path) // EVENT_DTYPE.itemsize if os.path.exists(self.events_path) else 0
+        if count <= start:
+            return np.zeros(0, dtype=EVENT_DTYPE)
+        return np.memmap(self.events_path, dtype=EVENT_DTYPE, mode="r", shape=(count,))[start:]
+
+    def recover(self, make_user):
+        """Users rebuilt from the latest snapshot plus the events after it. make_user(record) -> User"""
+        start, snap = self._latest_snapshot()
+        users = {}
+        for record in self.user_info:
+            user = users[record["user_id"]] = make_user(record)
+            user.portfolio.holdings.update(record.get("holdings", {}))
+            user.portfolio.entry_prices.update(record.get("entry_prices", {}))
+        if snap is not None:
+            for user_id, state in snap["users"].items():
+                user = users.get(user_id)
+                if user is None:
+                    continue
+                user.balance = state["balance"]
+                user.portfolio.holdings.clear()
+                user.portfolio.entry_prices.clear()
+                user.portfolio.holdings.update(state["holdings"])
+                user.portfolio.entry_prices.update(state["entry_prices"])
+
+        events = self.read_events(start)
+        for rec in events.tolist():
+            ts, uidx, shares, cash, tid, kind, _, quote = rec
+            apply_event(users[self.user_ids[uidx]], self.tickers[tid], shares, cash, quote)
+        print(f"Recovered {len(users)} users from ledger ({start} events in snapshot, {len(events)} replayed)")
+        return users
+
+
+def apply_event(user, ticker, shares, cash, quote=None):
+    """Apply one trade to `user`'s portfolio and balance"""
+    if shares > 0:
+        user.portfolio.add_stock(ticker, shares, quote or None)
+    elif shares < 0:
+        user.portfolio.remove_stock(ticker, -shares)
+    user.update_balance(cash)
+
+
+class SparseHoldings:
+    """Users x tickers share counts in CSR form (row = user index, column = ledger ticker id)"""
+
+    __slots__ = ("indptr", "indices", "shares")
+
+    def __init__(self, indptr, indices, shares):
+        self.indptr = indptr
+        self.indices = indices
+        self.shares = shares
+
+    def row(self, uidx):
+        """{ticker id: shares} held by user `uidx`"""
+        lo, hi = self.indptr[uidx], self.indptr[uidx + 1]
+        return dict(zip(self.indices[lo:hi].tolist(), self.shares[lo:hi].tolist()))
+
+
+def bulk_replay(events, n_users, n_tickers, initial_balances, scores=None, initial_holdings=None):
+    """
+    Rebuild every portfolio from the full event log in a few vectorized passes.
+
+    Only (user, ticker) pairs that actually occur are accumulated, so memory
+    follows the number of events rather than users x tickers. Returns
+    (holdings, balances, totals): SparseHoldings of non-zero positions,
+    per-user balances, and per-user score totals when `scores` (a per-ticker
+    vector, by ledger ticker id) is given. `initial_holdings` is an optional
+    (user indexes, ticker ids, shares) triple of positions held at registration.
+    """
+    users = events["user"].astype(np.int64)
+    tickers = events["ticker"].astype(np.int64)
+    shares = events["shares"].astype(np.int64)
+    if initial_holdings is not None:
+        users = np.concatenate([np.asarray(initial_holdings[0], dtype=np.int64), users])
+        tickers = np.concatenate([np.asarray(initial_holdings[1], dtype=np.int64), tickers])
+        shares = np.concatenate([np.asarray(initial_holdings[2], dtype=np.int64), shares])
+
+    keys, inverse = np.unique(users * n_tickers + tickers, return_inverse=True)
+    net = np.bincount(inverse, weights=shares, minlength=len(keys)).round().astype(np.int64)
+    held = net != 0
+    rows, cols = np.divmod(keys[held], n_tickers)  # keys are sorted, so rows come out in CSR order
+    net = net[held]
+    indptr = np.zeros(n_users + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_users), out=indptr[1:])
+    holdings = SparseHoldings(indptr, cols.astype(np.int32), net.astype(np.int32))
+
+    balances = np.asarray(initial_balances, dtype=np.float64) + np.bincount(
+        events["user"], weights=events["cash"], minlength=n_users)
+    totals = None
+    if scores is not None:
+        totals = np.bincount(rows, weights=net * np.asarray(scores, dtype=np.float64)[cols], minlength=n_users)
+    return holdings, balances, totals
+
+
+def _load_scores():
+    """Current game scores, from ingest or EARNINGS_SNAPSHOT"""
+    import sys
+    sys.argv = sys.argv[:1]  # main.py inspects argv at import
+    import main as game
+    return game.game_score
+
+
+def _replay_cli(root, check, game_score=None):
+    ledger = Ledger(root)
+    events = ledger.read_events(0)
+    if game_score is None:
+        game_score = _load_scores()
+    n_tickers = len(ledger.tickers)
+    scores = np.array([float(game_score.get(t, 0)) for t in ledger.tickers], dtype=np.float64)
+    initial = ([], [], [])
+    for uidx, record in enumerate(ledger.user_info):
+        for ticker, n in record.get("holdings", {}).items():
+            initial[0].append(uidx)
+            initial[1].append(ledger.ticker_index[ticker])
+            initial[2].append(n)
+    started = time.perf_counter()
+    holdings, balances, totals = bulk_replay(
+        events, len(ledger.user_ids), n_tickers,
+        [u["initial_balance"] for u in ledger.user_info], scores, initial)
+    elapsed = time.perf_counter() - started
+    rate = len(events) / elapsed if elapsed else float("inf")
+    print(f"Replayed {len(events)} events for {len(ledger.user_ids)} users in {elapsed:.3f}s ({rate:,.0f} events/s)")
+    if len(totals):
+        best = int(np.argmax(totals))
+        print(f"Score totals: sum {totals.sum():.2f}, top {ledger.user_ids[best]} with {totals[best]:.2f}")
+
+    if check:
+        count, snap = ledger._latest_snapshot()
+        if snap is None or count != len(events):
+            print("No snapshot covering the whole ledger to check against")
+            return None
+        mismatches = 0
+        for user_id, state in snap["users"].items():
+            uidx = ledger.user_index[user_id]
+            expected = {ledger.ticker_index[t]: n for t, n in state["holdings"].items()}
+            actual = holdings.row(uidx)
+            expected_total = sum(float(game_score.get(t, 0)) * n for t, n in state["holdings"].items())
+            if (actual != expected or abs(balances[uidx] - state["balance"]) > 1e-6
+                    or abs(totals[uidx] - expected_total) > 1e-6):
+                mismatches += 1
+        print(f"Checked {len(snap['users'])} users against snapshot: {mismatches} mismatches")
+        return mismatches
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and replay the trade ledger")
+    parser.add_argument("--dir", default=LEDGER_DIR or "ledger")
+    parser.add_argument("--replay", action="store_true", help="bulk-replay every event")
+    parser.add_argument("--check", action="store_true", help="compare the replay with the latest snapshot")
+    args = parser.parse_args()
+    if args.replay:
+        if _replay_cli(args.dir, args.check):
+            raise SystemExit(1)
+    else:
+        parser.print_help()
@@ -0,0 +1,343 @@
+"""
+Load generator: synthetic players and a mixed traffic replay.
+
+Fills the app with N synthetic users (portfolios, a skewed follow graph,
+inboxes), then sends a weighted mix of draft, leaderboard, friends,
+stocks, search and message requests from concurrent clients and reports
+throughput and p50/p99 latency per route. Runs fully offline on synthetic
+replay fixtures (benchmark.make_fixtures).
+
+    python loadgen.py --users 100000 --duration 30               # in-process, Flask test client
+    python loadgen.py --users 100000 --spawn --workers 4          # against serve.py on a local port
+    python loadgen.py --users 100000 --url http://127.0.0.1:5000  # against a running server
+
+A server under test builds the same population itself when started with
+LOADGEN_USERS=N (and LOADGEN_SEED), so client and server agree on user ids
+without any setup traffic. --spawn does this for you.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import universe
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = ("stocks=20,search=10,leaderboard=5,friends=5,draft_view=20,draft_add=8,draft_remove=4,"
+               "score=10,inbox=10,message=5,follow=3")
+DEFAULT_SEED = 7
+
+
+def user_id_for(i):
+    return f"load-{i}"
+
+
+#  POPULATION
+
+def populate(add_user, n_users, seed=DEFAULT_SEED, follows=20, inbox=5, max_holdings=6):
+    """
+    Add n synthetic users through `add_user` (app.add_user), deterministic for a seed.
+
+    Follows are skewed toward low-numbered users so a few accounts are very
+    popular; follow and inbox counts are exponentially distributed around
+    their means.
+    """
+    import league
+    from user import User
+
+    rng = random.Random(seed)
+    tickers = list(universe.TICKERS)
+    price_of = league.DEFAULT_RULES.price_of
+    created = []
+    for i in range(n_users):
+        user = User(user_id_for(i), f"player{i}", "", 100.0)
+        for ticker in rng.sample(tickers, rng.randint(1, max_holdings)):
+            shares = rng.randint(1, 3)
+            user.portfolio.add_stock(ticker, shares)
+            user.balance -= price_of(ticker) * shares
+        created.append(add_user(user))
+
+    now = datetime.now()
+    for user in created:
+        for _ in range(min(int(rng.expovariate(1 / follows)) if follows else 0, n_users - 1)):
+            target = created[int(n_users * rng.random() ** 3)]
+            if target is not user:
+                user.follow(target)
+        for k in range(int(rng.expovariate(1 / inbox)) if inbox else 0):
+            user.inbox.append({
+                "from": user_id_for(rng.randrange(n_users)),
+                "message": f"gg #{k}",
+                "timestamp": now - timedelta(minutes=rng.randint(0, 10000))
+            })
+    return created
+
+
+#  TRAFFIC
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r} (expected one of {', '.join(OPERATIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _search_query(rng, n_companies):
+    ticker = universe.TICKERS[rng.randrange(n_companies)]
+    return ticker[:rng.randint(1, len(ticker))].lower()
+
+
+# name -> fn(rng, user_id, other_id, n_companies) -> (route label, method, path, json body)
+OPERATIONS = {
+    "stocks": lambda rng, u, o, n: ("/api/stocks", "GET", "/api/stocks", None),
+    "search": lambda rng, u, o, n: ("/api/search", "GET", f"/api/search?q={_search_query(rng, n)}", None),
+    "leaderboard": lambda rng, u, o, n: ("/api/leaderboard", "GET", "/api/leaderboard", None),
+    "friends": lambda rng, u, o, n: ("/api/friends", "GET", "/api/friends", None),
+    "draft_view": lambda rng, u, o, n: ("GET /api/draft", "GET", f"/api/draft?user_id={u}", None),
+    "draft_add": lambda rng, u, o, n: (
+        "POST /api/draft", "POST", "/api/draft", {"user_id": u, "id": rng.randint(1, n), "shares": 1}),
+    "draft_remove": lambda rng, u, o, n: (
+        "DELETE /api/draft/<id>", "DELETE", f"/api/draft/{rng.randint(1, n)}?user_id={u}", None),
+    "score": lambda rng, u, o, n: ("/api/users/<id>/score", "GET", f"/api/users/{u}/score", None),
+    "inbox": lambda rng, u, o, n: ("GET /api/users/<id>/messages", "GET", f"/api/users/{u}/messages", None),
+    "message": lambda rng, u, o, n: (
+        "POST /api/users/<id>/messages", "POST", f"/api/users/{u}/messages", {"recipient_id": o, "message": "nice pick"}),
+    "follow": lambda rng, u, o, n: ("/api/users/<id>/follow/<target>", "POST", f"/api/users/{u}/follow/{o}", None),
+}
+
+
+class InProcessClient:
+    """Flask test client; one per worker thread"""
+
+    def __init__(self, app_module):
+        self.client = app_module.app.test_client()
+
+    def send(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HTTPClient:
+    """Persistent HTTP/1.1 connection to a running server; one per worker thread"""
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def send(self, method, path, body):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+
+def run_traffic(make_client, mix, n_users, n_companies, concurrency=8, duration=10.0, requests=None, seed=DEFAULT_SEED):
+    """Drive the mix from `concurrency` threads for `duration` seconds (or `requests` total)"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {}   # route -> [seconds]
+    statuses = {}  # route -> {status: count}
+    lock = threading.Lock()
+    budget = {"left": requests}
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = make_client()
+        local_samples, local_statuses = {}, {}
+        while True:
+            if deadline and time.perf_counter() > deadline:
+                break
+            if requests is not None:
+                with lock:
+                    if budget["left"] <= 0:
+                        break
+                    budget["left"] -= 1
+            op = OPERATIONS[rng.choices(names, weights)[0]]
+            user = user_id_for(rng.randrange(n_users))
+            other = user_id_for(rng.randrange(n_users))
+            route, method, path, body = op(rng, user, other, n_companies)
+            start = time.perf_counter()
+            try:
+                status = client.send(method, path, body)
+            except Exception:
+                status = "error"
+            local_samples.setdefault(route, []).append(time.perf_counter() - start)
+            counts = local_statuses.setdefault(route, {})
+            counts[status] = counts.get(status, 0) + 1
+        with lock:
+            for route, values in local_samples.items():
+                samples.setdefault(route, []).extend(values)
+            for route, counts in local_statuses.items():
+                merged = statuses.setdefault(route, {})
+                for status, count in counts.items():
+                    merged[status] = merged.get(status, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return report(samples, statuses, elapsed)
+
+
+def report(samples, statuses, elapsed):
+    from benchmark import summarize
+
+    routes = {}
+    for route in sorted(samples):
+        stats = summarize(samples[route])
+        counts = statuses[route]
+        stats["throughput_rps"] = len(samples[route]) / elapsed
+        stats["statuses"] = {str(s): n for s, n in sorted(counts.items(), key=lambda item: str(item[0]))}
+        stats["errors"] = sum(n for s, n in counts.items() if s == "error" or s >= 500)
+        routes[route] = stats
+    total = sum(len(v) for v in samples.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else None,
+        "routes": routes,
+    }
+
+
+#  TARGETS
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(base_url, timeout):
+    client = HTTPClient(base_url, timeout=5)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.send("GET", "/api/health", None) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout:.0f}s")
+
+
+@contextlib.contextmanager
+def spawned_server(env, workers, startup_timeout):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "serve.py"), "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_for(base_url, startup_timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+#  ENTRY POINT
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic load against the game API")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--follows", type=float, default=20, help="mean follows per user")
+    parser.add_argument("--inbox", type=float, default=5, help="mean inbox size")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation=weight list (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic")
+    parser.add_argument("--requests", type=int, help="stop after this many requests instead")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="running server started with LOADGEN_USERS/LOADGEN_SEED matching --users/--seed")
+    target.add_argument("--spawn", action="store_true", help="start serve.py on a free local port")
+    parser.add_argument("--workers", type=int, default=1, help="server workers with --spawn")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--fixtures", help="replay fixture directory (default: synthetic)")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    fixtures = args.fixtures
+    if not fixtures:
+        import benchmark
+        fixtures = benchmark.make_fixtures(tempfile.mkdtemp(prefix="loadgen-fixtures-"), universe.TICKERS)
+    env = dict(os.environ, MARKET_DATA=f"replay:{fixtures}", QUOTE_REFRESH_SECONDS="0",
+               LOADGEN_USERS=str(args.users), LOADGEN_SEED=str(args.seed),
+               LOADGEN_FOLLOWS=str(args.follows), LOADGEN_INBOX=str(args.inbox))
+    env.pop("INTRADAY", None)
+    n_companies = len(universe.TICKERS)
+
+    def traffic(make_client):
+        return run_traffic(make_client, mix, args.users, n_companies, args.concurrency,
+                           None if args.requests else args.duration, args.requests, args.seed)
+
+    if args.url:
+        results = traffic(lambda: HTTPClient(args.url))
+    elif args.spawn:
+        with spawned_server(env, args.workers, args.startup_timeout) as base_url:
+            results = traffic(lambda: HTTPClient(base_url))
+    else:
+        # Importing app runs ingest (and the LOADGEN_USERS population); keep its output off stdout
+        os.environ.update(env)
+        with contextlib.redirect_stdout(sys.stderr):
+            started = time.perf_counter()
+            import app as app_module
+            print(f"App ready with {len(app_module.users)} users in {time.perf_counter() - started:.1f}s")
+            results = traffic(lambda: InProcessClient(app_module))
+
+    output = json.dumps({
+        "target": args.url or ("spawn" if args.spawn else "in-process"),
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
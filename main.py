@@ -1,76 +1,36 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
 from zoneinfo import ZoneInfo
 ET = ZoneInfo("America/New_York")
 
+import heapq
+import itertools
+import os
 import sys
-
-# Premium Picks — $15
-premium_picks = [
-    "AAPL",  # Apple
-    "MSFT",  # Microsoft
-    "GOOGL", # Alphabet
-    "AMZN",  # Amazon
-    "NVDA",  # NVIDIA
-    "META",  # Meta Platforms
-    "BRK-B", # Berkshire Hathaway
-    "JPM",   # JPMorgan Chase
-    "XOM",   # Exxon Mobil
-    "JNJ",   # Johnson & Johnson
-    "V",     # Visa
-    "PG"     # Procter & Gamble
-]
-
-# Mid-Tier — $10
-mid_tier = [
-    "ABNB",  # Airbnb
-    "SHOP",  # Shopify
-    "NFLX",  # Netflix
-    "TSLA",  # Tesla
-    "AMD",   # Advanced Micro Devices
-    "CRM",   # Salesforce
-    "UBER",  # Uber
-    "ADBE",  # Adobe
-    "INTC",  # Intel
-    "QCOM",  # Qualcomm
-    "SPOT",  # Spotify
-    "SBUX"   # Starbucks
-]
-
-# Wildcards — $5
-wildcards = [
-    "PLTR",  # Palantir
-    "SNAP",  # Snap
-    "COIN",  # Coinbase
-    "RBLX",  # Roblox
-    "ROKU",  # Roku
-    "ZM",    # Zoom
-    "CRWD",  # CrowdStrike
-    "TWLO",  # Twilio
-    "PINS",  # Pinterest
-    "DKNG",  # DraftKings
-    "ETSY",  # Etsy
-    "U"      # Unity Software
-]
-
-# Risky Plays — $3
-risky_plays = [
-    "BA",    # Boeing
-    "PTON",  # Peloton
-    "GME",   # GameStop
-    "AMC",   # AMC Entertainment
-    "PYPL",  # PayPal
-    "LYFT",  # Lyft
-    "BYND",  # Beyond Meat
-    "HOOD",  # Robinhood
-    "LCID",  # Lucid
-    "RIVN",  # Rivian
-    "WBD",   # Warner Bros Discovery
-    "CVNA",  # Carvana
-]
-COMPANIES = premium_picks + mid_tier + wildcards + risky_plays
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import buckets
+import market_data
+import metrics
+import universe
+from profiler import pool_initializer, profile
+
+# The ticker universe and tiers are data (universe.csv, see universe.py).
+# Tier prices: premium $15, mid-tier $10, wildcard $5, risky $3
+premium_picks = universe.BY_TIER["premium"]
+mid_tier = universe.BY_TIER["mid_tier"]
+wildcards = universe.BY_TIER["wildcard"]
+risky_plays = universe.BY_TIER["risky"]
+COMPANIES = universe.TICKERS
+
+# Ingest fetches daily bars for INGEST_BATCH tickers per upstream request and
+# runs per-ticker earnings/quote lookups on INGEST_WORKERS threads
+INGEST_BATCH = int(os.environ.get("INGEST_BATCH", "200"))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "8"))
 POINTS = {
         "eps": {
             "beat": 10,
@@ -107,9 +67,10 @@ def eps_outcome(actual, estimate):
     else:
         return "meet"
 
-def score_company_game(row):
+@metrics.timed("score_company_game")
+def score_company_game(row, points=POINTS):
     """
-    Input: one row from results (dict)
+    Input: one row from results (dict), optionally a league's points table
     Output: dict with score breakdown
     """
 
@@ -118,23 +79,30 @@ def score_company_game(row):
 
     # EPS base score
     eps_result = row["eps_result"]
-    eps_score = POINTS["eps"][eps_result]
+    eps_score = points["eps"][eps_result]
     score += eps_score
     breakdown["eps"] = eps_score
 
-    #Price change scores
-    daily_change_score = stock_market_reaction(row["ticker"])[1]
-    monthly_change_score = price_change_1month(row["ticker"])[1]
-
-    price_change_bonus = POINTS["daily_change"][daily_change_score]+ POINTS["monthly_change"][monthly_change_score]
+    #Price change scores (the row's ingested changes, fetched only if missing)
+    daily_pct = row.get("daily_pct_change")
+    if daily_pct is None:
+        daily_pct = stock_market_reaction(row["ticker"])[0]
+    monthly_pct = row.get("monthly_price_change")
+    if monthly_pct is None:
+        monthly_pct = price_change_1month(row["ticker"])[0]
+    date = row.get("earnings_date")
+    daily_change_score = buckets.label("daily_change", daily_pct, row["ticker"], date)
+    monthly_change_score = buckets.label("monthly_change", monthly_pct, row["ticker"], date)
+
+    price_change_bonus = points["daily_change"][daily_change_score]+ points["monthly_change"][monthly_change_score]
     
-    breakdown["daily percent change"] = POINTS["daily_change"][daily_change_score]
-    breakdown["monthly percent change"] = POINTS["monthly_change"][monthly_change_score]
+    breakdown["daily percent change"] = points["daily_change"][daily_change_score]
+    breakdown["monthly percent change"] = points["monthly_change"][monthly_change_score]
 
     # Bonus: Surprise Superstar
     bonus = 0
     if row["surprise_pct"] is not None and row["surprise_pct"] > 20:
-        bonus += POINTS["bonus"]["surprise_superstar"]
+        bonus += points["bonus"]["surprise_superstar"]
 
     score += bonus
     score += price_change_bonus
@@ -149,26 +117,55 @@ def score_company_game(row):
     }
 
 def points_from_percent_change(pct):
-    if pct>.05:
-        return "big_increase"
-    elif pct>.02:
-        return "small_increase"
-    elif pct<= -.1:
-        return "big_decrease"
-    elif pct<= -.05:
-        return "small_decrease"
-    return "no_change"
-
+    """Daily-change bucket for pct (see buckets.py for the schedules)"""
+    return buckets.SCHEDULES["daily_change"].label(pct)
 
+def score_universe(rows, tables):
+    """
+    Scores of every row under each points table at once.
+    Output: array of shape (len(tables), len(rows)), same totals as score_company_game
+    """
+    daily = [r["daily_pct_change"] if r.get("daily_pct_change") is not None else np.nan for r in rows]
+    monthly = [r["monthly_price_change"] if r.get("monthly_price_change") is not None else np.nan for r in rows]
+    eps = np.array([[t["eps"][r["eps_result"]] for r in rows] for t in tables], dtype=np.float64)
+    superstar = np.array([r["surprise_pct"] is not None and r["surprise_pct"] > 20 for r in rows])
+    bonus = np.outer([t["bonus"]["surprise_superstar"] for t in tables], superstar)
+    return (eps + bonus
+            + buckets.SCHEDULES["daily_change"].points(daily, [t["daily_change"] for t in tables])
+            + buckets.SCHEDULES["monthly_change"].points(monthly, [t["monthly_change"] for t in tables]))
+
+
+# Daily bars prefetched in batches for the ingest in progress (see load_earnings_data)
+_prefetched_bars = {}
+
+def prefetch_daily_bars(tickers, days=31):
+    """Fetch `days` of daily bars for all tickers, INGEST_BATCH per provider call"""
+    data = market_data.get_provider()
+    today = data.today()
+    start = pd.Timestamp(today - timedelta(days=days))
+    end = pd.Timestamp(today + timedelta(days=1))
+    for i in range(0, len(tickers), INGEST_BATCH):
+        batch = tickers[i:i + INGEST_BATCH]
+        try:
+            _prefetched_bars.update(data.daily_bars_many(batch, start, end))
+        except Exception as e:
+            print(f"Batch price fetch failed for {batch[0]}..{batch[-1]}: {e}")
+
+def daily_bars(ticker, days):
+    """The last `days` of daily bars, from the ingest prefetch when available"""
+    data = market_data.get_provider()
+    today = data.today()
+    start = pd.Timestamp(today - timedelta(days=days))
+    df = _prefetched_bars.get(ticker)
+    if df is not None:
+        return df[df.index >= start]
+    return data.daily_bars(ticker, start=start, end=pd.Timestamp(today + timedelta(days=1)))
+
+@metrics.timed("stock_open_prices_last2days")
 def stock_open_prices_last2days(ticker):
-    today = datetime.now(ET).date()
-    df = yf.download(
-        ticker, 
-        start = pd.Timestamp(today - timedelta(days=10)), #buffer in case weekend/market holiday
-        end = pd.Timestamp(today + timedelta(days=1)),
-        interval = "1d",
-        progress = False
-    )
+    data = market_data.get_provider()
+    today = data.today()
+    df = daily_bars(ticker, days=10) #buffer in case weekend/market holiday
 
     #if df is None or df.empty():
         #raise HTTPException(status_code=400, detail = "No stock data")
@@ -179,14 +176,14 @@ def stock_open_prices_last2days(ticker):
 
     df = df[df.index <= today]
 
-    #if len(df) < 2:
-        #raise HTTPException(status_code=400, detail = "No two days of stock data")
+    if len(df) < 2:
+        raise IngestError(f"need two days of prices for {ticker}, got {len(df)}")
     
     prev_date = df.index[-2]
     curr_date = df.index[-1]
 
-    prev_open = float(df.loc[prev_date, "Open"].iloc[0])
-    curr_open = float(df.loc[curr_date, "Open"].iloc[0])
+    prev_open = float(df.loc[prev_date, "Open"])
+    curr_open = float(df.loc[curr_date, "Open"])
 
     return prev_date, prev_open, curr_date, curr_open
     
@@ -198,15 +195,11 @@ def stock_market_reaction(ticker):
 
 
 #get historical price
+@metrics.timed("price_change_1month")
 def price_change_1month(ticker):
-    today = datetime.now(ET).date()
-    df = yf.download(
-        ticker, 
-        start = pd.Timestamp(today - timedelta(days=31)), 
-        end = pd.Timestamp(today + timedelta(days=1)),
-        interval = "1d",
-        progress = False
-    )
+    data = market_data.get_provider()
+    today = data.today()
+    df = daily_bars(ticker, days=31)
 
     #if df is None or df.empty():
         #raise HTTPException(status_code=400, detail = "No stock data")
@@ -216,87 +209,230 @@ def price_change_1month(ticker):
     df.index = pd.to_datetime(df.index).date
 
     df = df[df.index <= today]
+    if df.empty:
+        raise IngestError(f"no prices for {ticker} in the last month")
 
     start_date = df.index[0]
     curr_date = df.index[-1]
 
-    start_open = float(df.loc[start_date, "Open"].iloc[0])
-    curr_open = float(df.loc[curr_date, "Open"].iloc[0])
+    start_open = float(df.loc[start_date, "Open"])
+    curr_open = float(df.loc[curr_date, "Open"])
 
     pct_change = (curr_open - start_open)/start_open
 
-    change_in_points = points_from_percent_change(pct_change)
+    change_in_points = buckets.label("monthly_change", pct_change)
     return pct_change, change_in_points
 
 # Export data as module-level variables for app.py to use
 earnings_rows = {}  # Dictionary: ticker -> earnings data
 game_score = {}     # Dictionary: ticker -> score
-
+score_breakdowns = {}  # Dictionary: ticker -> score breakdown (eps, daily, monthly, bonus)
+refresh_status = {  # Freshness of the dicts above, for /api/health
+    "last_refresh": None,
+    "duration_s": None,
+    "tickers_loaded": 0,
+    "tickers_expected": len(COMPANIES),
+    "snapshot_version": None,
+    "source": "ingest",
+    "data_version": 0  # bumped whenever any score or row changes; cheap cache key
+}
+_data_versions = itertools.count(1)
+
+def mark_data_changed():
+    refresh_status["data_version"] = next(_data_versions)
+
+# Serve a prebuilt snapshot instead of ingesting at import (see snapshot.py)
+SNAPSHOT_PATH = os.environ.get("EARNINGS_SNAPSHOT")
+SNAPSHOT_POLL_SECONDS = float(os.environ.get("SNAPSHOT_POLL_SECONDS", "5"))
+snapshot_watcher = None
+
+# Read scores published by a scoretable.py loader instead of ingesting
+SCORE_TABLE_NAME = os.environ.get("SCORE_TABLE")
+score_table = None
+score_table_version = None
+
+#  INGEST HEALTH
+# A ticker that fails ingest keeps its last good row (and score), is marked
+# stale, and is retried in the background with exponential backoff.
+
+INGEST_RETRY_SECONDS = float(os.environ.get("INGEST_RETRY_SECONDS", "30"))  # 0 disables retries
+INGEST_RETRY_MAX_SECONDS = float(os.environ.get("INGEST_RETRY_MAX_SECONDS", "1800"))
+
+class IngestError(Exception):
+    """A ticker's upstream data is missing or unusable"""
+
+# ticker -> {"status": ok/stale/failed, "last_success", "last_attempt", "last_error", "failures", "next_retry"}
+ticker_health = {}
+retry_listeners = []  # called with [ticker] after a retry brings a ticker back
+
+def _now_iso():
+    return datetime.now(ET).isoformat(timespec="seconds")
+
+def _record_ingest(ticker, row, error):
+    """Update `ticker`'s health after an attempt; schedules a retry on failure"""
+    health = ticker_health.setdefault(ticker, {
+        "status": None, "last_success": None, "last_attempt": None,
+        "last_error": None, "failures": 0, "next_retry": None
+    })
+    health["last_attempt"] = _now_iso()
+    if row is not None:
+        health.update(status="ok", last_success=health["last_attempt"], last_error=None, failures=0, next_retry=None)
+        return
+    health["failures"] += 1
+    health["last_error"] = error
+    health["status"] = "stale" if ticker in earnings_rows else "failed"
+    if INGEST_RETRY_SECONDS > 0:
+        delay = min(INGEST_RETRY_SECONDS * 2 ** (health["failures"] - 1), INGEST_RETRY_MAX_SECONDS)
+        health["next_retry"] = (datetime.now(ET) + timedelta(seconds=delay)).isoformat(timespec="seconds")
+        retry_queue.schedule(ticker, delay)
+
+def _store_row(ticker, row):
+    score = score_company_game(row)
+    earnings_rows[ticker] = row
+    game_score[ticker] = score["game_score"]
+    score_breakdowns[ticker] = score["breakdown"]
+    return score
+
+def retry_ticker(ticker):
+    """Re-ingest one ticker; on success its row and score replace the stale ones"""
+    row, error = _ingest_ticker(market_data.get_provider(), ticker)
+    if row is not None:
+        _store_row(ticker, row)
+        refresh_status["tickers_loaded"] = len(earnings_rows)
+        mark_data_changed()
+        print(f"Recovered {ticker} on retry")
+    _record_ingest(ticker, row, error)
+    if row is not None:
+        for listener in retry_listeners:
+            listener([ticker])
+    return row is not None
+
+class RetryQueue:
+    """Tickers due for another ingest attempt, run one at a time on a background thread"""
+
+    def __init__(self):
+        self.heap = []        # (due monotonic time, ticker)
+        self.queued = set()
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def schedule(self, ticker, delay):
+        with self.cond:
+            if ticker in self.queued:
+                return
+            self.queued.add(ticker)
+            heapq.heappush(self.heap, (time.monotonic() + delay, ticker))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="ingest-retry", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                _, ticker = heapq.heappop(self.heap)
+                self.queued.discard(ticker)
+            if ticker_health.get(ticker, {}).get("status") == "ok":
+                continue  # a full reload got it first
+            try:
+                retry_ticker(ticker)
+            except Exception as e:
+                print(f"Retry of {ticker} failed: {e}")
+
+    def pending(self):
+        with self.cond:
+            return sorted(self.queued)
+
+retry_queue = RetryQueue()
+
+def _ingest_ticker(data, ticker):
+    """(earnings row, None) for one ticker, or (None, reason) if it has no usable data"""
+    try:
+        # --- Earnings history ---
+        eh = data.earnings_history(ticker)
+        if eh is None or eh.empty:
+            raise IngestError("no earnings data")
+
+        row = eh.iloc[0]  # most recent quarter
+
+        actual_eps = (
+            row.get("epsActual")
+            if "epsActual" in row
+            else row.get("Reported EPS", None)
+        )
+
+        est_eps = (
+            row.get("epsEstimate")
+            if "epsEstimate" in row
+            else row.get("Earnings Estimate", None)
+        )
+
+        earnings_date = row.name.strftime("%Y-%m-%d") if hasattr(row, 'name') else "N/A"
+
+        if pd.isna(actual_eps) or pd.isna(est_eps):
+            raise IngestError("missing EPS")
+
+        surprise_pct = None
+        if est_eps != 0:
+            surprise_pct = ((actual_eps - est_eps) / abs(est_eps)) * 100
+
+        daily_pct_change = stock_market_reaction(ticker)[0]
+        monthly_pct_change = price_change_1month(ticker)[0]
+
+        eps_result = eps_outcome(actual_eps, est_eps)
+
+        bonus_tags = []
+        if surprise_pct is not None and surprise_pct > 20:
+            bonus_tags.append("surprise_superstar")
+
+        info = data.quote_info(ticker)
+        return ({
+            "stock name": info.get("shortName", "N/A"),
+            "ticker": ticker,
+            "earnings_date": earnings_date,
+            "eps_estimate": float(est_eps),
+            "eps_actual": float(actual_eps),
+            "eps_result": eps_result,          # beat / miss / meet
+            "surprise_pct": surprise_pct,
+            "bonus_flags": bonus_tags,          # informational only
+            "daily_pct_change" : daily_pct_change,
+            "monthly_price_change": monthly_pct_change,
+            "market_cap": info.get("marketCap")
+        }, None)
+
+    except IngestError as e:
+        print(f"Skipping {ticker}, {e}.")
+        return None, str(e)
+    except Exception as e:
+        print(f"Error processing {ticker}: {e}")
+        return None, f"{type(e).__name__}: {e}"
+
+@metrics.timed("load_earnings_data")
 def load_earnings_data():
-    """Load and process earnings data from yfinance"""
+    """Load and process earnings data from the active market-data provider"""
     global earnings_rows, game_score
     
-    results = []
-    for ticker in COMPANIES:
-        try:
-            yt = yf.Ticker(ticker)
-
-            # --- Earnings history ---
-            eh = yt.earnings_history
-            if eh is None or eh.empty:
-                print(f"Skipping {ticker}, no earnings data.")
-                continue
-
-            row = eh.iloc[0]  # most recent quarter
-
-            actual_eps = (
-                row.get("epsActual")
-                if "epsActual" in row
-                else row.get("Reported EPS", None)
-            )
-
-            est_eps = (
-                row.get("epsEstimate")
-                if "epsEstimate" in row
-                else row.get("Earnings Estimate", None)
-            )
-
-            earnings_date = row.name.strftime("%Y-%m-%d") if hasattr(row, 'name') else "N/A"
-
-            if pd.isna(actual_eps) or pd.isna(est_eps):
-                print(f"Skipping {ticker}, missing EPS.")
-                continue
-
-            surprise_pct = None
-            if est_eps != 0:
-                surprise_pct = ((actual_eps - est_eps) / abs(est_eps)) * 100
-
-            daily_pct_change = stock_market_reaction(ticker)[0]
-            monthly_pct_change = price_change_1month(ticker)[0]
-
-            eps_result = eps_outcome(actual_eps, est_eps)
-
-            bonus_tags = []
-            if surprise_pct is not None and surprise_pct > 20:
-                bonus_tags.append("surprise_superstar")
-
-            results.append(
-                {
-                    "stock name": yt.info.get("shortName", "N/A"),
-                    "ticker": ticker,
-                    "earnings_date": earnings_date,
-                    "eps_estimate": float(est_eps),
-                    "eps_actual": float(actual_eps),
-                    "eps_result": eps_result,          # beat / miss / meet
-                    "surprise_pct": surprise_pct,
-                    "bonus_flags": bonus_tags,          # informational only
-                    "daily_pct_change" : daily_pct_change,
-                    "monthly_price_change": monthly_pct_change
-                }
-            )
-
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
+    started = time.perf_counter()
+    data = market_data.get_provider()
+    tickers = list(COMPANIES)
+    prefetch_daily_bars(tickers)
+    buckets.clear_cache()  # a new ingest may be a new trading day
+    try:
+        initializer, initargs = pool_initializer()  # sample the workers under an active profile
+        with ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest",
+                                initializer=initializer, initargs=initargs) as pool:
+            outcomes = list(zip(tickers, pool.map(lambda t: _ingest_ticker(data, t), tickers)))
+    finally:
+        _prefetched_bars.clear()  # later rescores fetch fresh prices
+    results = [row for _, (row, _) in outcomes if row]
+    # Failed tickers keep serving their previous row and score, marked stale
+    for ticker, (row, error) in outcomes:
+        _record_ingest(ticker, row, error)
+
+    # Tiers not fixed in universe.csv follow market cap
+    universe.update_market_caps({row["ticker"]: row["market_cap"] for row in results})
 
     if not results:
         if "--ingest" in sys.argv:
@@ -311,12 +447,17 @@ def load_earnings_data():
     game_results = []
 
     for row in results:
-        score = score_company_game(row)
-        game_results.append(score)
         # Store in dictionaries for export
-        ticker = row["ticker"]
-        earnings_rows[ticker] = row
-        game_score[ticker] = score["game_score"]
+        game_results.append(_store_row(row["ticker"], row))
+
+    refresh_status.update(
+        last_refresh=datetime.now(ET),
+        duration_s=time.perf_counter() - started,
+        tickers_loaded=len(earnings_rows),
+        tickers_expected=len(COMPANIES),
+        source="ingest"
+    )
+    mark_data_changed()
 
     game_df = pd.DataFrame(game_results)
     game_df = game_df.sort_values(by="game_score", ascending=False)
@@ -325,7 +466,133 @@ def load_earnings_data():
         print("\n GAME SCORING (per company)")
         print(game_df.to_string(index=False))
 
+# Record fixtures for the replay provider: python main.py --ingest --record fixtures/
+recorder = None
+if "--record" in sys.argv:
+    recorder = market_data.RecordingProvider(
+        market_data.get_provider(), sys.argv[sys.argv.index("--record") + 1]
+    )
+    market_data.set_provider(recorder)
+
+# Rescoring that needs live prices runs here, never on a request thread
+_rescore_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rescore")
+_rescoring = {}  # ticker -> Future, so concurrent requests share one rescore
+_rescoring_lock = threading.Lock()
+
+def _rescore(ticker):
+    score = score_company_game(earnings_rows[ticker])
+    game_score[ticker] = score["game_score"]
+    score_breakdowns[ticker] = score["breakdown"]
+    mark_data_changed()
+    return score
+
+def rescore_in_background(ticker):
+    """Queue a live rescore of one ticker; returns the (shared) Future"""
+    with _rescoring_lock:
+        future = _rescoring.get(ticker)
+        if future is None:
+            future = _rescore_executor.submit(_rescore, ticker)
+            _rescoring[ticker] = future
+
+            def done(_):
+                with _rescoring_lock:
+                    _rescoring.pop(ticker, None)
+            future.add_done_callback(done)
+        return future
+
+def build_catalog():
+    """Ticker -> tier listing stored alongside snapshots"""
+    return [{"ticker": c.ticker, "tier": c.tier} for c in universe.COMPANIES]
+
+def write_snapshot(path):
+    import snapshot
+    version = snapshot.write_snapshot(path, earnings_rows, game_score, score_breakdowns, build_catalog(), ticker_health)
+    refresh_status["snapshot_version"] = version
+    print(f"Wrote snapshot version {version} to {path}")
+    return version
+
+def load_snapshot():
+    """Load EARNINGS_SNAPSHOT into the module-level dicts and start watching it"""
+    global snapshot_watcher
+    import snapshot
+    snapshot_watcher = snapshot.SnapshotWatcher(SNAPSHOT_PATH, SNAPSHOT_POLL_SECONDS)
+    snapshot_watcher.load(earnings_rows, game_score, score_breakdowns, refresh_status)
+    _load_snapshot_health(snapshot_watcher.current)
+    mark_data_changed()
+
+def _load_snapshot_health(snap):
+    ticker_health.clear()
+    ticker_health.update(snap.meta.get("ticker_health", {}))
+
+def seed_from_snapshot(path):
+    """Start from a previous snapshot's rows, so tickers failing this ingest keep their last good data"""
+    import snapshot
+    snap = snapshot.Snapshot(path)
+    try:
+        snapshot.apply_snapshot(snap, earnings_rows, game_score, score_breakdowns, refresh_status)
+        _load_snapshot_health(snap)
+    finally:
+        snap.close()
+    for ticker in [t for t in earnings_rows if t not in universe.TICKER_INDEX]:
+        earnings_rows.pop(ticker)
+        game_score.pop(ticker, None)
+        score_breakdowns.pop(ticker, None)
+
+def reload_snapshot_if_changed():
+    """Pick up a newer snapshot, if serving from one. Cheap enough to call per request."""
+    if snapshot_watcher is not None and snapshot_watcher.maybe_reload(earnings_rows, game_score, score_breakdowns, refresh_status):
+        _load_snapshot_health(snapshot_watcher.current)
+        mark_data_changed()
+        return True
+    return False
+
+def sync_score_table(force=False):
+    """Copy the shared score table into game_score when its version has moved"""
+    global score_table_version
+    if score_table is None:
+        return False
+    if not force and score_table.version == score_table_version:
+        return False
+    import scoretable
+    version, records = score_table.read()
+    scoretable.sync_scores(records, earnings_rows, game_score, score_breakdowns)
+    score_table_version = version
+    refresh_status.update(tickers_loaded=len(game_score), source="shared_table")
+    mark_data_changed()
+    return True
+
+def attach_score_table():
+    global score_table
+    if not SNAPSHOT_PATH:
+        # The table only carries scores; company rows come from the snapshot
+        raise RuntimeError("SCORE_TABLE workers need EARNINGS_SNAPSHOT for company data")
+    import scoretable
+    score_table = scoretable.SharedScoreTable.attach(SCORE_TABLE_NAME)
+    sync_score_table(force=True)
+
+def refresh_shared_data():
+    """Per-request hook for workers: newer snapshot and/or newer shared scores"""
+    reloaded = reload_snapshot_if_changed()
+    sync_score_table(force=reloaded)
+
 # Load data when module is imported
-print("Loading earnings data...")
-load_earnings_data()
+serving_shared = (SNAPSHOT_PATH or SCORE_TABLE_NAME) and "--ingest" not in sys.argv
+if serving_shared:
+    if SNAPSHOT_PATH:
+        print(f"Loading earnings snapshot {SNAPSHOT_PATH}...")
+        load_snapshot()
+    if SCORE_TABLE_NAME:
+        print(f"Attaching to shared score table {SCORE_TABLE_NAME}...")
+        attach_score_table()
+else:
+    print("Loading earnings data...")
+    if "--snapshot" in sys.argv and os.path.exists(sys.argv[sys.argv.index("--snapshot") + 1]):
+        seed_from_snapshot(sys.argv[sys.argv.index("--snapshot") + 1])
+    with profile("ingest"):  # no-op unless PROFILE=1 or --profile
+        load_earnings_data()
+    if recorder is not None:
+        recorder.write_manifest()
+    # Headless ingest for the web workers: python main.py --ingest --snapshot PATH
+    if "--snapshot" in sys.argv:
+        write_snapshot(sys.argv[sys.argv.index("--snapshot") + 1])
 print(f"Loaded {len(earnings_rows)} companies with earnings data")
\ No newline at end of file
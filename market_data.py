@@ -0,0 +1,349 @@
+"""Market-data providers used by the ingest pipeline.
+
+main.py never talks to yfinance directly; it asks the active provider for
+earnings history, quote info and daily bars. Two providers ship with the
+game:
+
+- YFinanceProvider: live data through the shared upstream client
+- ReplayProvider: recorded CSV/Parquet fixtures served from memory, so the
+  full ingest -> score -> serve pipeline can run offline and reproducibly
+
+Select one with the MARKET_DATA environment variable
+("yfinance" or "replay:<fixture dir>") or call set_provider().
+Wrap any provider in RecordingProvider to capture fixtures for replay.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from zoneinfo import ZoneInfo
+ET = ZoneInfo("America/New_York")
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _flatten_bars(df, ticker):
+    """Normalize a yf.download frame to flat OHLCV columns indexed by date"""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+    if isinstance(df.columns, pd.MultiIndex):
+        if ticker in df.columns.get_level_values(-1):
+            df = df.xs(ticker, axis=1, level=-1)
+        else:
+            df = df.droplevel(-1, axis=1)
+    return df[[c for c in BAR_COLUMNS if c in df.columns]]
+
+
+class MarketDataProvider:
+    """Interface every provider implements"""
+
+    def today(self):
+        """The trading date the provider's data is as of"""
+        return datetime.now(ET).date()
+
+    def earnings_history(self, ticker):
+        """DataFrame of past quarters (newest first) with epsActual / epsEstimate"""
+        raise NotImplementedError
+
+    def quote_info(self, ticker):
+        """Dict of quote metadata (shortName, marketCap, ...)"""
+        raise NotImplementedError
+
+    def daily_bars(self, ticker, start, end):
+        """DataFrame of daily OHLCV bars in [start, end)"""
+        raise NotImplementedError
+
+    def daily_bars_many(self, tickers, start, end):
+        """Dict ticker -> daily bars for many tickers. Providers should fetch these in bulk."""
+        bars = {}
+        for ticker in tickers:
+            try:
+                bars[ticker] = self.daily_bars(ticker, start, end)
+            except (FileNotFoundError, KeyError):
+                continue
+        return bars
+
+    def earnings_dates(self, ticker):
+        """Upcoming/most recent earnings announcement dates (list of date)"""
+        return []
+
+    def intraday_bars(self, tickers, interval, start):
+        """Dict ticker -> DataFrame of OHLCV bars (tz-aware index) since `start`, incl. pre/post market"""
+        raise NotImplementedError
+
+    def latest_quotes(self, tickers):
+        """Dict ticker -> last traded price. Providers should fetch these in bulk."""
+        today = self.today()
+        quotes = {}
+        for ticker in tickers:
+            try:
+                df = self.daily_bars(ticker, pd.Timestamp(today - timedelta(days=10)), pd.Timestamp(today + timedelta(days=1)))
+            except (FileNotFoundError, KeyError):
+                continue
+            close = df["Close"].dropna() if "Close" in df else None
+            if close is not None and not close.empty:
+                quotes[ticker] = float(close.iloc[-1])
+        return quotes
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live Yahoo Finance data via the rate-limited upstream client"""
+
+    def __init__(self, client=None):
+        if client is None:
+            from upstream import client
+        self.client = client
+
+    def earnings_history(self, ticker):
+        return self.client.earnings_history(ticker)
+
+    def quote_info(self, ticker):
+        return self.client.info(ticker) or {}
+
+    def daily_bars(self, ticker, start, end):
+        df = self.client.download(ticker, start=start, end=end, interval="1d")
+        return _flatten_bars(df, ticker)
+
+    def daily_bars_many(self, tickers, start, end):
+        # One request per batch; tickers with no rows in the window are left out
+        tickers = list(tickers)
+        df = self.client.download(" ".join(tickers), start=start, end=end, interval="1d")
+        bars = {}
+        for ticker in tickers:
+            flat = _flatten_bars(df, ticker).dropna(how="all")
+            if not flat.empty:
+                bars[ticker] = flat
+        return bars
+
+    def earnings_dates(self, ticker):
+        calendar = self.client.calendar(ticker) or {}
+        dates = calendar.get("Earnings Date", []) if isinstance(calendar, dict) else []
+        return [pd.Timestamp(d).date() for d in dates]
+
+    def intraday_bars(self, tickers, interval, start):
+        tickers = list(tickers)
+        df = self.client.download(" ".join(tickers), start=start, interval=interval, prepost=True)
+        return {ticker: _flatten_bars(df, ticker) for ticker in tickers}
+
+    def latest_quotes(self, tickers):
+        # One request for the whole universe: today's 1m bars, last close per ticker
+        tickers = list(tickers)
+        df = self.client.download(" ".join(tickers), period="1d", interval="1m")
+        if df is None or df.empty or "Close" not in df:
+            return {}
+        close = df["Close"]
+        if not isinstance(close, pd.DataFrame):
+            close = close.to_frame(tickers[0])
+        last = close.ffill().iloc[-1]
+        return {ticker: float(price) for ticker, price in last.items() if pd.notna(price)}
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded fixtures from disk with no network and no latency.
+
+    Layout (one directory per ticker, .parquet may replace .csv):
+        <root>/manifest.json          {"as_of": "YYYY-MM-DD", "tickers": [...]}
+        <root>/<TICKER>/earnings.csv
+        <root>/<TICKER>/info.json
+        <root>/<TICKER>/daily.csv
+
+    Files are read once and kept in memory; "today" is the recorded as_of
+    date so date-window logic in main.py sees the same data every run.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._cache = {}
+        self._lock = threading.Lock()
+        manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def today(self):
+        as_of = self.manifest.get("as_of")
+        if as_of:
+            return datetime.strptime(as_of, "%Y-%m-%d").date()
+        return super().today()
+
+    def tickers(self):
+        """Tickers present in the fixture set"""
+        if "tickers" in self.manifest:
+            return list(self.manifest["tickers"])
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def _path(self, ticker, name):
+        for ext in (".parquet", ".csv", ".json"):
+            path = os.path.join(self.root, ticker, name + ext)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No {name} fixture for {ticker} in {self.root}")
+
+    def _load(self, ticker, name):
+        key = (ticker, name)
+        if key in self._cache:
+            return self._cache[key]
+        path = self._path(ticker, name)
+        if path.endswith(".json"):
+            with open(path) as f:
+                value = json.load(f)
+        elif path.endswith(".parquet"):
+            value = pd.read_parquet(path)
+        else:
+            value = pd.read_csv(path, index_col=0, parse_dates=True)
+        with self._lock:
+            self._cache[key] = value
+        return value
+
+    def earnings_history(self, ticker):
+        return self._load(ticker, "earnings")
+
+    def quote_info(self, ticker):
+        return self._load(ticker, "info")
+
+    def daily_bars(self, ticker, start, end):
+        df = self._load(ticker, "daily")
+        return df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+
+    def earnings_dates(self, ticker):
+        dates = self._load(ticker, "info").get("earningsDates", [])
+        return [datetime.strptime(d, "%Y-%m-%d").date() for d in dates]
+
+    def intraday_bars(self, tickers, interval, start):
+        # Optional <TICKER>/intraday.csv fixture; interval is whatever was recorded
+        bars = {}
+        for ticker in tickers:
+            try:
+                df = self._load(ticker, "intraday")
+            except FileNotFoundError:
+                continue
+            if not isinstance(df.index, pd.DatetimeIndex) or df.index.tz is None:
+                df.index = pd.to_datetime(df.index, utc=True)
+            since = pd.Timestamp(start)
+            since = since.tz_localize("UTC") if since.tzinfo is None else since
+            bars[ticker] = df[df.index >= since]
+        return bars
+
+
+class RecordingProvider(MarketDataProvider):
+    """Passes calls through to another provider and saves what it returns as fixtures"""
+
+    def __init__(self, inner, root, fmt="csv"):
+        self.inner = inner
+        self.root = root
+        self.fmt = fmt
+        self.recorded = set()
+        os.makedirs(root, exist_ok=True)
+
+    def today(self):
+        return self.inner.today()
+
+    def latest_quotes(self, tickers):
+        return self.inner.latest_quotes(tickers)
+
+    def _write_frame(self, ticker, name, df):
+        directory = os.path.join(self.root, ticker)
+        os.makedirs(directory, exist_ok=True)
+        if self.fmt == "parquet":
+            df.to_parquet(os.path.join(directory, name + ".parquet"))
+        else:
+            df.to_csv(os.path.join(directory, name + ".csv"))
+        self.recorded.add(ticker)
+
+    def earnings_history(self, ticker):
+        df = self.inner.earnings_history(ticker)
+        if df is not None and not df.empty:
+            self._write_frame(ticker, "earnings", df)
+        return df
+
+    def _update_info(self, ticker, fields):
+        # info.json holds the quote info and the earnings dates (see ReplayProvider)
+        directory = os.path.join(self.root, ticker)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "info.json")
+        info = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                info = json.load(f)
+        info.update(fields)
+        with open(path, "w") as f:
+            json.dump(info, f, default=str)
+        self.recorded.add(ticker)
+
+    def quote_info(self, ticker):
+        info = self.inner.quote_info(ticker)
+        self._update_info(ticker, info)
+        return info
+
+    def earnings_dates(self, ticker):
+        dates = self.inner.earnings_dates(ticker)
+        self._update_info(ticker, {"earningsDates": [d.strftime("%Y-%m-%d") for d in dates]})
+        return dates
+
+    def daily_bars(self, ticker, start, end):
+        df = self.inner.daily_bars(ticker, start, end)
+        self._record_bars(ticker, "daily", df)
+        return df
+
+    def _record_bars(self, ticker, name, df):
+        path = os.path.join(self.root, ticker, f"{name}.{self.fmt}")
+        # Every price window is recorded into one file; keep the widest
+        if df is not None and not df.empty:
+            if os.path.exists(path):
+                old = pd.read_parquet(path) if self.fmt == "parquet" else pd.read_csv(path, index_col=0, parse_dates=True)
+                df_all = pd.concat([old, df])
+                df_all = df_all[~df_all.index.duplicated(keep="last")].sort_index()
+            else:
+                df_all = df
+            self._write_frame(ticker, name, df_all)
+
+    def daily_bars_many(self, tickers, start, end):
+        bars = self.inner.daily_bars_many(tickers, start, end)
+        for ticker, df in bars.items():
+            self._record_bars(ticker, "daily", df)
+        return bars
+
+    def intraday_bars(self, tickers, interval, start):
+        bars = self.inner.intraday_bars(tickers, interval, start)
+        for ticker, df in bars.items():
+            self._record_bars(ticker, "intraday", df)
+        return bars
+
+    def write_manifest(self):
+        with open(os.path.join(self.root, "manifest.json"), "w") as f:
+            json.dump({
+                "as_of": self.today().strftime("%Y-%m-%d"),
+                "tickers": sorted(self.recorded)
+            }, f, indent=2)
+
+
+#  ACTIVE PROVIDER
+
+_provider = None
+
+
+def provider_from_spec(spec):
+    """Build a provider from a MARKET_DATA spec string"""
+    spec = (spec or "yfinance").strip()
+    if spec == "yfinance":
+        return YFinanceProvider()
+    if spec.startswith("replay:"):
+        return ReplayProvider(spec[len("replay:"):])
+    raise ValueError(f"Unknown MARKET_DATA provider: {spec}")
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = provider_from_spec(os.environ.get("MARKET_DATA"))
+    return _provider
+
+
+def set_provider(provider):
+    global _provider
+    _provider = provider
@@ -0,0 +1,247 @@
+"""Opt-in sampling profiler for ingest and request paths.
+
+Enable with PROFILE=1 (or `python main.py --ingest --profile`). One daemon
+thread samples the stacks of whichever threads are inside a profiled
+block every PROFILE_INTERVAL_MS and folds them into collapsed-stack
+files (`frame;frame;frame count`), which flamegraph.pl, inferno and
+speedscope all read directly. Thread pools started inside a profiled
+block pass pool_initializer() to their executor so the workers are
+sampled into the same profile.
+
+Configuration:
+    PROFILE=1                 turn profiling on
+    PROFILE_DIR=profiles      where output goes
+    PROFILE_INTERVAL_MS=5     sampling interval
+    PROFILE_ROUTES=/api/stocks,/companies/<company_id>   routes to profile ("*" = all)
+    PROFILE_EVERY=100         write route profiles every N requests
+
+Each output file has a .summary.json next to it splitting samples into
+pandas, network, json and other time.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("PROFILE", "").lower() in ("1", "true", "yes") or "--profile" in sys.argv
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_EVERY = int(os.environ.get("PROFILE_EVERY", "100"))
+PROFILE_ROUTES = [r.strip() for r in os.environ.get("PROFILE_ROUTES", "").split(",") if r.strip()]
+
+# First match walking from the leaf frame up decides a sample's category
+CATEGORIES = (
+    ("json", ("/json/", "orjson", "flask/json", "jsonprovider")),
+    ("network", ("socket", "ssl.py", "/http/", "urllib3", "requests/", "curl_cffi", "yfinance/", "upstream.py")),
+    ("pandas", ("pandas/", "numpy/")),
+)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    path = code.co_filename
+    if "site-packages/" in path:
+        path = path.split("site-packages/", 1)[1]
+    elif "/lib/python" in path:
+        path = path.rsplit("/lib/", 1)[1].split("/", 1)[-1]
+    else:
+        path = os.path.basename(path)
+    return f"{path}:{code.co_name}"
+
+
+def _categorize(frames):
+    for frame in frames:  # leaf first
+        path = frame.f_code.co_filename.replace("\\", "/")
+        for category, needles in CATEGORIES:
+            if any(n in path for n in needles):
+                return category
+    return "other"
+
+
+class ProfileSession:
+    """Accumulated samples for one named profile (e.g. "ingest" or a route)"""
+
+    def __init__(self, name, flush_every=1):
+        self.name = name
+        self.flush_every = flush_every
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.runs = 0
+        self.helpers = set()  # pool threads sampled for this session until it ends
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def add(self, frame):
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        stack = ";".join(_frame_label(f) for f in reversed(frames))
+        category = _categorize(frames)
+        with self.lock:
+            self.stacks[stack] += 1
+            self.categories[category] += 1
+
+    def write(self, directory):
+        """Write collapsed stacks + category summary and reset. Returns the stack file path."""
+        with self.lock:
+            stacks, categories, runs = self.stacks, self.categories, self.runs
+            self.stacks, self.categories, self.runs = Counter(), Counter(), 0
+        if not stacks:
+            return None
+
+        os.makedirs(directory, exist_ok=True)
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.name).strip("_")
+        base = os.path.join(directory, f"{safe_name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+
+        with open(base + ".collapsed", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        total = sum(categories.values())
+        with open(base + ".summary.json", "w") as f:
+            json.dump({
+                "name": self.name,
+                "runs": runs,
+                "samples": total,
+                "interval_s": PROFILE_INTERVAL,
+                "estimated_seconds": total * PROFILE_INTERVAL,
+                "breakdown": {
+                    category: {"samples": n, "share": n / total}
+                    for category, n in categories.most_common()
+                }
+            }, f, indent=2)
+        return base + ".collapsed"
+
+
+class SamplingProfiler:
+    """One sampler thread shared by every profiled block in the process"""
+
+    def __init__(self, interval=PROFILE_INTERVAL, directory=PROFILE_DIR):
+        self.interval = interval
+        self.directory = directory
+        self.sessions = {}
+        self.active = {}  # thread ident -> session
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                active = dict(self.active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, session in active.items():
+                if ident != own and ident in frames:
+                    session.add(frames[ident])
+
+    def session(self, name, flush_every=1):
+        with self.lock:
+            session = self.sessions.get(name)
+            if session is None:
+                session = self.sessions[name] = ProfileSession(name, flush_every)
+            return session
+
+    def begin(self, name, flush_every=1):
+        """Start sampling the calling thread into session `name`"""
+        session = self.session(name, flush_every)
+        with self.lock:
+            self.active[threading.get_ident()] = session
+        self._ensure_thread()
+        return session
+
+    def attach(self, session):
+        """Also sample the calling thread into `session` until it ends (for worker pools)"""
+        with self.lock:
+            self.active[threading.get_ident()] = session
+            session.helpers.add(threading.get_ident())
+
+    def current(self):
+        """Session the calling thread is being sampled into, or None"""
+        with self.lock:
+            return self.active.get(threading.get_ident())
+
+    def end(self, session):
+        """Stop sampling the calling thread; writes output every flush_every runs"""
+        with self.lock:
+            self.active.pop(threading.get_ident(), None)
+            for ident in session.helpers:
+                if self.active.get(ident) is session:
+                    del self.active[ident]
+            session.helpers.clear()
+            session.runs += 1
+            due = session.runs >= session.flush_every
+        if due:
+            return session.write(self.directory)
+        return None
+
+    def flush(self):
+        """Write every session that has unwritten samples"""
+        return [p for p in (s.write(self.directory) for s in list(self.sessions.values())) if p]
+
+
+profiler = SamplingProfiler()
+if ENABLED:
+    atexit.register(profiler.flush)  # don't lose a partial batch of route samples
+
+
+@contextmanager
+def profile(name, flush_every=1):
+    """Profile a block when profiling is enabled; a no-op otherwise"""
+    if not ENABLED:
+        yield None
+        return
+    session = profiler.begin(name, flush_every)
+    try:
+        yield session
+    finally:
+        path = profiler.end(session)
+        if path:
+            print(f"Profile written to {path}")
+
+
+def pool_initializer():
+    """
+    (initializer, initargs) for a ThreadPoolExecutor created inside a profiled
+    block, so its worker threads are sampled into the caller's session too
+    """
+    session = profiler.current() if ENABLED else None
+    if session is None:
+        return None, ()
+    return profiler.attach, (session,)
+
+
+def should_profile_route(rule):
+    return ENABLED and (("*" in PROFILE_ROUTES) or rule in PROFILE_ROUTES)
+
+
+def init_app(app):
+    """Register request hooks that profile PROFILE_ROUTES, writing every PROFILE_EVERY requests"""
+    if not ENABLED or not PROFILE_ROUTES:
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def start_route_profile():
+        rule = request.url_rule.rule if request.url_rule else None
+        if rule and should_profile_route(rule):
+            g.profile_session = profiler.begin(f"route {request.method} {rule}", PROFILE_EVERY)
+
+    @app.teardown_request
+    def stop_route_profile(exc=None):
+        session = g.pop("profile_session", None)
+        if session is not None:
+            profiler.end(session)
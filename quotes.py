@@ -0,0 +1,120 @@
+"""Live quote cache for portfolio valuation.
+
+A single background thread refreshes the last price of every ticker in
+the universe with one batched provider call every QUOTE_REFRESH_SECONDS.
+Request handlers only ever read the in-memory cache, so valuing a
+portfolio is O(holdings) with no upstream call on the request path.
+Quotes older than QUOTE_TTL_SECONDS are treated as missing.
+"""
+import os
+import threading
+import time
+
+import market_data
+import metrics
+
+QUOTE_REFRESH_SECONDS = float(os.environ.get("QUOTE_REFRESH_SECONDS", "60"))
+QUOTE_TTL_SECONDS = float(os.environ.get("QUOTE_TTL_SECONDS", "300"))
+
+
+class Quote:
+    __slots__ = ("price", "fetched_at")
+
+    def __init__(self, price, fetched_at):
+        self.price = price
+        self.fetched_at = fetched_at
+
+
+class QuoteCache:
+    def __init__(self, ttl=QUOTE_TTL_SECONDS):
+        self.ttl = ttl
+        self.quotes = {}  # ticker -> Quote; replaced wholesale per refresh
+        self.last_refresh = None
+        self.last_error = None
+
+    def get(self, ticker):
+        """Fresh Quote for ticker, or None if unknown / older than the TTL"""
+        quote = self.quotes.get(ticker)
+        if quote is None or time.time() - quote.fetched_at > self.ttl:
+            return None
+        return quote
+
+    def price(self, ticker):
+        quote = self.get(ticker)
+        return quote.price if quote else None
+
+    def update(self, prices, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        quotes = dict(self.quotes)
+        for ticker, price in prices.items():
+            quotes[ticker] = Quote(price, fetched_at)
+        self.quotes = quotes  # single reference swap; readers never lock
+        self.last_refresh = fetched_at
+
+    def refresh(self, tickers):
+        """Fetch every ticker in one provider call"""
+        try:
+            with metrics.span("quote_refresh"):
+                prices = market_data.get_provider().latest_quotes(tickers)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Quote refresh failed: {e}")
+            return 0
+        self.update(prices)
+        self.last_error = None
+        return len(prices)
+
+
+quote_cache = QuoteCache()
+_refresher = None
+
+
+def start_refresher(tickers, interval=QUOTE_REFRESH_SECONDS):
+    """Start the background refresh loop (once per process). interval <= 0 disables it."""
+    global _refresher
+    if interval <= 0 or (_refresher is not None and _refresher.is_alive()):
+        return _refresher
+
+    def loop():
+        while True:
+            quote_cache.refresh(list(tickers))
+            time.sleep(interval)
+
+    _refresher = threading.Thread(target=loop, name="quote-refresher", daemon=True)
+    _refresher.start()
+    return _refresher
+
+
+def value_holdings(holdings, entry_prices, cost_of):
+    """
+    Value a portfolio at live quotes.
+
+    holdings: ticker -> shares, entry_prices: ticker -> average quote paid,
+    cost_of: ticker -> game price per share. Each position's game-dollar
+    cost is marked to market by the real price move since purchase.
+    Returns (positions, market_value).
+    """
+    positions = []
+    market_value = 0.0
+    for ticker, shares in holdings.items():
+        cost = cost_of(ticker) * shares
+        entry = entry_prices.get(ticker)
+        last = quote_cache.price(ticker)
+        if entry and last:
+            change = (last - entry) / entry
+            value = cost * (1 + change)
+        else:
+            change = None
+            value = cost
+        market_value += value
+        positions.append({
+            'ticker': ticker,
+            'shares': shares,
+            'cost': cost,
+            'entry_price': entry,
+            'last_price': last,
+            'pct_change': change,
+            'value': round(value, 2),
+            'pnl': round(value - cost, 2)
+        })
+    return positions, market_value
@@ -0,0 +1,187 @@
+"""Shared per-user score totals.
+
+All holdings are kept as a sparse users x tickers matrix in CSR form
+(indptr/indices/shares arrays, tickers by universe id). When company
+scores change, every user's total is recomputed in one vectorized pass:
+score vector gathered by ticker, times shares, summed per row with
+bincount. A trade only re-totals the traders: their rows are marked
+stale and re-totalled from their portfolios after each pass, until enough
+pile up (REBUILD_FRACTION of all users) to rebuild the matrix.
+
+The leaderboard, friends list, draft simulation and settlement all read
+totals from `totals` instead of summing portfolios themselves. Per-holding
+score cards (`cards`) are cached per user until their portfolio or the
+scores change.
+"""
+import threading
+import time
+
+import numpy as np
+
+import universe
+
+REBUILD_FRACTION = 0.1
+
+
+def score_vector(game_score):
+    """Per-ticker scores in universe id order"""
+    return np.fromiter((float(game_score.get(t, 0)) for t in universe.TICKERS),
+                       dtype=np.float64, count=len(universe.TICKERS))
+
+
+class UserTotals:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.user_ids = []   # row -> user_id
+        self.row_of = {}     # user_id -> row
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.shares = np.zeros(0, dtype=np.float64)
+        self.values = np.zeros(0, dtype=np.float64)  # row -> total score
+        self.scores = None
+        self.scores_key = None
+        self.pending = set()       # users whose holdings changed since the last sync
+        self.stale_rows = set()    # users whose matrix row predates their holdings
+        self.matrix_stale = True
+        self._ranking = None
+        self.last_rescore = None   # {"users", "seconds"} of the last full pass
+
+    def touch(self, user_id):
+        """Holdings of `user_id` changed (or the user is new)"""
+        with self.lock:
+            self.pending.add(user_id)
+
+    # BATCH
+
+    def _build_matrix(self, users):
+        user_ids, indptr, indices, shares = [], [0], [], []
+        ticker_id = universe.TICKER_INDEX
+        for user_id, user in list(users.items()):
+            holdings = user.portfolio.holdings
+            for ticker, n in list(holdings.items()):
+                tid = ticker_id.get(ticker)
+                if tid is not None:
+                    indices.append(tid)
+                    shares.append(n)
+            user_ids.append(user_id)
+            indptr.append(len(indices))
+        self.user_ids = user_ids
+        self.row_of = {user_id: row for row, user_id in enumerate(user_ids)}
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int32)
+        self.shares = np.array(shares, dtype=np.float64)
+        self.stale_rows.clear()
+        self.matrix_stale = False
+
+    def _multiply(self):
+        rows = np.repeat(np.arange(len(self.user_ids)), np.diff(self.indptr))
+        self.values = np.bincount(rows, weights=self.shares * self.scores[self.indices],
+                                  minlength=len(self.user_ids))
+
+    def _patch(self, users, user_id):
+        user = users.get(user_id)
+        if user is None:
+            return False
+        total = 0.0
+        for ticker, n in list(user.portfolio.holdings.items()):
+            tid = universe.TICKER_INDEX.get(ticker)
+            if tid is not None:
+                total += self.scores[tid] * n
+        row = self.row_of.get(user_id)
+        if row is None:
+            row = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.row_of[user_id] = row
+            self.values = np.append(self.values, total)
+        else:
+            self.values[row] = total
+        return True
+
+    def sync(self, users, game_score, key):
+        """Bring totals up to date with `users` and scores version `key`"""
+        with self.lock:
+            if not (self.pending or key != self.scores_key or len(users) != len(self.row_of)):
+                return
+            started = time.perf_counter()
+            self.stale_rows |= self.pending
+            self.pending.clear()
+            if self.matrix_stale or len(self.stale_rows) > REBUILD_FRACTION * max(len(self.user_ids), 1000):
+                self.matrix_stale = True
+            if key != self.scores_key or self.scores is None:
+                self.scores = score_vector(game_score)
+                self.scores_key = key
+                if not self.matrix_stale:
+                    self._multiply()
+                    self._patch_rows(users, self.stale_rows)
+                self.last_rescore = {"users": len(users), "seconds": time.perf_counter() - started}
+            elif not self.matrix_stale:
+                self._patch_rows(users, self.stale_rows)
+            if self.matrix_stale or len(users) != len(self.row_of):
+                # new users added without touch(), deleted users, or too many stale rows
+                self._build_matrix(users)
+                self._multiply()
+                self.last_rescore = {"users": len(users), "seconds": time.perf_counter() - started}
+            self._ranking = None
+
+    def _patch_rows(self, users, user_ids):
+        for user_id in user_ids:
+            if not self._patch(users, user_id):
+                self.matrix_stale = True  # deleted user: drop its row in a rebuild
+
+    # READ
+
+    def total(self, user_id):
+        row = self.row_of.get(user_id)
+        return float(self.values[row]) if row is not None else 0.0
+
+    def as_dict(self):
+        with self.lock:
+            return dict(zip(self.user_ids, self.values.tolist()))
+
+    def ranked(self):
+        """[(user_id, total)] best first; cached until the next sync changes anything"""
+        with self.lock:
+            if self._ranking is None:
+                order = np.argsort(-self.values, kind="stable")
+                values = self.values[order].tolist()
+                self._ranking = [(self.user_ids[row], value) for row, value in zip(order.tolist(), values)]
+            return self._ranking
+
+
+class ScoreCards:
+    """Per-holding score breakdown for one user, cached on (portfolio version, scores version)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cards = {}  # user_id -> (portfolio version, scores key, card)
+
+    def card(self, user, game_score, breakdowns, key):
+        portfolio = user.portfolio
+        cached = self.cards.get(user.user_id)
+        if cached is not None and cached[0] == portfolio.version and cached[1] == key:
+            return cached[2]
+        version = portfolio.version
+        total_score = 0.0
+        holdings = []
+        for ticker, shares in list(portfolio.holdings.items()):
+            score = game_score.get(ticker)
+            if score is None:
+                continue
+            score = float(score)
+            value = score * shares
+            total_score += value
+            holdings.append({
+                "ticker": ticker,
+                "shares": shares,
+                "score_per_share": score,
+                "total_score": value,
+                "breakdown": breakdowns.get(ticker, {})
+            })
+        card = {"total_score": total_score, "portfolio_scores": holdings}
+        with self.lock:
+            self.cards[user.user_id] = (version, key, card)
+        return card
+
+
+totals = UserTotals()
+cards = ScoreCards()
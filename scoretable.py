@@ -0,0 +1,191 @@
+"""Shared-memory score table for multi-process serving.
+
+One loader process owns a block of shared memory holding two slots of
+SCORE_DTYPE records (see snapshot.py), one record per ticker id
+(COMPANIES order). It fills the inactive slot and then flips the active
+slot and bumps the version; web workers attach by name and re-sync their
+game_score only when the version changes, so N workers cost one ingest.
+
+    # loader: ingest (or watch EARNINGS_SNAPSHOT) and publish every 5 min
+    python scoretable.py --name fe_scores --refresh 300
+
+    # workers
+    SCORE_TABLE=fe_scores EARNINGS_SNAPSHOT=snapshots/earnings.snap python app.py
+"""
+import argparse
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import intraday
+from snapshot import SCORE_DTYPE, build_scores, replace_contents
+
+MAGIC = b"FESCORE1"
+# magic, capacity, active slot, version, records in slot 0, records in slot 1
+HEADER = struct.Struct("<8sIIQII")
+HEADER_SIZE = 64
+VERSION_OFFSET = 16  # offset of the version field inside HEADER
+
+
+def _untrack(shm):
+    """Stop this process's resource tracker from unlinking memory it doesn't own"""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class SharedScoreTable:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        magic, self.capacity, _, _, _, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a score table")
+        self.slots = [
+            np.ndarray((self.capacity,), dtype=SCORE_DTYPE, buffer=shm.buf,
+                       offset=HEADER_SIZE + i * self.capacity * SCORE_DTYPE.itemsize)
+            for i in (0, 1)
+        ]
+
+    @classmethod
+    def create(cls, name, capacity):
+        size = HEADER_SIZE + 2 * capacity * SCORE_DTYPE.itemsize
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a loader that crashed; take it over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, capacity, 0, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        shm = shared_memory.SharedMemory(name=name)
+        _untrack(shm)
+        return cls(shm, owner=False)
+
+    @property
+    def version(self):
+        return struct.unpack_from("<Q", self.shm.buf, VERSION_OFFSET)[0]
+
+    def publish(self, records):
+        """Write records into the inactive slot, then flip. Loader only."""
+        if len(records) > self.capacity:
+            raise ValueError(f"{len(records)} records exceed table capacity {self.capacity}")
+        _, capacity, active, version, n0, n1 = HEADER.unpack_from(self.shm.buf, 0)
+        target = 1 - active
+        self.slots[target][:len(records)] = records
+        counts = [n0, n1]
+        counts[target] = len(records)
+        # Version is bumped last so readers never see the new slot half-written
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, capacity, target, version, *counts)
+        struct.pack_into("<Q", self.shm.buf, VERSION_OFFSET, version + 1)
+        return version + 1
+
+    def view(self):
+        """(version, zero-copy view of the active slot). Valid until the second flip after this."""
+        _, _, active, version, n0, n1 = HEADER.unpack_from(self.shm.buf, 0)
+        return version, self.slots[active][:(n0, n1)[active]]
+
+    def read(self):
+        """(version, consistent copy of the active slot)"""
+        while True:
+            version, records = self.view()
+            copy = records.copy()
+            if self.version == version:
+                return version, copy
+
+    def close(self):
+        self.slots = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def publish_scores(table, tickers, earnings_rows, game_score, score_breakdowns):
+    """Pack the live dicts in ticker-id order and publish them"""
+    records = build_scores(earnings_rows, game_score, score_breakdowns, tickers=tickers)
+    return table.publish(records)
+
+
+def sync_scores(records, earnings_rows, game_score, score_breakdowns):
+    """Copy a published slot into a worker's live dicts (in place)"""
+    fresh = {}
+    breakdowns = {}
+    for rec in records:
+        if np.isnan(rec["game_score"]):
+            continue  # ticker id with no data this refresh
+        ticker = rec["ticker"].decode()
+        fresh[ticker] = float(rec["game_score"])
+        breakdowns[ticker] = {
+            "eps": float(rec["eps"]),
+            "daily percent change": float(rec["daily"]),
+            "monthly percent change": float(rec["monthly"]),
+            "bonus": float(rec["bonus"]),
+        }
+        row = earnings_rows.get(ticker)
+        if row is not None:
+            row["daily_pct_change"] = float(rec["daily_pct_change"])
+            row["monthly_price_change"] = float(rec["monthly_price_change"])
+    replace_contents(score_breakdowns, breakdowns)
+    replace_contents(game_score, fresh)
+
+
+def run_loader(name, refresh):
+    """Own the table: fill it once, then republish every `refresh` seconds"""
+    os.environ.pop("SCORE_TABLE", None)  # this process fills the table, it doesn't attach
+    import main
+
+    table = SharedScoreTable.create(name, max(len(main.COMPANIES), 1))
+    publish_lock = threading.Lock()  # the intraday poller publishes too
+
+    def publish():
+        with publish_lock:
+            return publish_scores(table, main.COMPANIES, main.earnings_rows, main.game_score, main.score_breakdowns)
+
+    version = publish()
+    print(f"Published {len(main.game_score)} scores to shared table {name} (version {version})")
+    main.retry_listeners.append(lambda tickers: publish())  # tickers recovered after a failed ingest
+    if intraday.INTRADAY_ENABLED:
+        tracker = intraday.IntradayTracker(
+            main.earnings_rows, main.game_score, main.score_breakdowns,
+            main.POINTS, main.points_from_percent_change, on_update=lambda tickers: publish())
+        tracker.start(main.COMPANIES)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # unlink on shutdown too
+    try:
+        # Stay alive for as long as workers need the table
+        while True:
+            time.sleep(refresh or 3600)
+            if not refresh:
+                continue
+            if main.SNAPSHOT_PATH:
+                if not main.reload_snapshot_if_changed():
+                    continue
+            else:
+                main.load_earnings_data()
+            version = publish()
+            print(f"Published version {version}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill and refresh the shared-memory score table")
+    parser.add_argument("--name", default=os.environ.get("SCORE_TABLE", "fe_scores"))
+    parser.add_argument("--refresh", type=float, default=0, help="seconds between refreshes (0 = publish once)")
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]  # main.py inspects argv at import
+    run_loader(args.name, args.refresh)
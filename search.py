@@ -0,0 +1,155 @@
+"""In-memory company search for typeahead.
+
+Three structures, all kept in memory and updated per company when the
+data changes rather than rebuilt:
+
+- a sorted list of tickers, for prefix matches by bisection
+- a sorted list of (name word, ticker), for word-prefix matches on names
+- a trigram -> tickers posting map, for substring matches of 3+ chars
+
+Results are ranked exact ticker > ticker prefix > name-word prefix >
+substring, then by score, and carry only the fields a result row needs.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+import universe
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+EXACT, TICKER_PREFIX, NAME_PREFIX, SUBSTRING = range(4)
+
+
+def _words(name):
+    return {w for w in "".join(ch if ch.isalnum() else " " for ch in name.lower()).split()}
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _prefix_range(items, prefix):
+    """Slice bounds of the entries of sorted `items` starting with `prefix`"""
+    lo = bisect_left(items, prefix)
+    hi = bisect_left(items, prefix + "\uffff")
+    return lo, hi
+
+
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.docs = {}         # ticker -> result dict
+        self.keys = {}         # ticker -> (ticker lower, name lower) it is indexed under
+        self.tickers = []      # sorted lowercase tickers
+        self.words = []        # sorted (word, ticker)
+        self.trigrams = {}     # trigram -> set of tickers
+
+    # MAINTENANCE
+
+    def _add_terms(self, ticker, name):
+        key = ticker.lower()
+        insort(self.tickers, key)
+        for word in _words(name):
+            insort(self.words, (word, ticker))
+        for gram in _trigrams(key) | _trigrams(name):
+            self.trigrams.setdefault(gram, set()).add(ticker)
+
+    def _remove_terms(self, ticker, name):
+        key = ticker.lower()
+        del self.tickers[bisect_left(self.tickers, key)]
+        for word in _words(name):
+            del self.words[bisect_left(self.words, (word, ticker))]
+        for gram in _trigrams(key) | _trigrams(name):
+            postings = self.trigrams.get(gram)
+            if postings is not None:
+                postings.discard(ticker)
+                if not postings:
+                    del self.trigrams[gram]
+
+    def update(self, earnings_rows, game_score, price_of, img_of, version=None):
+        """Apply the current data; only companies whose name/score/tier changed are touched"""
+        with self.lock:
+            seen = set()
+            for ticker in universe.TICKERS:
+                row = earnings_rows.get(ticker)
+                if row is None:
+                    continue
+                seen.add(ticker)
+                name = row.get("stock name") or universe.BY_TICKER[ticker].name
+                if name == "N/A":
+                    name = universe.BY_TICKER[ticker].name
+                doc = {
+                    "id": universe.company_id(ticker),
+                    "ticker": ticker,
+                    "name": name,
+                    "tier": universe.TIER_OF[ticker],
+                    "price": price_of(ticker),
+                    "score": float(game_score.get(ticker, 0)),
+                    "img": img_of(ticker),
+                }
+                old = self.docs.get(ticker)
+                if old == doc:
+                    continue
+                lowered = name.lower()
+                if old is None:
+                    self._add_terms(ticker, lowered)
+                elif self.keys[ticker][1] != lowered:
+                    self._remove_terms(ticker, self.keys[ticker][1])
+                    self._add_terms(ticker, lowered)
+                self.docs[ticker] = doc
+                self.keys[ticker] = (ticker.lower(), lowered)
+            for ticker in [t for t in self.docs if t not in seen]:
+                self._remove_terms(ticker, self.keys.pop(ticker)[1])
+                del self.docs[ticker]
+            self.version = version
+
+    # QUERY
+
+    def _candidates(self, q):
+        """ticker -> best match rank for query `q` (lowercase)"""
+        ranks = {}
+        lo, hi = _prefix_range(self.tickers, q)
+        for key in self.tickers[lo:hi]:
+            ticker = key.upper()
+            ranks[ticker] = EXACT if key == q else TICKER_PREFIX
+        lo = bisect_left(self.words, (q,))
+        hi = bisect_left(self.words, (q + "\uffff",))
+        for _, ticker in self.words[lo:hi]:
+            ranks.setdefault(ticker, NAME_PREFIX)
+        if len(q) >= 3:
+            postings = [self.trigrams.get(gram, ()) for gram in _trigrams(q)]
+            postings.sort(key=len)
+            matches = set(postings[0]).intersection(*postings[1:]) if postings else set()
+            for ticker in matches:
+                if ticker not in ranks:
+                    key, name = self.keys[ticker]
+                    if q in key or q in name:  # trigrams can match out of order
+                        ranks[ticker] = SUBSTRING
+        return ranks
+
+    def search(self, query, limit=DEFAULT_LIMIT, tiers=None, min_score=None, max_score=None):
+        q = (query or "").strip().lower()
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        with self.lock:
+            if q:
+                ranks = self._candidates(q)
+            else:
+                ranks = dict.fromkeys(self.docs, SUBSTRING)  # empty query: everything, by score
+            results = []
+            for ticker, rank in ranks.items():
+                doc = self.docs[ticker]
+                if tiers and doc["tier"] not in tiers:
+                    continue
+                if min_score is not None and doc["score"] < min_score:
+                    continue
+                if max_score is not None and doc["score"] > max_score:
+                    continue
+                results.append((rank, -doc["score"], ticker, doc))
+        top = heapq.nsmallest(limit, results, key=lambda r: r[:3])
+        return [r[3] for r in top], len(results)
+
+
+index = SearchIndex()
@@ -0,0 +1,99 @@
+"""
+Production launcher for the API (replaces the Flask debug server).
+
+    python serve.py                                   # ASGI (uvicorn), one worker per CPU
+    python serve.py --mode wsgi --threads 32          # gunicorn gthread workers
+    python serve.py --snapshot snapshots/earnings.snap --workers 8
+
+With --snapshot, ingest runs once up front (if the snapshot is missing or
+--reingest is passed) and every worker serves from the shared snapshot
+instead of calling upstream itself.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with a production server")
+    parser.add_argument("--mode", choices=["asgi", "wsgi"], default=os.environ.get("SERVE_MODE", "asgi"))
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count())))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("ASGI_THREADS", "64")),
+                        help="handler threads per worker")
+    parser.add_argument("--backlog", type=int, default=4096, help="pending connections per socket")
+    parser.add_argument("--snapshot", default=os.environ.get("EARNINGS_SNAPSHOT"),
+                        help="serve from this ingest snapshot (built first if missing)")
+    parser.add_argument("--reingest", action="store_true", help="rebuild the snapshot before starting")
+    return parser.parse_args(argv)
+
+
+def prepare_snapshot(path, reingest):
+    if reingest or not os.path.exists(path):
+        print(f"Running ingest to build {path}...")
+        subprocess.run([sys.executable, os.path.join(HERE, "main.py"), "--ingest", "--snapshot", path],
+                       check=True, cwd=HERE)
+    os.environ["EARNINGS_SNAPSHOT"] = os.path.abspath(path)
+
+
+def run_asgi(args):
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("ASGI mode needs uvicorn and asgiref: pip install uvicorn asgiref")
+    os.environ["ASGI_THREADS"] = str(args.threads)
+    uvicorn.run(
+        "asgi:application",
+        app_dir=HERE,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        timeout_keep_alive=30,
+        lifespan="on",
+        access_log=False,
+    )
+
+
+def run_wsgi(args):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("WSGI mode needs gunicorn: pip install gunicorn")
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("backlog", args.backlog)
+            self.cfg.set("keepalive", 30)
+            self.cfg.set("chdir", HERE)
+
+        def load(self):
+            from app import app
+            return app
+
+    Server().run()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.snapshot:
+        prepare_snapshot(args.snapshot, args.reingest)
+    elif args.workers > 1 and not os.environ.get("SCORE_TABLE"):
+        print("Warning: every worker will run its own ingest; pass --snapshot to share one")
+    if args.mode == "asgi":
+        run_asgi(args)
+    else:
+        run_wsgi(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Versioned binary snapshots of ingest output.
+
+`python main.py --ingest --snapshot snapshots/earnings.snap` runs the full
+fetch -> score pipeline once and writes a snapshot; web workers started
+with EARNINGS_SNAPSHOT=snapshots/earnings.snap memory-map it at startup
+instead of calling upstream, and pick up newer versions as they appear.
+
+File layout (little-endian):
+
+    header   HEADER struct (magic, format, snapshot version, offsets)
+    scores   SCORE_DTYPE structured array, one record per ticker
+    meta     zlib-compressed JSON: earnings rows, breakdowns, catalog
+
+The scores section is read zero-copy straight out of the mapping.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+MAGIC = b"FESNAP01"
+FORMAT_VERSION = 1
+# magic, format, n_tickers, snapshot version, created_at, scores off/len, meta off/len
+HEADER = struct.Struct("<8sIIQdQQQQ")
+
+SCORE_DTYPE = np.dtype([
+    ("ticker", "S12"),
+    ("game_score", "<f8"),
+    ("eps", "<f8"),
+    ("daily", "<f8"),
+    ("monthly", "<f8"),
+    ("bonus", "<f8"),
+    ("daily_pct_change", "<f8"),
+    ("monthly_price_change", "<f8"),
+    ("surprise_pct", "<f8"),
+])
+
+
+def _nan_if_none(value):
+    return np.nan if value is None else float(value)
+
+
+def build_scores(earnings_rows, game_score, score_breakdowns, tickers=None):
+    """
+    Pack per-ticker scores into a SCORE_DTYPE array, in `tickers` order
+    (default: every scored ticker). Unscored tickers get a NaN game_score.
+    """
+    tickers = list(game_score) if tickers is None else list(tickers)
+    scores = np.zeros(len(tickers), dtype=SCORE_DTYPE)
+    for i, ticker in enumerate(tickers):
+        row = earnings_rows.get(ticker, {})
+        breakdown = score_breakdowns.get(ticker, {})
+        scores[i] = (
+            ticker.encode(),
+            _nan_if_none(game_score.get(ticker)),
+            breakdown.get("eps", 0),
+            breakdown.get("daily percent change", 0),
+            breakdown.get("monthly percent change", 0),
+            breakdown.get("bonus", 0),
+            _nan_if_none(row.get("daily_pct_change")),
+            _nan_if_none(row.get("monthly_price_change")),
+            _nan_if_none(row.get("surprise_pct")),
+        )
+    return scores
+
+
+def write_snapshot(path, earnings_rows, game_score, score_breakdowns, catalog, ticker_health=None):
+    """Atomically write a new snapshot to `path`. Returns its version."""
+    version = time.time_ns()
+    created_at = time.time()
+    scores = build_scores(earnings_rows, game_score, score_breakdowns).tobytes()
+    meta = zlib.compress(json.dumps({
+        "earnings_rows": earnings_rows,
+        "score_breakdowns": score_breakdowns,
+        "catalog": catalog,
+        "ticker_health": ticker_health or {},
+    }, default=str).encode(), 6)
+
+    scores_offset = HEADER.size
+    meta_offset = scores_offset + len(scores)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(game_score), version, created_at,
+        scores_offset, len(scores), meta_offset, len(meta)
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(scores)
+        f.write(meta)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)  # readers never see a half-written file
+    return version
+
+
+def read_header(path):
+    """(format, n_tickers, version, created_at, scores_off, scores_len, meta_off, meta_len)"""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError(f"{path} is not a snapshot (too short)")
+    magic, *fields = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a snapshot (bad magic)")
+    if fields[0] != FORMAT_VERSION:
+        raise ValueError(f"{path} has unsupported snapshot format {fields[0]}")
+    return tuple(fields)
+
+
+class Snapshot:
+    """A memory-mapped snapshot. `scores` is a zero-copy view into the mapping."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, n_tickers, version, created_at, s_off, s_len, m_off, m_len = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a readable snapshot")
+        self.version = version
+        self.created_at = datetime.fromtimestamp(created_at, timezone.utc)
+        self.scores = np.frombuffer(self._mmap, dtype=SCORE_DTYPE, count=n_tickers, offset=s_off)
+        self._meta_range = (m_off, m_len)
+        self._meta = None
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            off, length = self._meta_range
+            self._meta = json.loads(zlib.decompress(self._mmap[off:off + length]))
+        return self._meta
+
+    def game_score(self):
+        return {
+            t.decode(): float(s)
+            for t, s in zip(self.scores["ticker"], self.scores["game_score"])
+            if not np.isnan(s)
+        }
+
+    def close(self):
+        self.scores = None  # drop the buffer export before closing the mapping
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping is freed with it
+
+
+def replace_contents(live, fresh):
+    """
+    Make `live` equal `fresh` in place without ever emptying it: other
+    threads reading by key see each ticker's old or new value, never a gap
+    """
+    live.update(fresh)
+    for key in [k for k in list(live) if k not in fresh]:
+        live.pop(key, None)
+
+
+def apply_snapshot(snap, earnings_rows, game_score, score_breakdowns, refresh_status):
+    """Replace the contents of the live dicts (in place, so importers see it)"""
+    meta = snap.meta
+    new_scores = snap.game_score()
+    replace_contents(earnings_rows, meta["earnings_rows"])
+    replace_contents(score_breakdowns, meta.get("score_breakdowns", {}))
+    replace_contents(game_score, new_scores)
+    refresh_status.update(
+        last_refresh=snap.created_at,
+        tickers_loaded=len(earnings_rows),
+        snapshot_version=snap.version,
+        source="snapshot"
+    )
+
+
+class SnapshotWatcher:
+    """Reloads the live dicts whenever a newer snapshot version lands at `path`"""
+
+    def __init__(self, path, poll_seconds=5.0):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.current = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()
+
+    def load(self, earnings_rows, game_score, score_breakdowns, refresh_status):
+        snap = Snapshot(self.path)
+        with self.lock:
+            apply_snapshot(snap, earnings_rows, game_score, score_breakdowns, refresh_status)
+            previous, self.current = self.current, snap
+        if previous is not None:
+            previous.close()
+        return snap
+
+    def maybe_reload(self, earnings_rows, game_score, score_breakdowns, refresh_status):
+        """Cheap enough to call per request: stats at most every poll_seconds"""
+        now = time.monotonic()
+        if now - self.last_check < self.poll_seconds:
+            return False
+        self.last_check = now
+        try:
+            version = read_header(self.path)[2]
+        except (OSError, ValueError):
+            return False
+        if self.current is not None and version <= self.current.version:
+            return False
+        self.load(earnings_rows, game_score, score_breakdowns, refresh_status)
+        print(f"Reloaded earnings snapshot version {version}")
+        return True
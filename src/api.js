@@ -25,6 +25,14 @@ export function getCompanies() {
 	return request("/companies");
 }
 
+export function searchCompanies(query, { limit = 20, tier, minScore, maxScore } = {}) {
+	const params = new URLSearchParams({ q: query, limit });
+	if (tier) params.set("tier", tier);
+	if (minScore != null) params.set("min_score", minScore);
+	if (maxScore != null) params.set("max_score", maxScore);
+	return request(`/api/search?${params}`);
+}
+
 export function getCompanyByID(id) {
 	return request(`/companies/${id}`);
 }
@@ -0,0 +1,47 @@
+"""
+Test setup: every test runs offline against synthetic replay fixtures.
+
+The environment has to be in place before main.py (imported by app,
+league, user, ...) runs its ingest at import time, so it is set here at
+collection rather than in a fixture.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORK_DIR = tempfile.mkdtemp(prefix="fantasy-earnings-tests-")
+FIXTURES = os.path.join(WORK_DIR, "fixtures")
+
+for name in ("LEDGER_DIR", "EARNINGS_SNAPSHOT", "SCORE_TABLE", "LOADGEN_USERS", "PROFILE", "SETTLEMENT", "INTRADAY"):
+    os.environ.pop(name, None)
+os.environ["MARKET_DATA"] = "replay:" + FIXTURES
+os.environ["QUOTE_REFRESH_SECONDS"] = "0"
+os.environ["INGEST_RETRY_SECONDS"] = "0"
+os.environ["HISTORY_DIR"] = os.path.join(WORK_DIR, "history")
+
+import benchmark  # noqa: E402
+import universe  # noqa: E402
+
+benchmark.make_fixtures(FIXTURES, universe.TICKERS)
+
+
+@pytest.fixture(scope="session")
+def game():
+    """main.py after ingesting the replay fixtures"""
+    import main
+    return main
+
+
+@pytest.fixture
+def make_user(game):
+    from user import User
+
+    def make(user_id, balance=100.0):
+        return User(user_id, user_id, "", balance)
+
+    return make
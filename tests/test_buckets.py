@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+import buckets
+
+
+@pytest.mark.parametrize("pct, label", [
+    (-0.25, "big_decrease"),
+    (-0.10, "big_decrease"),
+    (-0.0999, "small_decrease"),
+    (-0.05, "small_decrease"),
+    (0.0, "no_change"),
+    (0.02, "no_change"),
+    (0.0201, "small_increase"),
+    (0.05, "small_increase"),
+    (0.30, "big_increase"),
+    (None, "no_change"),
+    (math.nan, "no_change"),
+])
+def test_default_schedule_labels(pct, label):
+    assert buckets.Schedule().label(pct) == label
+
+
+def test_vectorized_indexes_match_scalar():
+    schedule = buckets.Schedule()
+    pcts = [-0.2, -0.1, -0.07, -0.05, 0.0, 0.02, 0.03, 0.05, 0.06, math.nan]
+    assert schedule.indexes(pcts).tolist() == [schedule.index(p) for p in pcts]
+
+
+def test_points_for_many_tables():
+    schedule = buckets.Schedule()
+    tables = [
+        {label: i for i, label in enumerate(buckets.LABELS)},
+        {label: 10 * i for i, label in enumerate(buckets.LABELS)},
+    ]
+    points = schedule.points([-0.2, 0.0, 0.1], tables)
+    assert points.shape == (2, 3)
+    np.testing.assert_array_equal(points, [[0, 2, 4], [0, 20, 40]])
+
+
+def test_custom_breakpoints():
+    schedule = buckets.Schedule((-0.2, -0.1, 0.1, 0.2))
+    assert schedule.label(-0.15) == "small_decrease"
+    assert schedule.label(0.15) == "small_increase"
+
+
+@pytest.mark.parametrize("breakpoints", [(0.1, -0.1, 0.2, 0.3), (-0.1, -0.1, 0.1, 0.2), (-0.1, 0.1)])
+def test_invalid_breakpoints(breakpoints):
+    with pytest.raises(ValueError):
+        buckets.Schedule(breakpoints)
+
+
+def test_memoized_label_follows_changes():
+    buckets.clear_cache()
+    assert buckets.label("daily_change", 0.03, "AAPL", "2024-05-03") == "small_increase"
+    assert buckets.label("daily_change", 0.08, "AAPL", "2024-05-03") == "big_increase"
+    assert buckets.label("monthly_change", -0.3) == "big_decrease"
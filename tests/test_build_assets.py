@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+import build_assets
+
+pytest.importorskip("PIL")
+
+
+def test_build_real_logos(tmp_path, capsys):
+    manifest = build_assets.build(str(tmp_path), [200, 400], 80)
+    sources = [f for f in os.listdir(os.path.join(build_assets.HERE, "img"))
+               if os.path.splitext(f)[1].lower() in build_assets.IMAGE_EXTENSIONS]
+    assert len(manifest) == len(sources)
+    assert (tmp_path / "manifest.json").exists()
+
+    for source, entry in manifest.items():
+        assert (tmp_path / entry["original"]).exists()
+        for name in entry["variants"].values():
+            assert (tmp_path / name).exists()
+
+    # img/spot.png is really an SVG: kept as a hashed original, no variants
+    assert manifest["img/spot.png"]["variants"] == {}
+    assert "Skipping WebP variants for spot.png" in capsys.readouterr().out
+    assert sum(1 for entry in manifest.values() if entry["variants"]) >= len(manifest) - 1
@@ -0,0 +1,59 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client(game):
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture
+def league_id(client):
+    owner = client.post("/api/users", json={"username": "owner"}).get_json()["user_id"]
+    other = client.post("/api/users", json={"username": "other"}).get_json()["user_id"]
+    league_id = client.post("/api/leagues", json={"name": "L", "owner_id": owner}).get_json()["league_id"]
+    client.post(f"/api/leagues/{league_id}/join", json={"user_id": other})
+    return league_id
+
+
+@pytest.fixture
+def draft_id(client, league_id):
+    created = client.post(f"/api/leagues/{league_id}/drafts", json={"rounds": 1, "start": True})
+    assert created.status_code == 201
+    return created.get_json()["draft_id"]
+
+
+def event_ids(body):
+    return [int(line[4:]) for line in body.decode().splitlines() if line.startswith("id: ")]
+
+
+def read_events(client, path, **kwargs):
+    response = client.get(path, buffered=False, **kwargs)
+    assert response.status_code == 200
+    body = next(response.response)  # every frame already published is queued before the first read
+    response.close()
+    return body
+
+
+def test_events_resume_after_since(client, draft_id):
+    assert event_ids(read_events(client, f"/api/drafts/{draft_id}/events?since=1"))[0] == 2
+
+
+def test_events_resume_after_last_event_id(client, draft_id):
+    body = read_events(client, f"/api/drafts/{draft_id}/events", headers={"Last-Event-ID": "1"})
+    assert event_ids(body)[0] == 2
+
+
+def test_bad_last_event_id_falls_back_to_since(client, draft_id):
+    body = read_events(client, f"/api/drafts/{draft_id}/events?since=1", headers={"Last-Event-ID": "abc"})
+    assert event_ids(body)[0] == 2
+    body = read_events(client, f"/api/drafts/{draft_id}/events", headers={"Last-Event-ID": "abc"})
+    assert event_ids(body)[0] == 1
+
+
+@pytest.mark.parametrize("options", [
+    {"pick_seconds": 0}, {"pick_seconds": -5}, {"bid_seconds": "nan"}, {"bid_seconds": "inf"},
+    {"pick_seconds": "soon"}, {"rounds": 70000}, {"rounds": 0},
+])
+def test_invalid_draft_options(client, league_id, options):
+    assert client.post(f"/api/leagues/{league_id}/drafts", json=options).status_code == 400
@@ -0,0 +1,88 @@
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client(game):
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture
+def slots():
+    import export
+    return export.slots
+
+
+def test_csv_export(client, game):
+    response = client.get("/api/export/companies?columns=ticker,game_score")
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    response.close()
+    assert response.status_code == 200
+    assert rows[0] == ["ticker", "game_score"]
+    assert len(rows) - 1 == len(game.earnings_rows)
+
+
+def test_arrow_export(client, game):
+    response = client.get("/api/export/companies?format=arrow&columns=ticker,game_score,tier")
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    assert "companies.arrows" in response.headers["Content-Disposition"]
+    table = pa.ipc.open_stream(response.get_data()).read_all()
+    response.close()
+    assert table.schema == pa.schema([("ticker", pa.string()), ("game_score", pa.float64()), ("tier", pa.string())])
+    assert table.num_rows == len(game.earnings_rows)
+    assert set(table.column("ticker").to_pylist()) == set(game.earnings_rows)
+
+
+def test_parquet_export(client, game):
+    response = client.get("/api/export/leaderboard?format=parquet")
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.apache.parquet"
+    table = pq.read_table(io.BytesIO(response.get_data()))
+    response.close()
+    import export
+    assert table.schema.names == list(export.COLUMNS["leaderboard"])
+    assert table.schema.field("rank").type == pa.int64()
+    assert table.schema.field("score").type == pa.float64()
+    assert table.num_rows == len(client.get("/api/leaderboard").get_json())
+
+
+def test_parquet_writes_one_row_group_per_batch():
+    import export
+    rows = [{"rank": i, "user_id": f"u{i}", "username": f"user {i}", "score": i / 2, "companies_count": 1}
+            for i in range(5)]
+    data = b"".join(export.encode("leaderboard", iter(rows), "parquet", batch_rows=2))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.read().column("score").to_pylist() == [0.0, 0.5, 1.0, 1.5, 2.0]
+
+
+def test_slot_released_after_get_and_head(client, slots):
+    for method in ("get", "head", "get"):
+        response = getattr(client, method)("/api/export/holdings")
+        assert response.status_code == 200
+        response.close()
+        assert slots.acquire(blocking=False)
+        slots.release()
+
+
+def test_slot_released_when_body_never_read(client, slots):
+    response = client.get("/api/export/companies", buffered=False)
+    assert response.status_code == 200
+    assert client.get("/api/export/companies").status_code == 429
+    response.close()  # client went away before the first chunk
+    response = client.get("/api/export/companies")
+    assert response.status_code == 200
+    response.close()
+
+
+def test_bad_requests_do_not_take_a_slot(client, slots):
+    assert client.get("/api/export/companies?columns=nope").status_code == 400
+    assert client.get("/api/export/nothing").status_code == 404
+    assert slots.acquire(blocking=False)
+    slots.release()
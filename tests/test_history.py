@@ -0,0 +1,56 @@
+import pytest
+
+import history
+
+
+@pytest.fixture
+def store(tmp_path):
+    return history.HistoryStore(str(tmp_path))
+
+
+def settle(store, period, score=1.0):
+    return store.settle(period, {"AAPL": score}, {"AAPL": {"eps": score}}, {history.GLOBAL: {"alice": score * 2}},
+                        settled_at=history.period_end(period).toordinal())
+
+
+def test_settle_once_per_period(store):
+    assert settle(store, "2024-05-02")
+    assert not settle(store, "2024-05-02")
+    assert store.periods == ["2024-05-02"]
+
+
+def test_rejects_backwards_and_bad_labels(store):
+    settle(store, "2024-05-02")
+    settle(store, "2024-05-03")
+    for label in ("2024-05-01", "2024-05-03x", "soon", "2024-W99"):
+        with pytest.raises(ValueError):
+            settle(store, label)
+    assert not settle(store, "2024-05-02")  # already settled, not "backwards"
+    assert store.periods == ["2024-05-02", "2024-05-03"]
+
+
+def test_weekly_labels_order_by_their_friday():
+    assert history.period_end("2024-W18").isoformat() == "2024-05-03"
+
+
+def test_history_is_read_back_by_another_store(store, tmp_path):
+    settle(store, "2024-05-02", 1.0)
+    settle(store, "2024-05-03", 3.0)
+    reader = history.HistoryStore(str(tmp_path))
+    assert [p["score"] for p in reader.company_history("AAPL")] == [1.0, 3.0]
+    assert [p["period"] for p in reader.user_history("alice")] == ["2024-05-02", "2024-05-03"]
+    start = history.period_end("2024-05-03").toordinal()
+    assert [p["score"] for p in reader.user_history("alice", start=start)] == [6.0]
+
+
+def test_settlement_interrupted_before_companies_is_redone(store, tmp_path):
+    settle(store, "2024-05-02", 1.0)
+    # Crash after the users line, before the companies line
+    store._append("users", {"period": "2024-05-03", "settled_at": 0.0, "totals": {history.GLOBAL: {"alice": 99.0}}})
+    assert [p["score"] for p in store.user_history("alice")] == [2.0]
+    assert store.last_period() == "2024-05-02"
+
+    assert settle(store, "2024-05-03", 3.0)
+    for reader in (store, history.HistoryStore(str(tmp_path))):
+        assert [p["score"] for p in reader.user_history("alice")] == [2.0, 6.0]
+        assert [p["score"] for p in reader.company_history("AAPL")] == [1.0, 3.0]
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import intraday
+import market_data
+
+
+class CalendarProvider(market_data.MarketDataProvider):
+    """Fixed earnings calendar with a settable date and flat daily bars"""
+
+    def __init__(self, day, calendar):
+        self.day = day
+        self.calendar = calendar
+
+    def today(self):
+        return self.day
+
+    def earnings_dates(self, ticker):
+        return self.calendar.get(ticker, [])
+
+    def daily_bars(self, ticker, start, end):
+        return pd.DataFrame({"Close": [100.0]}, index=[pd.Timestamp(self.day - timedelta(days=1))])
+
+
+@pytest.fixture
+def provider():
+    previous = market_data.get_provider()
+    monday = date(2026, 10, 19)
+    calendar = {"AAA": [monday], "BBB": [monday + timedelta(days=1)], "CCC": [monday + timedelta(days=2)]}
+    stub = CalendarProvider(monday, calendar)
+    market_data.set_provider(stub)
+    yield stub
+    market_data.set_provider(previous)
+
+
+def make_tracker():
+    return intraday.IntradayTracker({}, {}, {}, {"daily_change": {}}, lambda pct: "no_change")
+
+
+def test_reporters_follow_the_provider_date(provider):
+    tracker = make_tracker()
+    tickers = ["AAA", "BBB", "CCC"]
+    assert tracker.refresh_reporters(tickers)
+    assert sorted(tracker.reactions) == ["AAA"]
+    assert not tracker.refresh_reporters(tickers)  # same day: no lookup
+
+    provider.day += timedelta(days=1)  # AAA reported yesterday (after hours), BBB today
+    tracker.refresh_reporters(tickers)
+    assert sorted(tracker.reactions) == ["AAA", "BBB"]
+
+    provider.day += timedelta(days=1)
+    tracker.refresh_reporters(tickers)
+    assert sorted(tracker.reactions) == ["BBB", "CCC"]
+
+
+def test_rescore_reapplies_points_after_reingest(provider):
+    points = {"daily_change": {"no_change": 0, "big_increase": 5}}
+    bucket = lambda pct: "big_increase" if pct > 0.1 else "no_change"
+    game_score = {"AAA": 10}
+    breakdowns = {"AAA": {"eps": 10, "daily percent change": 0}}
+    tracker = intraday.IntradayTracker({}, game_score, breakdowns, points, bucket)
+    reaction = tracker.track("AAA")
+    reaction.bars.append(1, 120, 120, 120, 120, 0)
+
+    assert tracker._rescore(reaction)
+    assert game_score["AAA"] == 15
+    assert not tracker._rescore(reaction)  # nothing moved
+
+    # A re-ingest rewrites the day's breakdown from the daily bars
+    breakdowns["AAA"] = {"eps": 10, "daily percent change": 0}
+    game_score["AAA"] = 10
+    assert tracker._rescore(reaction)
+    assert game_score["AAA"] == 15
+    assert breakdowns["AAA"]["daily percent change"] == 5
@@ -0,0 +1,39 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client(game):
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture(scope="module")
+def owner(client):
+    return client.post("/api/users", json={"username": "commissioner"}).get_json()["user_id"]
+
+
+@pytest.mark.parametrize("rules", [
+    {"budget": -1},
+    {"budget": "nan"},
+    {"budget": "inf"},
+    {"budget": "lots"},
+    {"tier_prices": {"premium": -5}},
+    {"tier_prices": {"premium": "Infinity"}},
+    {"tier_prices": {"galactic": 5}},
+    {"tier_prices": [5]},
+])
+def test_rejects_bad_rules(client, owner, rules):
+    response = client.post("/api/leagues", json={"name": "L", "owner_id": owner, **rules})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_accepts_zero_prices(client, owner):
+    import league
+    tier = next(iter(league.TIER_PRICES))
+    response = client.post("/api/leagues", json={"name": "L", "owner_id": owner, "budget": 50,
+                                                 "tier_prices": {tier: 0}})
+    assert response.status_code == 201
+    rules = response.get_json()["rules"]
+    assert rules["budget"] == 50.0
+    assert rules["tier_prices"][tier] == 0.0
@@ -0,0 +1,129 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import ledger
+
+
+def recover(book, make_user):
+    return book.recover(lambda r: make_user(r["user_id"], r["initial_balance"]))
+
+
+def test_recover_matches_live_state(tmp_path, make_user):
+    book = ledger.Ledger(str(tmp_path))
+    alice, bob = make_user("alice"), make_user("bob", 50.0)
+    book.record(ledger.BUY, alice, "AAPL", 2, -30.0, 180.0)
+    book.record(ledger.BUY, bob, "MSFT", 1, -15.0)
+    book.write_snapshot({"alice": alice, "bob": bob})
+    book.record(ledger.SELL, alice, "AAPL", -1, 15.0)
+    book.record(ledger.DRAFT_ADD, bob, "SOFI", 3, -9.0)
+
+    users = recover(ledger.Ledger(str(tmp_path)), make_user)
+    for live in (alice, bob):
+        assert users[live.user_id].portfolio.holdings == live.portfolio.holdings
+        assert users[live.user_id].balance == pytest.approx(live.balance)
+    assert users["alice"].portfolio.entry_prices == {"AAPL": 180.0}
+
+
+def test_failed_trade_is_neither_logged_nor_applied(tmp_path, make_user):
+    book = ledger.Ledger(str(tmp_path))
+    alice = make_user("alice")
+    book.record(ledger.BUY, alice, "AAPL", 1, -15.0)
+    with pytest.raises(ValueError):
+        book.record(ledger.SELL, alice, "AAPL", -5, 75.0)
+    assert book.count == 1
+    assert alice.portfolio.holdings == {"AAPL": 1}
+    assert alice.balance == pytest.approx(85.0)
+
+
+def test_users_registered_with_holdings(tmp_path, make_user):
+    book = ledger.Ledger(str(tmp_path))
+    carol = make_user("carol", 70.0)
+    carol.portfolio.add_stock("NVDA", 2)
+    book.register_user(carol)
+    book.record(ledger.BUY, carol, "AAPL", 1, -15.0)
+
+    users = recover(ledger.Ledger(str(tmp_path)), make_user)
+    assert users["carol"].portfolio.holdings == {"NVDA": 2, "AAPL": 1}
+    assert users["carol"].balance == pytest.approx(55.0)
+
+
+def test_events_map_through_the_ledger_ticker_table(tmp_path, make_user):
+    book = ledger.Ledger(str(tmp_path))
+    alice = make_user("alice")
+    book.record(ledger.BUY, alice, "SOFI", 1, -3.0)
+    book.record(ledger.BUY, alice, "AAPL", 1, -15.0)
+    with open(tmp_path / "tickers.json") as f:
+        assert json.load(f) == ["SOFI", "AAPL"]
+    assert book.read_events()["ticker"].tolist() == [0, 1]
+
+
+def test_bulk_replay_matches_recovery(tmp_path, make_user):
+    book = ledger.Ledger(str(tmp_path))
+    rng = np.random.default_rng(3)
+    users = {f"u{i}": make_user(f"u{i}") for i in range(5)}
+    tickers = ["AAPL", "MSFT", "SOFI", "NVDA"]
+    for _ in range(200):
+        user = users[f"u{rng.integers(5)}"]
+        ticker = tickers[rng.integers(4)]
+        if user.portfolio.holdings.get(ticker) and rng.random() < 0.4:
+            book.record(ledger.SELL, user, ticker, -1, 2.0)
+        else:
+            book.record(ledger.BUY, user, ticker, 1, -2.0)
+
+    scores = np.array([float(i + 1) for i in range(len(book.tickers))])
+    holdings, balances, totals = ledger.bulk_replay(
+        book.read_events(), len(book.user_ids), len(book.tickers),
+        [r["initial_balance"] for r in book.user_info], scores)
+    for uidx, user_id in enumerate(book.user_ids):
+        user = users[user_id]
+        row = {book.tickers[t]: n for t, n in holdings.row(uidx).items()}
+        assert row == user.portfolio.holdings
+        assert balances[uidx] == pytest.approx(user.balance)
+        expected = sum(scores[book.ticker_index[t]] * n for t, n in user.portfolio.holdings.items())
+        assert totals[uidx] == pytest.approx(expected)
+
+
+def test_replay_cli_checks_totals_against_snapshot(tmp_path, make_user, capsys):
+    book = ledger.Ledger(str(tmp_path))
+    alice, bob = make_user("alice"), make_user("bob")
+    book.record(ledger.BUY, alice, "AAPL", 2, -30.0)
+    book.record(ledger.BUY, bob, "SOFI", 1, -3.0)
+    book.write_snapshot({"alice": alice, "bob": bob})
+
+    assert ledger._replay_cli(str(tmp_path), True, {"AAPL": 10.0, "SOFI": 4.0}) == 0
+    out = capsys.readouterr().out
+    assert "sum 24.00" in out
+    assert "top alice with 20.00" in out
+
+
+def test_snapshot_count_covers_its_contents(tmp_path, make_user):
+    book = ledger.Ledger(str(tmp_path))
+    alice = make_user("alice")
+    book.record(ledger.BUY, alice, "AAPL", 1, -15.0)
+    path = book.write_snapshot({"alice": alice})
+    with open(path) as f:
+        snap = json.load(f)
+    assert snap["events"] == 1
+    assert snap["users"]["alice"]["holdings"] == {"AAPL": 1}
+    assert os.path.basename(path) == "snapshot-000000000001.json"
+
+
+def test_bulk_replay_is_sparse_and_nets_out_positions():
+    events = np.zeros(4, dtype=ledger.EVENT_DTYPE)
+    events["user"] = [0, 0, 2, 2]
+    events["ticker"] = [5, 5, 1, 1]
+    events["shares"] = [3, -3, 2, 1]
+    events["cash"] = [-9, 9, -6, -3]
+    n_users, n_tickers = 1_000_000, 50_000  # dense would be 5e10 cells
+    holdings, balances, totals = ledger.bulk_replay(
+        events, n_users, n_tickers, np.full(n_users, 100.0), np.ones(n_tickers),
+        initial_holdings=([1], [7], [4]))
+    assert holdings.row(0) == {}
+    assert holdings.row(1) == {7: 4}
+    assert holdings.row(2) == {1: 3}
+    assert len(holdings.shares) == 2
+    assert balances[2] == pytest.approx(91.0)
+    assert totals[:3].tolist() == [0.0, 4.0, 3.0]
@@ -0,0 +1,47 @@
+import pytest
+
+import scoretable
+import snapshot
+
+
+@pytest.fixture
+def snap(game, tmp_path):
+    path = str(tmp_path / "earnings.snap")
+    snapshot.write_snapshot(path, game.earnings_rows, game.game_score, game.score_breakdowns, {})
+    opened = snapshot.Snapshot(path)
+    yield opened
+    opened.close()
+
+
+def test_snapshot_round_trip(game, snap):
+    rows, scores, breakdowns, status = {"GONE": {}}, {"GONE": 1.0}, {"GONE": {}}, {}
+    snapshot.apply_snapshot(snap, rows, scores, breakdowns, status)
+    assert scores == pytest.approx(dict(game.game_score))
+    assert rows.keys() == game.earnings_rows.keys()
+    assert breakdowns == game.score_breakdowns
+    assert status["source"] == "snapshot"
+    assert status["tickers_loaded"] == len(game.earnings_rows)
+
+
+def test_score_table_round_trip(game, snap):
+    rows = {t: dict(r) for t, r in game.earnings_rows.items()}
+    scores, breakdowns = {"GONE": 1.0}, {"GONE": {"eps": 1.0}}
+    scoretable.sync_scores(snap.scores, rows, scores, breakdowns)
+    assert scores == pytest.approx(dict(game.game_score))
+    assert breakdowns.keys() == game.game_score.keys()
+
+
+def test_score_table_workers_need_a_snapshot(game, monkeypatch):
+    monkeypatch.setattr(game, "SNAPSHOT_PATH", None)
+    monkeypatch.setattr(game, "SCORE_TABLE_NAME", "fe_scores_missing")
+    with pytest.raises(RuntimeError, match="EARNINGS_SNAPSHOT"):
+        game.attach_score_table()
+    assert game.score_table is None
+
+
+def test_replace_contents_keeps_the_same_dict():
+    live = {"a": 1, "b": 2}
+    same = live
+    snapshot.replace_contents(live, {"b": 3, "c": 4})
+    assert same is live
+    assert live == {"b": 3, "c": 4}
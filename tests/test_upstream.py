@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+import upstream
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = upstream.TokenBucket(rate=20, capacity=2)
+    started = time.monotonic()
+    waits = [bucket.acquire() for _ in range(6)]
+    elapsed = time.monotonic() - started
+    assert waits[:2] == [0.0, 0.0]
+    assert all(w > 0 for w in waits[2:])
+    assert elapsed >= (6 - 2) / 20 * 0.9
+
+
+def gated(result=None, error=None):
+    """Stub response that blocks until released, so callers overlap"""
+    release = threading.Event()
+
+    def respond(ticker, *args, **kwargs):
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+
+    return respond, release
+
+
+def run_callers(client, n, method="info", ticker="AAPL"):
+    results, errors = [None] * n, [None] * n
+
+    def caller(i):
+        try:
+            results[i] = client.call(method, ticker)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def wait_for_coalesced(client, n, method="info"):
+    deadline = time.monotonic() + 5
+    while client.stats().get(method, {}).get("coalesced", 0) < n:
+        assert time.monotonic() < deadline, "callers never coalesced"
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    info = {"shortName": "Apple"}
+    respond, release = gated(result=info)
+    backend = upstream.StubBackend({("info", "AAPL"): respond})
+    client = upstream.UpstreamClient(backend, rate=100, burst=100)
+
+    threads, results, errors = run_callers(client, 8)
+    wait_for_coalesced(client, 7)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert backend.calls == [("info", "AAPL")]
+    assert errors == [None] * 8
+    assert all(r is info for r in results)
+    assert client.stats()["info"]["calls"] == 1
+
+
+def test_errors_reach_every_waiter():
+    failure = RuntimeError("upstream down")
+    respond, release = gated(error=failure)
+    backend = upstream.StubBackend({("info", "AAPL"): respond})
+    client = upstream.UpstreamClient(backend, rate=100, burst=100)
+
+    threads, results, errors = run_callers(client, 5)
+    wait_for_coalesced(client, 4)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(backend.calls) == 1
+    assert all(e is failure for e in errors)
+    assert client.stats()["info"]["errors"] == 1
+    # the failed flight is gone: the next call goes upstream again
+    backend.set("info", "AAPL", {"shortName": "Apple"})
+    assert client.info("AAPL") == {"shortName": "Apple"}
+    assert len(backend.calls) == 2
+
+
+def test_different_arguments_are_not_coalesced():
+    backend = upstream.StubBackend({("download", "AAPL"): lambda t, **kw: kw["interval"]})
+    client = upstream.UpstreamClient(backend, rate=100, burst=100)
+    assert client.download("AAPL", interval="1d") == "1d"
+    assert client.download("AAPL", interval="1m") == "1m"
+    assert len(backend.calls) == 2
+
+
+def test_rate_limit_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(upstream.time, "sleep", lambda seconds: None)
+    attempts = []
+
+    def flaky(ticker):
+        attempts.append(ticker)
+        if len(attempts) == 1:
+            raise Exception("429 Too Many Requests")
+        return {"shortName": "Apple"}
+
+    client = upstream.UpstreamClient(upstream.StubBackend({("info", "AAPL"): flaky}), rate=100, burst=100, retries=1)
+    assert client.info("AAPL") == {"shortName": "Apple"}
+    assert client.stats()["info"]["throttled"] == 1
+
+
+def test_other_errors_are_not_retried():
+    backend = upstream.StubBackend({("info", "AAPL"): ValueError("bad ticker")})
+    client = upstream.UpstreamClient(backend, rate=100, burst=100, retries=3)
+    with pytest.raises(ValueError):
+        client.info("AAPL")
+    assert len(backend.calls) == 1
+
+
+def test_use_backend_restores_the_shared_client():
+    original = upstream.client.backend
+    with upstream.use_backend(upstream.StubBackend()) as stub:
+        assert upstream.client.backend is stub
+    assert upstream.client.backend is original
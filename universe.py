@@ -0,0 +1,150 @@
+"""The ticker universe: which companies are in the game, their tiers and metadata.
+
+Loaded once from UNIVERSE_FILE (default universe.csv next to this module):
+
+    ticker,name,tier,market_cap,img
+    AAPL,Apple,premium,,
+    SOFI,SoFi,,9800000000,
+
+A blank tier is derived from market cap (the file's market_cap column, or
+the quote's marketCap once ingest has fetched it); a blank img falls back
+to img/<ticker>.png when that file exists, else the mascot. Everything
+else looks tickers up through the indexes built here, so membership, tier
+and id lookups are O(1) however large the universe gets.
+"""
+import csv
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+UNIVERSE_FILE = os.environ.get("UNIVERSE_FILE", os.path.join(HERE, "universe.csv"))
+
+TIERS = ("premium", "mid_tier", "wildcard", "risky")
+# Minimum market cap for each tier, largest first; anything smaller is risky
+TIER_MARKET_CAPS = (
+    ("premium", 200e9),
+    ("mid_tier", 20e9),
+    ("wildcard", 5e9),
+)
+DEFAULT_IMG = "img/mascot.png"
+
+
+def tier_for_market_cap(market_cap):
+    for tier, floor in TIER_MARKET_CAPS:
+        if market_cap >= floor:
+            return tier
+    return "risky"
+
+
+class Company:
+    __slots__ = ("ticker", "name", "tier", "market_cap", "img", "fixed_tier")
+
+    def __init__(self, ticker, name, tier, market_cap, img):
+        self.ticker = ticker
+        self.name = name or ticker
+        self.market_cap = market_cap
+        self.img = img
+        self.fixed_tier = tier in TIERS  # set in the file rather than derived
+        if self.fixed_tier:
+            self.tier = tier
+        elif market_cap:
+            self.tier = tier_for_market_cap(market_cap)
+        else:
+            self.tier = "risky"  # until ingest sees a market cap
+
+
+def _img_for(ticker, img):
+    if img:
+        return img
+    path = f"img/{ticker.lower()}.png"
+    return path if os.path.exists(os.path.join(HERE, path)) else DEFAULT_IMG
+
+
+def load(path=UNIVERSE_FILE):
+    """Companies in file order (that order is the stable company id)"""
+    companies = []
+    seen = set()
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            ticker = (row.get("ticker") or "").strip().upper()
+            if not ticker or ticker.startswith("#") or ticker in seen:
+                continue
+            seen.add(ticker)
+            cap = (row.get("market_cap") or "").strip()
+            companies.append(Company(
+                ticker,
+                (row.get("name") or "").strip(),
+                (row.get("tier") or "").strip(),
+                float(cap) if cap else None,
+                _img_for(ticker, (row.get("img") or "").strip()),
+            ))
+    return companies
+
+
+#  INDEXES
+
+COMPANIES = []     # Company objects, id order
+TICKERS = []       # tickers, id order (company id = index + 1)
+TICKER_INDEX = {}  # ticker -> index
+BY_TICKER = {}     # ticker -> Company
+TIER_OF = {}       # ticker -> tier
+BY_TIER = {tier: [] for tier in TIERS}
+
+
+def _reindex_tiers():
+    TIER_OF.clear()
+    for tier in TIERS:
+        BY_TIER[tier].clear()
+    for company in COMPANIES:
+        TIER_OF[company.ticker] = company.tier
+        BY_TIER[company.tier].append(company.ticker)
+
+
+def install(companies):
+    """Replace the universe in place (other modules hold references to these containers)"""
+    COMPANIES[:] = companies
+    TICKERS[:] = [c.ticker for c in companies]
+    TICKER_INDEX.clear()
+    TICKER_INDEX.update((t, i) for i, t in enumerate(TICKERS))
+    BY_TICKER.clear()
+    BY_TICKER.update((c.ticker, c) for c in companies)
+    _reindex_tiers()
+
+
+def update_market_caps(caps):
+    """Record market caps seen at ingest and re-derive tiers not fixed in the file"""
+    changed = False
+    for ticker, cap in caps.items():
+        company = BY_TICKER.get(ticker)
+        if company is None or not cap:
+            continue
+        company.market_cap = float(cap)
+        if not company.fixed_tier:
+            tier = tier_for_market_cap(company.market_cap)
+            changed = changed or tier != company.tier
+            company.tier = tier
+    if changed:
+        _reindex_tiers()
+    return changed
+
+
+def company_id(ticker):
+    """1-based id used by the frontend, or None"""
+    index = TICKER_INDEX.get(ticker)
+    return None if index is None else index + 1
+
+
+def ticker_for_id(company_id):
+    """Ticker for a 1-based id, or None when out of range"""
+    try:
+        index = int(company_id) - 1
+    except (TypeError, ValueError):
+        return None
+    return TICKERS[index] if 0 <= index < len(TICKERS) else None
+
+
+def img_for(ticker):
+    company = BY_TICKER.get(ticker)
+    return company.img if company else DEFAULT_IMG
+
+
+install(load())
@@ -0,0 +1,286 @@
+"""Shared upstream client for all market-data calls.
+
+Every yfinance request made by the game goes through the module-level
+``client`` so that concurrent callers share one rate limit, one HTTP
+session and one in-flight request per (method, ticker, args) key.
+
+Tests can swap the network out with ``set_backend(StubBackend(...))``.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import yfinance as yf
+
+import metrics
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:  # older yfinance
+    YFRateLimitError = None
+
+
+# Defaults keep us comfortably under Yahoo's unauthenticated limits
+UPSTREAM_RATE = float(os.environ.get("UPSTREAM_RATE", "2"))      # requests / second
+UPSTREAM_BURST = int(os.environ.get("UPSTREAM_BURST", "5"))      # bucket size
+UPSTREAM_RETRIES = int(os.environ.get("UPSTREAM_RETRIES", "2"))  # retries on 429
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter shared by all threads."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_rate_limit_error(error):
+    """True if the upstream rejected us with a 429 / rate-limit error"""
+    if YFRateLimitError is not None and isinstance(error, YFRateLimitError):
+        return True
+    text = str(error)
+    return "429" in text or "Too Many Requests" in text or "Rate limited" in text
+
+
+#  BACKENDS
+
+class YFinanceBackend:
+    """Talks to Yahoo Finance through yfinance, reusing one HTTP session."""
+
+    def __init__(self, session=None):
+        self._session = session
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    try:
+                        from curl_cffi import requests as curl_requests
+                        self._session = curl_requests.Session(impersonate="chrome")
+                    except ImportError:
+                        return None  # let yfinance manage its own session
+        return self._session
+
+    def earnings_history(self, ticker):
+        return yf.Ticker(ticker, session=self.session).earnings_history
+
+    def info(self, ticker):
+        return yf.Ticker(ticker, session=self.session).info
+
+    def calendar(self, ticker):
+        return yf.Ticker(ticker, session=self.session).calendar
+
+    def download(self, ticker, start=None, end=None, interval="1d", period=None, prepost=False):
+        return yf.download(
+            ticker,
+            start=start,
+            end=end,
+            period=period,
+            interval=interval,
+            prepost=prepost,
+            progress=False,
+            session=self.session
+        )
+
+
+class StubBackend:
+    """
+    In-memory backend for tests and offline runs.
+
+    responses: dict keyed by (method, ticker) -> value. A value that is an
+    Exception instance is raised instead of returned; a callable is called
+    with the original arguments.
+    """
+
+    def __init__(self, responses=None, latency=0.0):
+        self.responses = dict(responses or {})
+        self.latency = latency
+        self.calls = []
+
+    def set(self, method, ticker, value):
+        self.responses[(method, ticker)] = value
+
+    def _respond(self, method, ticker, *args, **kwargs):
+        self.calls.append((method, ticker))
+        if self.latency:
+            time.sleep(self.latency)
+        if (method, ticker) not in self.responses:
+            raise KeyError(f"No stub response for {method}({ticker})")
+        value = self.responses[(method, ticker)]
+        if isinstance(value, Exception):
+            raise value
+        if callable(value):
+            return value(ticker, *args, **kwargs)
+        return value
+
+    def earnings_history(self, ticker):
+        return self._respond("earnings_history", ticker)
+
+    def info(self, ticker):
+        return self._respond("info", ticker)
+
+    def calendar(self, ticker):
+        return self._respond("calendar", ticker)
+
+    def download(self, ticker, start=None, end=None, interval="1d", period=None, prepost=False):
+        return self._respond("download", ticker, start=start, end=end, interval=interval,
+                             period=period, prepost=prepost)
+
+
+#  CLIENT
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class UpstreamClient:
+    """
+    Rate-limited, single-flight front for a market-data backend.
+
+    Identical calls that overlap in time are coalesced: the first caller
+    does the request and every other caller waits for and shares its result.
+    """
+
+    def __init__(self, backend=None, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST, retries=UPSTREAM_RETRIES):
+        self.backend = backend or YFinanceBackend()
+        self.limiter = TokenBucket(rate, burst)
+        self.retries = retries
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    # Public calls
+
+    def earnings_history(self, ticker):
+        return self.call("earnings_history", ticker)
+
+    def info(self, ticker):
+        return self.call("info", ticker)
+
+    def calendar(self, ticker):
+        return self.call("calendar", ticker)
+
+    def download(self, ticker, start=None, end=None, interval="1d", period=None, prepost=False):
+        """`ticker` may be a space-separated list to fetch several tickers in one request"""
+        return self.call("download", ticker, start=start, end=end, interval=interval,
+                         period=period, prepost=prepost)
+
+    def call(self, method, ticker, **kwargs):
+        key = (method, ticker, tuple(sorted((k, str(v)) for k, v in kwargs.items())))
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._inflight[key] = flight
+
+        if not leader:
+            self._record(method, coalesced=1)
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._execute(method, ticker, **kwargs)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _execute(self, method, ticker, **kwargs):
+        attempt = 0
+        while True:
+            waited = self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                with metrics.span("upstream", method=method):
+                    result = getattr(self.backend, method)(ticker, **kwargs)
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                throttled = is_rate_limit_error(e)
+                self._record(method, calls=1, errors=1, throttled=int(throttled),
+                             latency=elapsed, waited=waited)
+                if throttled and attempt < self.retries:
+                    attempt += 1
+                    time.sleep(2 ** attempt)  # back off before retrying
+                    continue
+                raise
+            self._record(method, calls=1, latency=time.perf_counter() - start, waited=waited)
+            return result
+
+    # Metrics
+
+    def _record(self, method, calls=0, errors=0, throttled=0, coalesced=0, latency=0.0, waited=0.0):
+        with self._lock:
+            s = self._stats.setdefault(method, {
+                "calls": 0, "errors": 0, "throttled": 0, "coalesced": 0,
+                "latency_total": 0.0, "latency_max": 0.0, "rate_limit_wait_total": 0.0
+            })
+            s["calls"] += calls
+            s["errors"] += errors
+            s["throttled"] += throttled
+            s["coalesced"] += coalesced
+            s["latency_total"] += latency
+            s["latency_max"] = max(s["latency_max"], latency)
+            s["rate_limit_wait_total"] += waited
+
+    def stats(self):
+        """Per-method call, error, coalescing and latency counters"""
+        with self._lock:
+            return {method: dict(s) for method, s in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Shared client used by main.py
+client = UpstreamClient()
+
+
+def set_backend(backend):
+    """Replace the backend behind the shared client (e.g. with a StubBackend)"""
+    client.backend = backend
+
+
+@contextmanager
+def use_backend(backend):
+    """Temporarily swap the shared client's backend"""
+    previous = client.backend
+    client.backend = backend
+    try:
+        yield backend
+    finally:
+        client.backend = previous
@@ -1,5 +1,5 @@
 from datetime import datetime
-import main
+import league
 
 class User:
     def __init__(self, user_id, username, email, initial_balance):
@@ -74,30 +74,38 @@ class User:
 class Portfolio:
     def __init__(self):
         self.holdings = {}  # key: ticker, value: number of shares
+        self.entry_prices = {}  # key: ticker, value: average live quote paid per share
+        self.version = 0  # bumped on every change, for caches keyed on holdings
 
     def can_afford(self, ticker, shares):
-        if ticker in main.premium_picks:
-            price_per_share=15.0
-        elif ticker in main.mid_tier:
-            price_per_share=10.0
-        elif ticker in main.wildcards:
-            price_per_share=5.0
-        else: price_per_share = 3.0
+        price_per_share = league.DEFAULT_RULES.price_of(ticker)
 
         total_cost = price_per_share * shares
         return total_cost <= self.balance
 
-    def add_stock(self, ticker, shares):
+    def add_stock(self, ticker, shares, price=None):
+        """price: live quote at purchase, used to value the position later"""
+        held = self.holdings.get(ticker, 0)
+        if price:
+            entry = self.entry_prices.get(ticker)
+            if entry is None or held == 0:
+                self.entry_prices[ticker] = price
+            else:
+                self.entry_prices[ticker] = (entry * held + price * shares) / (held + shares)
+
         if ticker in self.holdings:
             self.holdings[ticker] += shares
         else:
             self.holdings[ticker] = shares
+        self.version += 1
 
     def remove_stock(self, ticker, shares):
         if ticker in self.holdings and self.holdings[ticker] >= shares:
             self.holdings[ticker] -= shares
             if self.holdings[ticker] == 0:
                 del self.holdings[ticker]
+                self.entry_prices.pop(ticker, None)
+            self.version += 1
         else:
             raise ValueError("Not enough shares to sell")
     